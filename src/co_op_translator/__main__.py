@@ -1,14 +1,22 @@
 import asyncio
 import logging
+import time
+from pathlib import Path
 import click
 import importlib.resources
 import yaml
 from co_op_translator.translators.project_translator import ProjectTranslator
+from co_op_translator.translators.translation_planner import TranslationPlanner, format_plan
+from co_op_translator.translators.batch_translator import BatchTranslator
+from co_op_translator.translators.job_server import TranslationJobServer
+from co_op_translator.config.constants import CACHE_DIR_NAME, PROFILE_DIR_NAME, SERVE_DEFAULT_HOST, SERVE_DEFAULT_PORT
+from co_op_translator.utils.profiling_utils import Profiler
+from co_op_translator.utils.output_index import OutputIndex
 
 logger = logging.getLogger(__name__)
 
 @click.command()
-@click.option('--language-codes', '-l', required=True, help='Space-separated language codes for translation (e.g., "es fr de" or "all").')
+@click.option('--language-codes', '-l', default=None, help='Space-separated language codes for translation (e.g., "es fr de" or "all"). Required unless --serve or --gc is used.')
 @click.option('--root-dir', '-r', default='.', help='Root directory of the project (default is current directory).')
 @click.option('--add', '-a', is_flag=True, default=True, help='Add new translations without deleting existing ones (default behavior).')
 @click.option('--update', '-u', is_flag=True, help='Update translations by deleting and recreating them (Warning: Existing translations will be lost).')
@@ -16,7 +24,21 @@ logger = logging.getLogger(__name__)
 @click.option('--markdown', '-md', is_flag=True, help='Only translate markdown files.')
 @click.option('--debug', '-d', is_flag=True, help='Enable debug mode.')
 @click.option('--check', '-chk', is_flag=True, help='Check translated files for errors and retry translation if needed.')
-def main(language_codes, root_dir, add, update, images, markdown, debug, check):
+@click.option('--perceptual-dedup', is_flag=True, help='Also treat re-encoded near-duplicate images as copies and translate them once.')
+@click.option('--image-prefilter', type=click.Choice(['off', 'conservative', 'aggressive']), default='conservative', show_default=True, help='Local check that copies text-free images through without calling OCR.')
+@click.option('--ocr-backend', type=click.Choice(['azure', 'local', 'azure+local']), default=None, help='OCR engine for images: Azure AI Vision, local Tesseract on the CPU, or Azure with a local fallback when throttled. Defaults to OCR_BACKEND.')
+@click.option('--watch', '-w', is_flag=True, help='Keep running and re-translate markdown and image files as they change.')
+@click.option('--since', default=None, metavar='GIT_REF', help='Only translate files changed since the given git ref; move translations of renamed files and remove those of deleted files.')
+@click.option('--plan', is_flag=True, help='Estimate requests, tokens and wall time without credentials or API calls, then exit.')
+@click.option('--batch', is_flag=True, help='Translate through the Azure OpenAI Batch API (offline, cheaper, resumable).')
+@click.option('--priority', 'priority_patterns', multiple=True, metavar='PATTERN', help='Glob pattern (relative to the root) of files to translate first, in addition to README.md and top-level files. Can be repeated.')
+@click.option('--multi-target', is_flag=True, help='Translate each markdown chunk into several languages per request (fewer requests and input tokens on many-language runs).')
+@click.option('--profile', is_flag=True, help='Profile the run (CPU, per-stage timing and memory) and write reports under .co_op_translator/profiles/.')
+@click.option('--gc', is_flag=True, help='Remove translated markdown files and images whose source files no longer exist, then exit.')
+@click.option('--serve', is_flag=True, help='Run a long-lived job server that accepts translation jobs over a local HTTP API.')
+@click.option('--host', default=SERVE_DEFAULT_HOST, show_default=True, help='Address the job server listens on (with --serve). Addresses other than loopback require SERVE_TOKEN.')
+@click.option('--port', default=SERVE_DEFAULT_PORT, show_default=True, type=int, help='Port the job server listens on (with --serve).')
+def main(language_codes, root_dir, add, update, images, markdown, debug, check, perceptual_dedup, image_prefilter, ocr_backend, watch, since, plan, batch, priority_patterns, multi_target, profile, gc, serve, host, port):
     """
     CLI for translating project files.
 
@@ -47,6 +69,42 @@ def main(language_codes, root_dir, add, update, images, markdown, debug, check):
     8. Check translated files for errors and retry translations (only images):
        translate -l "ko" -chk -img
 
+    9. Translate identical images once, also merging re-encoded near-duplicates:
+       translate -l "ko" --perceptual-dedup
+
+    10. Skip OCR for photos, icons and logos that are unlikely to contain text:
+       translate -l "ko" -img --image-prefilter aggressive
+
+    11. Keep a warm translator running and re-translate files as you edit them:
+       translate -l "ko" -w
+
+    12. Only process files changed since a git ref (e.g., in a pull request job):
+       translate -l "ko ja" --since origin/main
+
+    13. Estimate the cost of a run before starting it (no API calls are made):
+       translate -l "all" --plan
+
+    14. Refresh a large project through the Batch API (re-run the same command to resume):
+       translate -l "es fr de" --batch
+
+    15. Translate getting-started pages first, in addition to README.md and top-level files:
+       translate -l "ko" --priority "docs/getting-started/*"
+
+    16. Share each markdown request between several target languages:
+       translate -l "all" --multi-target
+
+    17. Find out where a run spends its time and memory:
+       translate -l "ko" --profile
+
+    18. Serve translation jobs for several projects from one warm process:
+       translate --serve --port 8787
+
+    19. Recognize image text locally on the CPU instead of calling Azure AI Vision:
+       translate -l "ko" -img --ocr-backend local
+
+    20. Remove translations of source files that were deleted:
+       translate --gc
+
     Debug mode example:
     - translate -l "ko" -d: Enable debug logging.
     """
@@ -57,8 +115,27 @@ def main(language_codes, root_dir, add, update, images, markdown, debug, check):
     else:
         logging.basicConfig(level=logging.CRITICAL)
 
-    # Show warning if 'all' is selected
-    if language_codes == "all":
+    if serve:
+        # Languages and options come with each job
+        try:
+            server = TranslationJobServer(host, port)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        click.echo(f"Serving translation jobs on http://{host}:{port}. Press Ctrl+C to stop.")
+        server.run()
+        return
+
+    if gc:
+        # Orphans are removed in every language, using the output index only; no credentials are needed
+        removed = OutputIndex(root_dir).remove_orphans()
+        click.echo(f"Removed {removed} orphaned translation(s).")
+        return
+
+    if not language_codes:
+        raise click.UsageError("Missing option '--language-codes' / '-l'.")
+
+    # Show warning if 'all' is selected (plan mode makes no changes, so no confirmation is needed)
+    if language_codes == "all" and not plan:
         click.echo("Warning: Translating all languages at once can take a significant amount of time, especially when dealing with large markdown-based open-source projects that have many documents.")
         click.echo("For better efficiency, it's recommended that contributors handle individual languages and upload their translations separately.")
         # Option to proceed or not
@@ -71,7 +148,7 @@ def main(language_codes, root_dir, add, update, images, markdown, debug, check):
             click.echo("Proceeding with translation for all languages...")
 
     # Show warning and prompt if update is selected
-    if update:
+    if update and not plan:
         click.echo(f"Warning: The update command will delete all existing translations for '{language_codes}' and re-translate everything.")
         confirmation_update = click.prompt("Do you want to continue? Type 'yes' to proceed", type=str)
         
@@ -89,16 +166,47 @@ def main(language_codes, root_dir, add, update, images, markdown, debug, check):
                 language_codes = " ".join([lang_code for lang_code in font_mappings if isinstance(font_mappings[lang_code], dict)])
                 logging.debug(f"Loaded language codes from font mapping: {language_codes}")
 
-    # Initialize ProjectTranslator
-    translator = ProjectTranslator(language_codes, root_dir)
+    profiler = None
+    if profile:
+        profiler = Profiler(Path(root_dir) / CACHE_DIR_NAME / PROFILE_DIR_NAME / time.strftime('%Y%m%d-%H%M%S'))
+        profiler.start()
 
-    if check:
-        # Call check_and_retry_translations if --check is passed
-        click.echo(f"Checking translated files for errors in {language_codes}...")
-        asyncio.run(translator.check_and_retry_translations())
-    else:
-        # Call translate_project
-        translator.translate_project(images=images, markdown=markdown, update=update)
+    try:
+        if plan:
+            planner = TranslationPlanner(language_codes, root_dir, perceptual_dedup=perceptual_dedup, image_prefilter=image_prefilter, multi_target=multi_target)
+            click.echo(format_plan(planner.plan(images=images, markdown=markdown, update=update)))
+            return
+
+        if batch:
+            click.echo("Submitting translation requests to the Batch API. This may take up to 24 hours; re-run the same command to resume.")
+            BatchTranslator(
+                language_codes, root_dir, perceptual_dedup=perceptual_dedup, image_prefilter=image_prefilter, ocr_backend=ocr_backend
+            ).run(images=images, markdown=markdown, update=update)
+            return
+
+        # Initialize ProjectTranslator
+        translator = ProjectTranslator(
+            language_codes, root_dir, perceptual_dedup=perceptual_dedup, image_prefilter=image_prefilter,
+            priority_patterns=priority_patterns, multi_target=multi_target, ocr_backend=ocr_backend
+        )
+
+        if check:
+            # Call check_and_retry_translations if --check is passed
+            click.echo(f"Checking translated files for errors in {language_codes}...")
+            asyncio.run(translator._run(translator.check_and_retry_translations()))
+        elif watch:
+            click.echo(f"Watching {root_dir} for changes. Press Ctrl+C to stop.")
+            translator.watch_project(images=images, markdown=markdown)
+        elif since:
+            click.echo(f"Translating files changed since {since}...")
+            translator.translate_since(since, images=images, markdown=markdown)
+        else:
+            # Call translate_project
+            translator.translate_project(images=images, markdown=markdown, update=update)
+    finally:
+        if profiler is not None:
+            report_dir = profiler.stop()
+            click.echo(f"Profiling reports written to {report_dir}")
 
     logger.info(f"Project translation completed for languages: {language_codes}")
 
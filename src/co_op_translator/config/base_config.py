@@ -13,11 +13,61 @@ class Config:
     AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
     AZURE_AI_SERVICE_ENDPOINT = os.getenv("AZURE_AI_SERVICE_ENDPOINT")
 
+    # Optional tuning settings
+    OCR_MAX_IMAGE_EDGE = int(os.getenv("OCR_MAX_IMAGE_EDGE", "2048"))  # 0 disables downscaling of OCR uploads
+    OCR_UPLOAD_JPEG_QUALITY = int(os.getenv("OCR_UPLOAD_JPEG_QUALITY", "90"))
+    OCR_BACKEND = os.getenv("OCR_BACKEND", "azure")  # "azure", "local" (Tesseract on the CPU) or "azure+local" (local when Vision is throttled)
+    LOCAL_OCR_LANGUAGES = os.getenv("LOCAL_OCR_LANGUAGES", "eng")  # Tesseract languages of the source text, e.g. "eng+fra"
+    LOCAL_OCR_MIN_CONFIDENCE = float(os.getenv("LOCAL_OCR_MIN_CONFIDENCE", "50"))  # 0-100; less confident words are dropped
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))  # Keep-alive connections per endpoint
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+    AZURE_OPENAI_BATCH_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_BATCH_DEPLOYMENT_NAME")  # Defaults to the chat deployment
+    # Deployment quotas, used to predict wall time in plan mode (0 means unknown/unlimited)
+    AZURE_OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("AZURE_OPENAI_REQUESTS_PER_MINUTE", "0"))
+    AZURE_OPENAI_TOKENS_PER_MINUTE = int(os.getenv("AZURE_OPENAI_TOKENS_PER_MINUTE", "0"))
+    AZURE_AI_SERVICE_REQUESTS_PER_MINUTE = int(os.getenv("AZURE_AI_SERVICE_REQUESTS_PER_MINUTE", "0"))
+    # Concurrency budget shared by all translation stages
+    MAX_IN_FLIGHT_REQUESTS = int(os.getenv("MAX_IN_FLIGHT_REQUESTS", "10"))  # Across chat and OCR
+    MAX_CHAT_REQUESTS = int(os.getenv("MAX_CHAT_REQUESTS", "8"))
+    MAX_OCR_REQUESTS = int(os.getenv("MAX_OCR_REQUESTS", "4"))
+    LANGUAGE_WEIGHTS = os.getenv("LANGUAGE_WEIGHTS", "")  # e.g. "ko=2,ja=1"; unlisted languages weigh 1
+    # Resilience of markdown chunk requests
+    CHAT_REQUEST_TIMEOUT = float(os.getenv("CHAT_REQUEST_TIMEOUT", "120"))
+    CHAT_MAX_RETRIES = int(os.getenv("CHAT_MAX_RETRIES", "3"))
+    RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "1"))
+    RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "30"))
+    CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5"))  # Consecutive failures per deployment
+    CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", "30"))
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0"))  # e.g. 95; 0 disables hedged requests
+    # Translated image encoding
+    IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "")  # "" keeps the source format, "webp" writes WebP
+    PNG_COMPRESS_LEVEL = int(os.getenv("PNG_COMPRESS_LEVEL", "6"))  # 0 (fastest) to 9 (smallest)
+    JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "75"))
+    JPEG_OPTIMIZE = os.getenv("JPEG_OPTIMIZE", "false").lower() == "true"
+    WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", "80"))
+    WEBP_LOSSLESS = os.getenv("WEBP_LOSSLESS", "false").lower() == "true"
+    WEBP_METHOD = int(os.getenv("WEBP_METHOD", "4"))  # 0 (fastest) to 6 (smallest)
+    IMAGE_PASSTHROUGH_HARDLINK = os.getenv("IMAGE_PASSTHROUGH_HARDLINK", "false").lower() == "true"  # Hardlink text-free images instead of copying
+    # Write-behind output stage
+    IO_WRITE_QUEUE_SIZE = int(os.getenv("IO_WRITE_QUEUE_SIZE", "100"))  # Pending writes before translation waits
+    IO_WRITE_WORKERS = int(os.getenv("IO_WRITE_WORKERS", "2"))
+    IO_WRITE_BATCH_SIZE = int(os.getenv("IO_WRITE_BATCH_SIZE", "16"))  # Files written per thread hand-off
+    IO_FSYNC = os.getenv("IO_FSYNC", "none")  # "none", "file" (fsync each file) or "batch" (fsync the batch's files and directories after writing them)
+    # Model routing: "task[:small|large]=deployment[,fallback...];..." with tasks markdown, disclaimer and image_text
+    MODEL_ROUTES = os.getenv("MODEL_ROUTES", "")
+    ROUTE_SMALL_MAX_TOKENS = int(os.getenv("ROUTE_SMALL_MAX_TOKENS", "400"))  # Prompts up to this size are in the small class
+    # Cross-image batching of recognized lines into one chat request per language
+    IMAGE_TEXT_BATCH_MAX_TOKENS = int(os.getenv("IMAGE_TEXT_BATCH_MAX_TOKENS", "1500"))  # Line tokens per request; 0 sends one request per image
+    IMAGE_TEXT_BATCH_WAIT = float(os.getenv("IMAGE_TEXT_BATCH_WAIT", "2"))  # Seconds a batch waits for more images before it is sent
+    # Job server (--serve)
+    SERVE_MAX_CONCURRENT_JOBS = int(os.getenv("SERVE_MAX_CONCURRENT_JOBS", "2"))  # Jobs running at once; requests share one scheduler
+    SERVE_TOKEN = os.getenv("SERVE_TOKEN")  # Bearer token required by the job server; needed to listen on non-loopback hosts
+
     @staticmethod
     def check_configuration():
+        # The Azure AI Vision settings are only required by the Azure OCR backend (see check_vision_configuration)
         missing_keys = []
-        if not Config.AZURE_SUBSCRIPTION_KEY:
-            missing_keys.append("AZURE_SUBSCRIPTION_KEY")
         if not Config.AZURE_OPENAI_API_KEY:
             missing_keys.append("AZURE_OPENAI_API_KEY")
         if not Config.AZURE_OPENAI_ENDPOINT:
@@ -28,11 +78,17 @@ class Config:
             missing_keys.append("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME")
         if not Config.AZURE_OPENAI_API_VERSION:
             missing_keys.append("AZURE_OPENAI_API_VERSION")
+
+        if missing_keys:
+            raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_keys)}")
+
+    @staticmethod
+    def check_vision_configuration():
+        missing_keys = []
+        if not Config.AZURE_SUBSCRIPTION_KEY:
+            missing_keys.append("AZURE_SUBSCRIPTION_KEY")
         if not Config.AZURE_AI_SERVICE_ENDPOINT:
             missing_keys.append("AZURE_AI_SERVICE_ENDPOINT")
 
         if missing_keys:
             raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_keys)}")
-
-# Check the configuration
-Config.check_configuration()
\ No newline at end of file
@@ -1,5 +1,53 @@
 SUPPORTED_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+CACHE_DIR_NAME = '.co_op_translator'  # Per-project caches, stored under the project root
+PREFILTER_CACHE_FILE = 'image_text_prefilter.json'
+LINE_MEMORY_FILE = 'image_line_memory.json'  # Translations of recognized image lines per language
+OUTPUT_INDEX_FILE = 'output_index.json'  # Translated outputs by source and language, with the output directory mtimes
+DURATION_HISTORY_FILE = 'durations.json'  # Per-file translation durations used for scheduling
+PROFILE_DIR_NAME = 'profiles'  # Reports of --profile runs, one timestamped directory per run
 EXCLUDED_DIRS = {
-    'translations', 'translated_images' ,'.git', '.github', '.vscode', '__pycache__', 'node_modules', 'build', 'dist', 'venv',
+    'translations', 'translated_images', CACHE_DIR_NAME, '.git', '.github', '.vscode', '__pycache__', 'node_modules', 'build', 'dist', 'venv',
     'env', 'site-packages', '.venv', '.idea', '.devcontainer', '.pytest_cache'
-}
\ No newline at end of file
+}
+WATCH_POLL_INTERVAL = 1.0  # Seconds between filesystem scans in watch mode
+WATCH_DEBOUNCE_SECONDS = 2.0  # Quiet period after the last change before translating
+MAX_CONCURRENT_TASKS = 5  # Files in progress per translation stage; requests are bounded by the scheduler
+IMAGE_BATCH_CONCURRENT_TASKS = 32  # Images in progress when their lines are batched, so batches can fill up
+TASK_QUEUE_SIZE = 50  # Pending tasks created ahead of the workers
+MARKDOWN_MAX_OUTPUT_TOKENS = 4096  # Output token limit of a markdown translation request
+MARKDOWN_MAX_INPUT_TOKENS = 4096  # Largest chunk sent for translation, whatever the language
+MARKDOWN_MIN_INPUT_TOKENS = 512  # Smallest chunk budget, so strongly expanding languages still get useful chunks
+CHUNK_OUTPUT_HEADROOM = 0.85  # Share of the output limit a chunk's expected translation may use
+EXPANSION_RATIO_FILE = 'expansion_ratios.json'  # Learned output/input token ratios per language
+EXPANSION_RATIO_SMOOTHING = 0.2  # Weight of each new observation in the learned ratio
+EXPANSION_RATIO_MIN_CHUNK_TOKENS = 100  # Chunks shorter than this are too noisy to learn from
+# Starting output/input token ratios (o200k_base) per target language, replaced by learned ratios as translations complete
+DEFAULT_EXPANSION_RATIO = 1.3
+DEFAULT_EXPANSION_RATIOS = {
+    'zh': 1.0, 'mo': 1.0, 'hk': 1.0, 'tw': 1.0, 'ja': 1.2, 'ko': 1.3,
+    'es': 1.25, 'pt': 1.25, 'fr': 1.3, 'it': 1.3, 'id': 1.3, 'ms': 1.3,
+    'de': 1.35, 'nl': 1.35, 'sv': 1.35, 'da': 1.35,
+    'ru': 1.4, 'ar': 1.4, 'he': 1.4, 'tr': 1.4, 'vi': 1.4, 'tl': 1.4, 'ro': 1.45,
+    'fa': 1.5, 'pl': 1.5, 'cs': 1.5, 'bg': 1.5, 'sr': 1.5, 'hr': 1.5, 'sl': 1.5, 'sw': 1.5,
+    'ur': 1.6, 'hi': 1.6, 'th': 1.6, 'fi': 1.6, 'hu': 1.6, 'sk': 1.6,
+    'el': 1.8, 'bn': 1.9, 'mr': 1.9, 'ne': 1.9, 'pa': 2.0,
+}
+IMAGE_TEXT_BATCH_OUTPUT_TOKENS = 4096  # Output token limit of a batched image text request
+MULTI_TARGET_MAX_LANGUAGES = 8  # Upper bound on languages requested together in multi-target mode
+SERVE_DEFAULT_HOST = '127.0.0.1'  # The job server only listens locally unless told otherwise
+SERVE_DEFAULT_PORT = 8787
+SERVE_MAX_REQUEST_BYTES = 64 * 1024 * 1024  # Largest accepted job submission
+SERVE_JOB_HISTORY = 200  # Finished jobs kept for status queries
+SERVE_TRANSLATOR_CACHE_SIZE = 8  # Warm project translators kept for later jobs
+BATCH_MAX_REQUESTS_PER_FILE = 50000  # Requests per Batch API input file
+BATCH_POLL_INTERVAL = 60.0  # Seconds between Batch API status checks
+
+# Assumptions used by plan mode to estimate tokens and wall time without calling any API
+PLAN_OUTPUT_TOKEN_RATIO = 1.2  # Output tokens per input document token
+PLAN_IMAGE_PROMPT_TOKENS = 250  # Typical image-text prompt size
+PLAN_IMAGE_OUTPUT_TOKENS = 100
+PLAN_IMAGE_TEXT_TOKENS = 40  # Typical tokens of the recognized lines of an image, used to estimate batched requests
+PLAN_CHAT_BASE_LATENCY = 1.5  # Seconds per chat completion before output streaming
+PLAN_CHAT_OUTPUT_TOKENS_PER_SECOND = 60
+PLAN_OCR_LATENCY = 1.5  # Seconds per OCR call
+PLAN_PROMPT_DELAY = 1.0  # Pause after each markdown prompt
@@ -1,16 +1,22 @@
 import os
 import importlib.resources
+from functools import lru_cache
 import yaml
 
+@lru_cache(maxsize=None)
+def _load_font_mappings():
+    # Read once per process; every translator shares the parsed mappings
+    with importlib.resources.path('co_op_translator.fonts', 'font_language_mappings.yml') as mappings_path:
+        with open(mappings_path, 'r', encoding='utf-8') as file:
+            return yaml.safe_load(file)
+
 class FontConfig:
 
     def __init__(self):
         """
         Initialize the FontConfig class by loading the font mappings from a YAML file.
         """
-        with importlib.resources.path('co_op_translator.fonts', 'font_language_mappings.yml') as mappings_path:
-            with open(mappings_path, 'r', encoding='utf-8') as file:
-                self.font_mappings = yaml.safe_load(file)
+        self.font_mappings = _load_font_mappings()
 
     def get_font_path(self, language_code):
         """
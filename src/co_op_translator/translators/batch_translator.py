@@ -0,0 +1,376 @@
+import json
+import logging
+import shutil
+import time
+from pathlib import Path
+from co_op_translator.config.base_config import Config
+from co_op_translator.config.font_config import FontConfig
+from co_op_translator.translators.image_translator import ImageTranslator
+from co_op_translator.config.constants import (
+    SUPPORTED_IMAGE_EXTENSIONS,
+    EXCLUDED_DIRS,
+    CACHE_DIR_NAME,
+    EXPANSION_RATIO_FILE,
+    BATCH_MAX_REQUESTS_PER_FILE,
+    BATCH_POLL_INTERVAL,
+)
+from co_op_translator.utils.file_utils import (
+    read_input_file,
+    handle_empty_document,
+    filter_files,
+    get_filename_and_extension,
+    generate_translated_filename,
+    link_or_copy_file,
+    load_json_cache,
+    save_json_cache,
+)
+from co_op_translator.utils.image_utils import group_duplicate_images, save_untranslated_image
+from co_op_translator.utils.client_utils import get_openai_client
+from co_op_translator.utils.expansion_utils import ExpansionRatios
+from co_op_translator.utils.output_index import OutputIndex
+from co_op_translator.utils.markdown_utils import chunk_markdown_document, generate_prompt_template, generate_disclaimer_prompt, update_links
+from co_op_translator.utils.text_utils import gen_image_translation_prompt, remove_code_backticks, extract_yaml_lines
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_BATCH_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+class BatchTranslator:
+    def __init__(self, language_codes, root_dir='.', client=None, perceptual_dedup=False, image_prefilter='conservative', job_name='default', ocr_backend=None):
+        """
+        Initialize the BatchTranslator, which translates a project through the Azure OpenAI Batch API.
+
+        All progress is kept in a state directory under the project's cache directory, so
+        a run interrupted at any point resumes where it stopped when started again.
+
+        Args:
+            language_codes (str): Space-separated target language codes.
+            root_dir (str): The root directory of the project.
+            client (optional): An OpenAI-compatible client exposing `files` and `batches`.
+                               Defaults to an AzureOpenAI client built from the configuration;
+                               pass a local stand-in to run without Azure.
+            perceptual_dedup (bool): Whether near-duplicate images are translated once.
+            image_prefilter (str): The local no-text prefilter mode used for images.
+            job_name (str): Name of the state directory, allowing independent jobs in one project.
+            ocr_backend (str, optional): The OCR backend used for images. Defaults to OCR_BACKEND.
+        """
+        self.language_codes = language_codes.split()
+        self.root_dir = Path(root_dir).resolve()
+        self.translations_dir = self.root_dir / 'translations'
+        self.image_dir = self.root_dir / 'translated_images'
+        self.state_dir = self.root_dir / CACHE_DIR_NAME / 'batch' / job_name
+        self.state_path = self.state_dir / 'state.json'
+        self.perceptual_dedup = perceptual_dedup
+        self.image_prefilter = image_prefilter
+        self.ocr_backend = ocr_backend
+        self.font_config = FontConfig()
+        self.expansion_ratios = ExpansionRatios(self.root_dir / CACHE_DIR_NAME / EXPANSION_RATIO_FILE)
+        self.output_index = OutputIndex(self.root_dir, self.translations_dir, self.image_dir)
+        self.client = client or self.get_openai_client()
+        self.deployment_name = Config.AZURE_OPENAI_BATCH_DEPLOYMENT_NAME or Config.AZURE_OPENAI_CHAT_DEPLOYMENT_NAME
+        self._image_translator = None
+
+    def get_openai_client(self):
+        """
+        Return the shared Azure OpenAI client for the files and batches endpoints.
+
+        Returns:
+            AzureOpenAI: The OpenAI client, backed by the shared connection pool.
+        """
+        return get_openai_client()
+
+    @property
+    def image_translator(self):
+        # Created lazily: OCR and rendering are only needed when images are part of the job
+        if self._image_translator is None:
+            self._image_translator = ImageTranslator(default_output_dir=self.image_dir, root_dir=self.root_dir, prefilter_mode=self.image_prefilter, ocr_backend=self.ocr_backend)
+        return self._image_translator
+
+    def _chat_request(self, custom_id, prompt, max_tokens, system_prompt=None, **settings):
+        messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        messages.append({"role": "user", "content": prompt})
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/chat/completions",
+            "body": {"model": self.deployment_name, "messages": messages, "max_tokens": max_tokens, **settings},
+        }
+
+    def _save_state(self, state):
+        save_json_cache(self.state_path, state)
+
+    def prepare(self, images=True, markdown=True, update=False):
+        """
+        Collect every pending chunk and image-line prompt and write them into JSONL batch files.
+
+        Images are OCR'd here, once per group of identical images, because the line
+        bounding boxes are needed both for the prompts and for rendering the results.
+
+        Returns:
+            dict: The new job state.
+        """
+        requests = []
+        state = {'stage': 'prepared', 'documents': [], 'images': [], 'disclaimers': {}, 'batches': []}
+        source_files = [path.resolve() for path in filter_files(self.root_dir, EXCLUDED_DIRS)]
+
+        if markdown:
+            for md_file_path in (path for path in source_files if path.suffix == '.md'):
+                relative_path = md_file_path.relative_to(self.root_dir)
+                pending_languages = [
+                    language_code for language_code in self.language_codes
+                    if update or not self.output_index.has(md_file_path, language_code)
+                ]
+                if not pending_languages:
+                    continue
+
+                document = read_input_file(md_file_path)
+                if not document:
+                    for language_code in pending_languages:
+                        output_file = self.translations_dir / language_code / relative_path
+                        output_file.parent.mkdir(parents=True, exist_ok=True)
+                        handle_empty_document(md_file_path, output_file)
+                        self.output_index.record(md_file_path, language_code, output_file)
+                    continue
+
+                chunks_by_budget = {}
+                for language_code in pending_languages:
+                    is_rtl = self.font_config.is_rtl(language_code)
+                    budget = self.expansion_ratios.get_chunk_token_budget(language_code)
+                    if budget not in chunks_by_budget:
+                        chunks_by_budget[budget] = chunk_markdown_document(document, max_tokens=budget)
+                    chunks = chunks_by_budget[budget]
+                    chunk_ids = []
+                    for chunk in chunks:
+                        custom_id = f"md-{len(requests)}"
+                        requests.append(self._chat_request(
+                            custom_id, generate_prompt_template(language_code, chunk, is_rtl), 4096, temperature=0.7, top_p=0.8
+                        ))
+                        chunk_ids.append(custom_id)
+                    state['documents'].append({
+                        'source': str(relative_path), 'language': language_code, 'chunks': chunk_ids, 'done': False,
+                    })
+
+                    # The disclaimer is the same for every document, so it is requested once per language
+                    if language_code not in state['disclaimers']:
+                        custom_id = f"disclaimer-{language_code}"
+                        requests.append(self._chat_request(custom_id, generate_disclaimer_prompt(language_code), 4096, temperature=0.7, top_p=0.8))
+                        state['disclaimers'][language_code] = custom_id
+
+        if images:
+            image_files = [path for path in source_files if get_filename_and_extension(path)[1] in SUPPORTED_IMAGE_EXTENSIONS]
+            for image_group in group_duplicate_images(image_files, perceptual=self.perceptual_dedup):
+                pending_languages = [
+                    language_code for language_code in self.language_codes
+                    if update or not self.output_index.has(image_group[0], language_code)
+                ]
+                if not pending_languages:
+                    continue
+
+                line_bounding_boxes = []
+                if self.image_translator.may_contain_text(image_group[0]):
+                    try:
+                        line_bounding_boxes = self.image_translator.extract_line_bounding_boxes(image_group[0])
+                    except Exception as e:
+                        logger.info(f"No text extracted from {image_group[0]}: {e}")
+
+                for language_code in pending_languages:
+                    if not line_bounding_boxes:
+                        # Nothing to translate: copy the original through for every copy
+                        for image_path in image_group:
+                            output_path = save_untranslated_image(image_path, self.image_dir / generate_translated_filename(image_path, language_code, self.root_dir))
+                            self.output_index.record(image_path, language_code, output_path)
+                        continue
+
+                    custom_id = f"img-{len(requests)}"
+                    target_language_name = self.font_config.get_language_name(language_code)
+                    prompt = gen_image_translation_prompt([line['text'] for line in line_bounding_boxes], target_language_name)
+                    requests.append(self._chat_request(custom_id, prompt, 2000, system_prompt="You are a helpful assistant."))
+                    state['images'].append({
+                        'sources': [str(path.relative_to(self.root_dir)) for path in image_group],
+                        'language': language_code,
+                        'request': custom_id,
+                        'lines': line_bounding_boxes,
+                        'done': False,
+                    })
+            self.image_translator.save_prefilter_cache()
+        self.output_index.save()
+
+        # Split the requests into batch input files
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        for start in range(0, len(requests), BATCH_MAX_REQUESTS_PER_FILE):
+            input_path = self.state_dir / f"requests-{len(state['batches']):03d}.jsonl"
+            with open(input_path, "w", encoding='utf-8') as f:
+                for request in requests[start:start + BATCH_MAX_REQUESTS_PER_FILE]:
+                    f.write(json.dumps(request, ensure_ascii=False) + "\n")
+            state['batches'].append({
+                'input_file': input_path.name,
+                'file_id': None,
+                'batch_id': None,
+                'status': None,
+                'results_file': None,
+            })
+
+        logger.info(f"Prepared {len(requests)} batch requests in {len(state['batches'])} file(s)")
+        self._save_state(state)
+        return state
+
+    def submit(self, state):
+        """
+        Upload each batch input file and create its batch job, skipping the steps already done.
+        """
+        for batch in state['batches']:
+            if batch['file_id'] is None:
+                with open(self.state_dir / batch['input_file'], "rb") as f:
+                    batch['file_id'] = self.client.files.create(file=f, purpose="batch").id
+                self._save_state(state)
+                logger.info(f"Uploaded {batch['input_file']} as {batch['file_id']}")
+
+            if batch['batch_id'] is None:
+                batch['batch_id'] = self.client.batches.create(
+                    input_file_id=batch['file_id'],
+                    endpoint="/chat/completions",
+                    completion_window="24h",
+                ).id
+                self._save_state(state)
+                logger.info(f"Created batch {batch['batch_id']} for {batch['input_file']}")
+
+        state['stage'] = 'submitted'
+        self._save_state(state)
+
+    def wait_for_batches(self, state, poll_interval=BATCH_POLL_INTERVAL):
+        """
+        Poll every batch until it reaches a terminal status and download its results.
+        """
+        while True:
+            pending = 0
+            for batch in state['batches']:
+                if batch['results_file'] is not None:
+                    continue
+
+                batch_job = self.client.batches.retrieve(batch['batch_id'])
+                if batch_job.status != batch['status']:
+                    logger.info(f"Batch {batch['batch_id']} is {batch_job.status}")
+                    batch['status'] = batch_job.status
+                    self._save_state(state)
+
+                if batch_job.status not in TERMINAL_BATCH_STATUSES:
+                    pending += 1
+                    continue
+
+                # Expired or cancelled batches can still carry results for the requests that finished
+                results_file = self.state_dir / batch['input_file'].replace('requests-', 'results-')
+                with open(results_file, "w", encoding='utf-8') as f:
+                    for file_id in (batch_job.output_file_id, batch_job.error_file_id):
+                        if file_id:
+                            f.write(self.client.files.content(file_id).text.rstrip("\n") + "\n")
+                batch['results_file'] = results_file.name
+                self._save_state(state)
+
+            if not pending:
+                break
+            time.sleep(poll_interval)
+
+        state['stage'] = 'completed'
+        self._save_state(state)
+
+    def _load_results(self, state):
+        results = {}
+        for batch in state['batches']:
+            with open(self.state_dir / batch['results_file'], "r", encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    response = record.get('response') or {}
+                    if response.get('status_code') == 200:
+                        results[record['custom_id']] = response['body']['choices'][0]['message']['content']
+                    else:
+                        logger.warning(f"Batch request {record.get('custom_id')} failed: {record.get('error') or response}")
+        return results
+
+    def assemble(self, state):
+        """
+        Write the batch results into the usual output tree.
+
+        Returns:
+            int: The number of outputs that could not be assembled because a request failed.
+        """
+        results = self._load_results(state)
+        missing = 0
+
+        for document in state['documents']:
+            if document['done']:
+                continue
+            chunk_results = [results.get(custom_id) for custom_id in document['chunks']]
+            disclaimer = results.get(state['disclaimers'][document['language']])
+            if any(result is None for result in chunk_results) or disclaimer is None:
+                missing += 1
+                continue
+
+            md_file_path = self.root_dir / document['source']
+            translated_content = update_links(md_file_path, "\n".join(chunk_results), document['language'], self.root_dir)
+            translated_content += "\n\n" + disclaimer
+
+            translated_path = self.translations_dir / document['language'] / document['source']
+            translated_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(translated_path, "w", encoding='utf-8') as f:
+                f.write(translated_content)
+            self.output_index.record(md_file_path, document['language'], translated_path)
+            document['done'] = True
+
+        for image in state['images']:
+            if image['done']:
+                continue
+            if image['request'] not in results:
+                missing += 1
+                continue
+
+            translated_text_list = extract_yaml_lines(remove_code_backticks(results[image['request']]))
+            image_paths = [self.root_dir / source for source in image['sources']]
+            output_path = self.image_translator.plot_annotated_image(image_paths[0], image['lines'], translated_text_list, image['language'], self.image_dir)
+            self.output_index.record(image_paths[0], image['language'], output_path)
+            for duplicate_path in image_paths[1:]:
+                duplicate_output = link_or_copy_file(output_path, self.image_dir / generate_translated_filename(duplicate_path, image['language'], self.root_dir))
+                self.output_index.record(duplicate_path, image['language'], duplicate_output)
+            image['done'] = True
+
+        self.output_index.save()
+        state['stage'] = 'assembled'
+        self._save_state(state)
+        return missing
+
+    def run(self, images=False, markdown=False, update=False):
+        """
+        Translate the project through the Batch API, resuming an interrupted job if one exists.
+
+        Existing translations are overwritten when results arrive rather than deleted up front.
+
+        Args:
+            images (bool): Whether to translate images.
+            markdown (bool): Whether to translate markdown files.
+            update (bool): Whether to re-translate files that already have translations.
+        """
+        if not images and not markdown:
+            images = True
+            markdown = True
+
+        state = load_json_cache(self.state_path)
+        if state:
+            logger.info(f"Resuming batch job from stage '{state['stage']}'")
+        else:
+            state = self.prepare(images=images, markdown=markdown, update=update)
+
+        if not state['batches']:
+            logger.info("Nothing to translate.")
+            shutil.rmtree(self.state_dir, ignore_errors=True)
+            return
+
+        if state['stage'] == 'prepared':
+            self.submit(state)
+        if state['stage'] == 'submitted':
+            self.wait_for_batches(state)
+        missing = self.assemble(state)
+
+        if missing:
+            logger.warning(f"{missing} output(s) could not be assembled because requests failed; run again to retry them.")
+        shutil.rmtree(self.state_dir, ignore_errors=True)
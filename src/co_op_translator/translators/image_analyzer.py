@@ -1,9 +1,16 @@
 import os
+import json
 import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from co_op_translator.config.base_config import Config
+from co_op_translator.config.constants import SUPPORTED_IMAGE_EXTENSIONS
 from co_op_translator.translators.image_translator import ImageTranslator
+from co_op_translator.utils.file_utils import get_filename_and_extension
 from co_op_translator.utils.image_utils import (
     save_bounding_boxes,
     plot_bounding_boxes,
+    render_bounding_boxes,
 )
 
 logger = logging.getLogger(__name__)
@@ -34,3 +41,71 @@ class ImageAnalyzer:
                 if line_bounding_boxes:
                     save_bounding_boxes(image_path, line_bounding_boxes)
                     plot_bounding_boxes(image_path, line_bounding_boxes,language_code="en", display=True)
+
+    def _extract(self, image_path):
+        """
+        Run OCR on one image, returning its lines and the error message if it failed.
+        """
+        try:
+            return self.image_translator.extract_line_bounding_boxes(image_path), None
+        except Exception as e:
+            return [], str(e)
+
+    def analyze_images(self, image_paths, render=True, ocr_workers=None, render_workers=None):
+        """
+        Headless batch analysis: run OCR on many images concurrently, render the overlays in a
+        process pool and write all results to a single compact index.
+
+        Output layout in output_dir:
+            index.json: {"images": [{"path", "lines": [[text, confidence, bounding_box], ...], "overlay", "error"}]}
+            overlays/: One annotated image per image with text (when render is True).
+
+        Args:
+            image_paths (list): Paths to image files; unsupported files are ignored.
+            render (bool): Whether to render bounding box overlays.
+            ocr_workers (int, optional): Concurrent OCR requests. Defaults to MAX_OCR_REQUESTS.
+            render_workers (int, optional): Rendering processes. Defaults to the number of CPUs.
+
+        Returns:
+            Path: The path of the index file.
+        """
+        output_dir = Path(self.output_dir)
+        overlay_dir = output_dir / 'overlays'
+        image_paths = [
+            Path(image_path) for image_path in image_paths
+            if get_filename_and_extension(image_path)[1] in SUPPORTED_IMAGE_EXTENSIONS
+        ]
+        entries = [{'path': str(image_path), 'lines': [], 'overlay': None, 'error': None} for image_path in image_paths]
+
+        with ThreadPoolExecutor(max_workers=ocr_workers or Config.MAX_OCR_REQUESTS) as ocr_pool, \
+                ProcessPoolExecutor(max_workers=render_workers) as render_pool:
+            ocr_futures = {ocr_pool.submit(self._extract, image_path): index for index, image_path in enumerate(image_paths)}
+            render_futures = {}
+
+            # Start rendering each image as soon as its OCR result arrives
+            for future in as_completed(ocr_futures):
+                index = ocr_futures[future]
+                line_bounding_boxes, error = future.result()
+                entry = entries[index]
+                entry['error'] = error
+                entry['lines'] = [[line['text'], line['confidence'], line['bounding_box']] for line in line_bounding_boxes]
+
+                if render and line_bounding_boxes:
+                    # Prefix with the position so images with the same name in different folders do not collide
+                    overlay_path = overlay_dir / f"{index:06d}_{image_paths[index].name}"
+                    render_futures[render_pool.submit(render_bounding_boxes, image_paths[index], line_bounding_boxes, overlay_path)] = index
+
+            for future in as_completed(render_futures):
+                index = render_futures[future]
+                try:
+                    entries[index]['overlay'] = os.path.relpath(future.result(), output_dir)
+                except Exception as e:
+                    entries[index]['error'] = f"Rendering failed: {e}"
+
+        index_path = output_dir / 'index.json'
+        with open(index_path, "w", encoding="utf-8") as index_file:
+            json.dump({'images': entries}, index_file, ensure_ascii=False, separators=(',', ':'))
+
+        failed = sum(1 for entry in entries if entry['error'])
+        logger.info(f"Analyzed {len(entries)} images ({failed} without text or failed). Index written to {index_path}")
+        return index_path
@@ -1,5 +1,9 @@
+import io
 import os
+import asyncio
+import hashlib
 import logging
+import threading
 import numpy as np
 from PIL import Image, ImageFont
 from pathlib import Path
@@ -10,45 +14,141 @@ from co_op_translator.utils.image_utils import (
     create_filled_polygon_mask,
     draw_text_on_image,
     warp_image_to_bounding_box,
-    get_image_mode
+    get_image_mode,
+    prepare_image_for_ocr,
+    prepare_image_bytes_for_ocr,
+    rescale_bounding_box,
+    lookup_text_presence,
+    get_image_bytes_extension,
+    encode_image,
+    save_image,
+    save_untranslated_image
 )
-from azure.ai.vision.imageanalysis import ImageAnalysisClient
-from azure.ai.vision.imageanalysis.models import VisualFeatures
-from azure.core.credentials import AzureKeyCredential
 from co_op_translator.config.base_config import Config
 from co_op_translator.translators.text_translator import TextTranslator
-from co_op_translator.utils.file_utils import generate_translated_filename
+from co_op_translator.utils.ocr_backends import get_ocr_backend
+from co_op_translator.utils.request_scheduler import RequestScheduler
+from co_op_translator.utils.profiling_utils import profile_stage
+from co_op_translator.utils.translation_memory import LineTranslationMemory
+from co_op_translator.utils.image_text_batcher import ImageTextBatcher
+from co_op_translator.config.constants import CACHE_DIR_NAME, PREFILTER_CACHE_FILE, LINE_MEMORY_FILE
+from co_op_translator.utils.file_utils import generate_translated_filename, get_file_content_hash, get_output_image_extension, load_json_cache, save_json_cache
 
 logger = logging.getLogger(__name__)
 
 class ImageTranslator:
-    def __init__(self, default_output_dir='./translated_images', root_dir='.'):
+    def __init__(self, default_output_dir='./translated_images', root_dir='.', prefilter_mode='conservative', scheduler=None, ocr_backend=None):
         """
         Initialize the ImageTranslator with a default output directory.
 
         Args:
             default_output_dir (str): The default directory where translated images will be saved.
+                                      None for in-memory use, where nothing is written to disk.
+            root_dir (str): The root directory of the project. None keeps the prefilter cache in memory only.
+            prefilter_mode (str): Local no-text prefilter applied before OCR: 'off', 'conservative' or 'aggressive'.
+            scheduler (RequestScheduler, optional): The scheduler bounding OCR and chat requests in translate_image_async.
+                                                    If None, one is created from the configuration.
+            ocr_backend (str, optional): 'azure', 'local' or 'azure+local'. Defaults to OCR_BACKEND.
         """
+        self.scheduler = scheduler or RequestScheduler.from_config()
+        self.ocr_backend = get_ocr_backend(ocr_backend)
         self.text_translator = TextTranslator()
         self.font_config = FontConfig()
-        self.root_dir = Path(root_dir)
+        self.root_dir = Path(root_dir) if root_dir is not None else None
         self.default_output_dir = default_output_dir
-        os.makedirs(self.default_output_dir, exist_ok=True)
+        if self.default_output_dir is not None:
+            os.makedirs(self.default_output_dir, exist_ok=True)
+        self.prefilter_mode = prefilter_mode
+        self.prefilter_cache_path = self.root_dir / CACHE_DIR_NAME / PREFILTER_CACHE_FILE if self.root_dir is not None else None
+        self.prefilter_cache = load_json_cache(self.prefilter_cache_path) if self.prefilter_cache_path is not None else {}
+        # The prefilter cache is read and filled from worker threads, and shared by the jobs of a server
+        self.prefilter_lock = threading.Lock()
+        # Content hash per (path, mtime, size), so every language of an image reuses one hash
+        self._content_hashes = {}
+        # Translations of recognized lines per language, shared by all images of the project
+        self.line_memory = LineTranslationMemory(self.root_dir / CACHE_DIR_NAME / LINE_MEMORY_FILE if self.root_dir is not None else None)
+        # Lines of concurrently translated images are sent together; None sends one request per image
+        self.text_batcher = ImageTextBatcher(self.text_translator, self.scheduler) if Config.IMAGE_TEXT_BATCH_MAX_TOKENS > 0 else None
+
+    def may_contain_text(self, image_path):
+        """
+        Check locally whether an image may contain text, using cached results when available.
+
+        Args:
+            image_path (str): Path to the image file.
+
+        Returns:
+            bool: False if the image is known or estimated to be text-free.
+        """
+        if self.prefilter_mode == 'off':
+            return True
+        try:
+            content_hash = self.get_content_hash(image_path)
+        except OSError as e:
+            logger.warning(f"Text prefilter failed for {image_path}: {e}. Falling back to OCR.")
+            return True
+        return lookup_text_presence(image_path, self.prefilter_mode, self.prefilter_cache, content_hash, self.prefilter_lock)
 
-    def get_image_analysis_client(self):
+    def get_content_hash(self, image_path):
         """
-        Initialize and return an Image Analysis Client.
+        Return the content hash of an image file, hashing it only once while it is unchanged.
+
+        Args:
+            image_path (str): Path to the image file.
 
         Returns:
-            ImageAnalysisClient: The initialized client.
+            str: The SHA-256 hash of the file content.
+        """
+        image_path = Path(image_path).resolve()
+        stat = image_path.stat()
+        key = (image_path, stat.st_mtime_ns, stat.st_size)
+        with self.prefilter_lock:
+            content_hash = self._content_hashes.get(key)
+        if content_hash is None:
+            content_hash = get_file_content_hash(image_path)
+            with self.prefilter_lock:
+                self._content_hashes[key] = content_hash
+        return content_hash
+
+    def record_ocr_result(self, image_path, has_text):
         """
-        endpoint = Config.AZURE_AI_SERVICE_ENDPOINT
-        subscription_key = Config.AZURE_SUBSCRIPTION_KEY
-        return ImageAnalysisClient(endpoint, AzureKeyCredential(subscription_key))
+        Remember whether OCR found text in an image so later languages and runs can skip the remote call.
 
+        Args:
+            image_path (str): Path to the image file.
+            has_text (bool): Whether OCR recognized any text.
+        """
+        try:
+            self._record_ocr_result_by_hash(self.get_content_hash(image_path), has_text)
+        except OSError as e:
+            logger.warning(f"Could not record OCR result for {image_path}: {e}")
+
+    def _record_ocr_result_by_hash(self, content_hash, has_text):
+        with self.prefilter_lock:
+            self.prefilter_cache.setdefault(content_hash, {})['ocr'] = has_text
+
+    def save_prefilter_cache(self):
+        """
+        Persist the text prefilter cache under the project's cache directory.
+        """
+        if self.prefilter_cache_path is None:
+            return
+        # Copy under the lock, since worker threads of other jobs may be filling the cache
+        with self.prefilter_lock:
+            prefilter_cache = {content_hash: dict(entry) for content_hash, entry in self.prefilter_cache.items()}
+        if prefilter_cache:
+            save_json_cache(self.prefilter_cache_path, prefilter_cache)
+
+    def save_line_memory(self):
+        """
+        Persist the line translation memory under the project's cache directory.
+        """
+        self.line_memory.save()
+
+    @profile_stage
     def extract_line_bounding_boxes(self, image_path):
         """
-        Extract line bounding boxes from an image using Azure Analysis Client.
+        Extract line bounding boxes from an image using the OCR backend.
 
         Args:
             image_path (str): Path to the image file.
@@ -59,30 +159,49 @@ class ImageTranslator:
         Raises:
             Exception: If the OCR operation did not succeed.
         """
-        image_analysis_client = self.get_image_analysis_client()
-        with open(image_path, "rb") as image_stream:
-            image_data = image_stream.read()
-            result = image_analysis_client.analyze(
-                image_data=image_data,
-                visual_features=[VisualFeatures.READ],
-            )
+        image_data, scale = prepare_image_for_ocr(image_path, Config.OCR_MAX_IMAGE_EDGE, Config.OCR_UPLOAD_JPEG_QUALITY)
+        line_bounding_boxes = self._read_lines(image_data, scale)
+        self.record_ocr_result(image_path, bool(line_bounding_boxes))
+        if line_bounding_boxes is None:
+            raise Exception("No text was recognized in the image.")
+        return line_bounding_boxes
 
-        if result.read is not None and result.read.blocks:
-            line_bounding_boxes = []
-            for line in result.read.blocks[0].lines:
-                bounding_box = []
-                for point in line.bounding_polygon:
-                    bounding_box.append(point.x)
-                    bounding_box.append(point.y)
-                line_bounding_boxes.append({
-                    "text": line.text,
-                    "bounding_box": bounding_box,
-                    "confidence": line.words[0].confidence if line.words else None
-                })
-            return line_bounding_boxes
-        else:
+    @profile_stage
+    def extract_line_bounding_boxes_from_bytes(self, image_bytes, content_hash):
+        """
+        Extract line bounding boxes from an image held in memory. See extract_line_bounding_boxes.
+
+        Args:
+            image_bytes (bytes): The encoded image.
+            content_hash (str): The hash of the image, used to remember the OCR result.
+
+        Returns:
+            list: List of dictionaries containing text, bounding box coordinates, and confidence scores.
+
+        Raises:
+            Exception: If the OCR operation did not succeed.
+        """
+        image_data, scale = prepare_image_bytes_for_ocr(image_bytes, Config.OCR_MAX_IMAGE_EDGE, Config.OCR_UPLOAD_JPEG_QUALITY)
+        line_bounding_boxes = self._read_lines(image_data, scale)
+        self._record_ocr_result_by_hash(content_hash, bool(line_bounding_boxes))
+        if line_bounding_boxes is None:
             raise Exception("No text was recognized in the image.")
+        return line_bounding_boxes
+
+    def _read_lines(self, image_data, scale):
+        """
+        Recognize the lines of an OCR upload with the OCR backend and return them in original-resolution
+        coordinates, or None if no text was recognized.
+        """
+        line_bounding_boxes = self.ocr_backend.read_lines(image_data)
+        if line_bounding_boxes is None:
+            return None
+
+        for line in line_bounding_boxes:
+            line["bounding_box"] = rescale_bounding_box(line["bounding_box"], scale)
+        return line_bounding_boxes
 
+    @profile_stage
     def plot_annotated_image(self, image_path, line_bounding_boxes, translated_text_list, target_language_code, destination_path=None):
         """
         Plot annotated image with translated text.
@@ -99,8 +218,41 @@ class ImageTranslator:
         """
         # Load the image with the appropriate mode
         mode = get_image_mode(image_path)
-        image = Image.open(image_path).convert(mode)
-        
+        image = self.annotate_image(Image.open(image_path).convert(mode), line_bounding_boxes, translated_text_list, target_language_code)
+
+        actual_image_path = Path(image_path).resolve()
+
+        # Generate the new filename based on the original file name, hash, and language code
+        new_filename = generate_translated_filename(actual_image_path, target_language_code, self.root_dir)
+
+        logger.info(f"Resolved image path in plot_annotated_image: {actual_image_path}")
+
+        # Determine the output path using pathlib
+        if destination_path is None:
+            output_path = Path(self.default_output_dir) / new_filename
+        else:
+            output_path = Path(destination_path) / new_filename
+
+        # Save the annotated image to the determined output path with the configured encoder settings
+        save_image(image, output_path)
+
+        # Return the path to the annotated image
+        return str(output_path)
+
+    def annotate_image(self, image, line_bounding_boxes, translated_text_list, target_language_code):
+        """
+        Draw the translated text over the recognized lines of an image.
+
+        Args:
+            image (PIL.Image.Image): The image, in RGBA (PNG) or RGB (JPEG) mode.
+            line_bounding_boxes (list): List of bounding boxes and text data.
+            translated_text_list (list): List of translated texts.
+            target_language_code (str): The language of the translated texts, which selects the font.
+
+        Returns:
+            PIL.Image.Image: The annotated image.
+        """
+        mode = image.mode
         font_size = 40
         font_path = self.font_config.get_font_path(target_language_code)
         font = ImageFont.truetype(font_path, font_size)
@@ -116,51 +268,39 @@ class ImageTranslator:
             # Create a mask to fill the bounding box area with the background color
             mask_image = create_filled_polygon_mask(bounding_box, image.size, bg_color)
 
-            if mode == 'RGBA':
-                # Composite the mask onto the image to fill the bounding box (for PNG images)
-                image = Image.alpha_composite(image, mask_image)
-            else:
-                # Convert image to RGBA (if it's not already in RGBA mode)
-                image = image.convert('RGBA')
-                mask_image = mask_image.convert('RGBA')
-
-                # Use alpha_composite to overlay mask_image onto the original image
-                image = Image.alpha_composite(image, mask_image)
-
             # Draw the translated text onto a temporary image
             text_image = draw_text_on_image(translated_text, font, text_color)
 
             # Convert the text image to an array and warp it to fit the bounding box
             text_image_array = np.array(text_image)
             warped_text_image = warp_image_to_bounding_box(text_image_array, bounding_box, image.width, image.height)
-
-            # Convert the warped text image back to PIL format and paste it onto the original image
             warped_text_image_pil = Image.fromarray(warped_text_image)
-            image = Image.alpha_composite(image, warped_text_image_pil)
-        
-        actual_image_path = Path(image_path).resolve()
 
-        # Generate the new filename based on the original file name, hash, and language code
-        new_filename = generate_translated_filename(actual_image_path, target_language_code, self.root_dir)
+            if mode == 'RGBA':
+                # Composite the mask and the text onto the image (for PNG images)
+                image = Image.alpha_composite(image, mask_image)
+                image = Image.alpha_composite(image, warped_text_image_pil)
+            else:
+                # Opaque images are blended in place using the overlays' alpha, without an RGBA round-trip
+                image.paste(mask_image, (0, 0), mask_image)
+                image.paste(warped_text_image_pil, (0, 0), warped_text_image_pil)
 
-        logger.info(f"Resolved image path in plot_annotated_image: {actual_image_path}")
+        return image
 
-        # Determine the output path using pathlib
-        if destination_path is None:
-            output_path = Path(self.default_output_dir) / new_filename
-        else:
-            output_path = Path(destination_path) / new_filename
-
-        # Save the annotated image to the determined output path
-        if mode == 'RGBA':
-            image.save(output_path)
-        else:
-            image = image.convert("RGB")  # Ensure JPG compatibility
-            image.save(output_path, format="JPEG")
+    def _get_output_path(self, image_path, target_language_code, destination_path=None):
+        """
+        Return the path of the translated image for the given language.
+        """
+        new_filename = generate_translated_filename(Path(image_path).resolve(), target_language_code, self.root_dir)
+        return Path(destination_path or self.default_output_dir) / new_filename
 
-        # Return the path to the annotated image
-        return str(output_path)
+    def _save_original_image(self, image_path, output_path):
+        """
+        Save the original image under the translated filename, without re-encoding it.
+        """
+        return save_untranslated_image(image_path, output_path)
 
+    @profile_stage
     def translate_image(self, image_path, target_language_code, destination_path=None):
         """
         Translate text in an image and return the image annotated with the translated text.
@@ -175,30 +315,20 @@ class ImageTranslator:
             str: The path to the annotated image, or the original image saved as a new file in case of errors.
         """
         image_path = Path(image_path)
+        output_path = self._get_output_path(image_path, target_language_code, destination_path)
+
+        if not self.may_contain_text(image_path):
+            logger.info(f"No text expected in {image_path}. Copying the original image without OCR.")
+            return self._save_original_image(image_path, output_path)
 
         try:
             # Extract text and bounding boxes from the image
             line_bounding_boxes = self.extract_line_bounding_boxes(image_path)
 
-            # Generate the new filename based on the original file name, hash, and language code
-            actual_image_path = Path(image_path).resolve()
-            new_filename = generate_translated_filename(actual_image_path, target_language_code, self.root_dir)
-
-            # Determine the output path using pathlib
-            if destination_path is None:
-                output_path = Path(self.default_output_dir) / new_filename
-            else:
-                output_path = Path(destination_path) / new_filename
-
             # Check if any text was recognized
             if not line_bounding_boxes:
                 logger.info(f"No text was recognized in the image: {image_path}. Saving the original image as the translated image.")
-                
-                # Load the original image and save it with the new name
-                original_image = Image.open(image_path)
-                original_image.save(output_path)
-                
-                return str(output_path)  # Return the new image path with original content
+                return self._save_original_image(image_path, output_path)
 
             # Extract the text data from the bounding boxes
             text_data = [line['text'] for line in line_bounding_boxes]
@@ -207,20 +337,145 @@ class ImageTranslator:
             target_language_name = self.font_config.get_language_name(target_language_code)
             
             # Translate the text data into the target language
-            translated_text_list = self.text_translator.translate_image_text(text_data, target_language_name)
+            translated_text_list = self.text_translator.translate_image_text(text_data, target_language_name, self.line_memory)
             
             # Annotate the image with the translated text and save the result
             return self.plot_annotated_image(image_path, line_bounding_boxes, translated_text_list, target_language_code, destination_path)
 
         except Exception as e:
             logger.error(f"Failed to translate image {image_path} due to an error: {e}. Saving the original image instead.")
+            return self._save_original_image(image_path, output_path)
 
-            # Load the original image and save it with the new name
-            actual_image_path = Path(image_path).resolve()
-            new_filename = generate_translated_filename(actual_image_path, target_language_code, self.root_dir)
-            output_path = Path(self.default_output_dir) / new_filename
+    async def _translate_lines_async(self, text_data, target_language_code):
+        """
+        Translate recognized lines, taking a chat slot only when some lines are not in the line memory.
 
-            original_image = Image.open(image_path)
-            original_image.save(output_path)
-            
-            return str(output_path)  # Return the path to the original image with the new name
+        With batching enabled, the missing lines are sent together with the lines of other images;
+        lines the batched answer missed are retried in a request of their own.
+        """
+        target_language_name = self.font_config.get_language_name(target_language_code)
+        known_lines = self.line_memory.lookup(text_data, target_language_name)
+        if None not in known_lines:
+            logger.info(f"All {len(text_data)} lines are in the translation memory. Skipping the request.")
+            return known_lines
+
+        if self.text_batcher is None:
+            async with self.scheduler.slot('chat', target_language_code):
+                return await asyncio.to_thread(self.text_translator.translate_image_text, text_data, target_language_name, self.line_memory)
+
+        missing_lines = [line for line, translated_line in zip(text_data, known_lines) if translated_line is None]
+        batched_lines = await self.text_batcher.translate(missing_lines, target_language_code, target_language_name)
+        answered = [(line, translated_line) for line, translated_line in zip(missing_lines, batched_lines) if translated_line is not None]
+        if answered:
+            self.line_memory.store(*zip(*answered), target_language_name)
+
+        unanswered_lines = [line for line, translated_line in zip(missing_lines, batched_lines) if translated_line is None]
+        if unanswered_lines:
+            logger.warning(f"The batched answer missed {len(unanswered_lines)} lines. Translating them separately.")
+            async with self.scheduler.slot('chat', target_language_code):
+                retried_lines = await asyncio.to_thread(self.text_translator.translate_image_text, unanswered_lines, target_language_name, self.line_memory)
+            retried_lines = iter(retried_lines)
+            batched_lines = [translated_line if translated_line is not None else next(retried_lines, None) for translated_line in batched_lines]
+
+        # Lines still without a translation are drawn as recognized
+        batched_lines = iter(batched_lines)
+        return [
+            translated_line if translated_line is not None else next(batched_lines) or line
+            for line, translated_line in zip(text_data, known_lines)
+        ]
+
+    @profile_stage
+    async def translate_image_async(self, image_path, target_language_code, destination_path=None):
+        """
+        Translate an image like translate_image, without blocking the event loop.
+
+        The OCR and chat requests each hold a slot of the scheduler's 'ocr' and 'chat' pools;
+        local work (prefiltering, rendering, saving) runs in worker threads outside any pool.
+
+        Args:
+            image_path (str): Path to the image file.
+            target_language_code (str): The language to translate the text into.
+            destination_path (str, optional): The path to save the translated image.
+                                            If None, save in default location (./translated_images/).
+
+        Returns:
+            str: The path to the annotated image, or the original image saved as a new file in case of errors.
+        """
+        image_path = Path(image_path)
+        output_path = self._get_output_path(image_path, target_language_code, destination_path)
+
+        if not await asyncio.to_thread(self.may_contain_text, image_path):
+            logger.info(f"No text expected in {image_path}. Copying the original image without OCR.")
+            return await asyncio.to_thread(self._save_original_image, image_path, output_path)
+
+        try:
+            async with self.scheduler.slot('ocr', target_language_code):
+                line_bounding_boxes = await asyncio.to_thread(self.extract_line_bounding_boxes, image_path)
+
+            if not line_bounding_boxes:
+                logger.info(f"No text was recognized in the image: {image_path}. Saving the original image as the translated image.")
+                return await asyncio.to_thread(self._save_original_image, image_path, output_path)
+
+            text_data = [line['text'] for line in line_bounding_boxes]
+            translated_text_list = await self._translate_lines_async(text_data, target_language_code)
+
+            return await asyncio.to_thread(
+                self.plot_annotated_image, image_path, line_bounding_boxes, translated_text_list, target_language_code, destination_path
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to translate image {image_path} due to an error: {e}. Saving the original image instead.")
+            return await asyncio.to_thread(self._save_original_image, image_path, output_path)
+
+    @profile_stage
+    async def translate_image_bytes_async(self, image_bytes, target_language_code):
+        """
+        Translate an image held in memory, like translate_image_async but without touching disk.
+
+        The prefilter and OCR results are remembered by content hash, so the other languages
+        of the same image skip them.
+
+        Args:
+            image_bytes (bytes): The encoded PNG or JPEG image.
+            target_language_code (str): The language to translate the text into.
+
+        Returns:
+            bytes: The encoded annotated image, or the original image if it has no text or translation failed.
+                   Encoded as WebP when IMAGE_OUTPUT_FORMAT is 'webp', otherwise in the source format.
+        """
+        source_extension = get_image_bytes_extension(image_bytes)
+        output_extension = get_output_image_extension(source_extension)
+        content_hash = hashlib.sha256(image_bytes).hexdigest()
+
+        def untranslated():
+            if output_extension == source_extension:
+                return image_bytes
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                return encode_image(image.convert('RGBA' if source_extension == '.png' else 'RGB'), output_extension)
+
+        if not await asyncio.to_thread(lookup_text_presence, io.BytesIO(image_bytes), self.prefilter_mode, self.prefilter_cache, content_hash, self.prefilter_lock):
+            logger.info("No text expected in the image. Returning the original image without OCR.")
+            return await asyncio.to_thread(untranslated)
+
+        try:
+            async with self.scheduler.slot('ocr', target_language_code):
+                line_bounding_boxes = await asyncio.to_thread(self.extract_line_bounding_boxes_from_bytes, image_bytes, content_hash)
+
+            if not line_bounding_boxes:
+                logger.info("No text was recognized in the image. Returning the original image.")
+                return await asyncio.to_thread(untranslated)
+
+            text_data = [line['text'] for line in line_bounding_boxes]
+            translated_text_list = await self._translate_lines_async(text_data, target_language_code)
+
+            def render():
+                with Image.open(io.BytesIO(image_bytes)) as image:
+                    image = image.convert('RGBA' if source_extension == '.png' else 'RGB')
+                annotated_image = self.annotate_image(image, line_bounding_boxes, translated_text_list, target_language_code)
+                return encode_image(annotated_image, output_extension)
+
+            return await asyncio.to_thread(render)
+
+        except Exception as e:
+            logger.error(f"Failed to translate image due to an error: {e}. Returning the original image instead.")
+            return await asyncio.to_thread(untranslated)
@@ -0,0 +1,421 @@
+"""
+This module contains the translation job server started with `translate --serve`.
+
+A single long-running process accepts translation jobs over a local HTTP API and runs them
+with one shared request scheduler, one set of warm clients and connection pools, and shared
+in-memory caches, so many repositories and users can share one quota.
+
+Endpoints (JSON in and out):
+    POST /jobs          Submit a job. Returns {"id", "status"} with status 202.
+    GET  /jobs          List all jobs without results.
+    GET  /jobs/<id>     Job status, progress, metrics and, for payload jobs, results.
+    GET  /metrics       Scheduler load and job counts.
+
+The server listens on loopback addresses only, unless SERVE_TOKEN is set; every request must
+then carry the header "Authorization: Bearer <SERVE_TOKEN>".
+"""
+
+import asyncio
+import base64
+import hmac
+import ipaddress
+import json
+import logging
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from pathlib import Path
+from co_op_translator.config.base_config import Config
+from co_op_translator.config.constants import SERVE_MAX_REQUEST_BYTES, SERVE_JOB_HISTORY, SERVE_TRANSLATOR_CACHE_SIZE
+from co_op_translator.translators.memory_translator import MemoryTranslator
+from co_op_translator.translators.project_translator import ProjectTranslator
+from co_op_translator.utils.ocr_backends import OCR_BACKENDS
+from co_op_translator.utils.request_scheduler import RequestScheduler, track_requests
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PREFILTER_MODES = ('off', 'conservative', 'aggressive')
+PROJECT_FLAG_OPTIONS = ('images', 'markdown', 'update', 'multi_target', 'perceptual_dedup')
+
+def is_loopback_host(host):
+    """
+    Check whether a listen address only accepts connections from this machine.
+    """
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+class TranslationJob:
+    def __init__(self, job_id, spec):
+        """
+        Initialize a job from its submitted specification.
+
+        A project job has a 'root_dir' and translates a repository on disk like the CLI, with the
+        options 'images', 'markdown', 'update', 'since', 'multi_target', 'perceptual_dedup',
+        'image_prefilter', 'ocr_backend' and 'priority'. A payload job has 'documents' (markdown strings or
+        {"key", "content"} objects) and/or 'image_data' ({"key", "data"} objects with base64 data)
+        and returns its results in the job status.
+
+        Args:
+            job_id (str): The job identifier.
+            spec (dict): The submitted job.
+
+        Raises:
+            ValueError: If the specification is invalid.
+        """
+        language_codes = spec.get('language_codes')
+        if isinstance(language_codes, str):
+            language_codes = language_codes.split()
+        if not language_codes or not all(isinstance(language_code, str) for language_code in language_codes):
+            raise ValueError("'language_codes' must be a non-empty list or space-separated string of language codes")
+
+        self.kind = 'project' if 'root_dir' in spec else 'payload'
+        if self.kind == 'payload' and not spec.get('documents') and not spec.get('image_data'):
+            raise ValueError("A job needs a 'root_dir', 'documents' or 'image_data'")
+
+        for field, content_field in (('documents', 'content'), ('image_data', 'data')):
+            items = spec.get(field)
+            if items is None:
+                continue
+            if not isinstance(items, list) or not all(
+                (field == 'documents' and isinstance(item, str))
+                or (isinstance(item, dict) and isinstance(item.get('key'), str) and isinstance(item.get(content_field), str))
+                for item in items
+            ):
+                allowed = 'markdown strings or ' if field == 'documents' else ''
+                raise ValueError(f"'{field}' must be a list of {allowed}{{\"key\", \"{content_field}\"}} objects")
+            if field == 'image_data':
+                for item in items:
+                    try:
+                        base64.b64decode(item['data'], validate=True)
+                    except ValueError:
+                        raise ValueError(f"'image_data' item '{item['key']}' is not valid base64")
+
+        self.priority_patterns = ()
+        if self.kind == 'project':
+            if not isinstance(spec['root_dir'], str) or not spec['root_dir']:
+                raise ValueError("'root_dir' must be the path of a directory")
+            for option in PROJECT_FLAG_OPTIONS:
+                if not isinstance(spec.get(option, False), bool):
+                    raise ValueError(f"'{option}' must be true or false")
+            if spec.get('image_prefilter', 'conservative') not in IMAGE_PREFILTER_MODES:
+                raise ValueError(f"'image_prefilter' must be one of {', '.join(IMAGE_PREFILTER_MODES)}")
+            if spec.get('ocr_backend') is not None and spec['ocr_backend'] not in OCR_BACKENDS:
+                raise ValueError(f"'ocr_backend' must be one of {', '.join(OCR_BACKENDS)}")
+            if spec.get('since') is not None and not isinstance(spec['since'], str):
+                raise ValueError("'since' must be a git ref")
+            # A single pattern may be given as a string, like one --priority option
+            priority = spec.get('priority', [])
+            if isinstance(priority, str):
+                priority = [priority]
+            if not isinstance(priority, list) or not all(isinstance(pattern, str) for pattern in priority):
+                raise ValueError("'priority' must be a glob pattern or a list of glob patterns")
+            self.priority_patterns = tuple(priority)
+
+        self.id = job_id
+        self.spec = spec
+        self.language_codes = language_codes
+        self.status = 'queued'
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {}
+        # Request counts and queueing time of this job, filled by the shared scheduler
+        self.metrics = {}
+        self.results = []
+        self.translator = None
+
+    def get_progress(self):
+        if self.translator is not None:
+            return {
+                description: {'done': counter.n, 'total': counter.total}
+                for description, counter in self.translator.progress.items()
+            }
+        return self.progress
+
+    def to_dict(self, include_results=False):
+        finished_at = self.finished_at or time.time()
+        job = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'language_codes': self.language_codes,
+            'error': self.error,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'queued_seconds': (self.started_at or finished_at) - self.submitted_at,
+            'run_seconds': finished_at - self.started_at if self.started_at else 0.0,
+            'progress': self.get_progress(),
+            'metrics': self.metrics,
+        }
+        if include_results and self.kind == 'payload':
+            job['results'] = self.results
+        return job
+
+class TranslationJobServer:
+    def __init__(self, host, port, max_concurrent_jobs=None):
+        """
+        Initialize the server and warm up the shared translators.
+
+        Args:
+            host (str): The address to listen on.
+            port (int): The port to listen on.
+            max_concurrent_jobs (int, optional): Jobs running at once. Defaults to SERVE_MAX_CONCURRENT_JOBS.
+
+        Raises:
+            ValueError: If the host is not a loopback address and SERVE_TOKEN is not set.
+        """
+        self.token = Config.SERVE_TOKEN
+        if not self.token and not is_loopback_host(host):
+            raise ValueError(f"Refusing to serve on {host} without authentication. Set SERVE_TOKEN or listen on a loopback address.")
+        Config.check_configuration()
+        self.host = host
+        self.port = port
+        self.max_concurrent_jobs = max_concurrent_jobs or Config.SERVE_MAX_CONCURRENT_JOBS
+        # One scheduler bounds the requests of every job, so concurrent jobs share the quota fairly
+        self.scheduler = RequestScheduler.from_config()
+        self.memory_translator = MemoryTranslator(scheduler=self.scheduler)
+        # Warm project translators by root directory and options, most recently used last
+        self.project_translators = OrderedDict()
+        # Jobs on the same project run one after another, so they never write the same outputs at once
+        self.project_locks = {}
+        self.jobs = {}
+        self._next_job_id = 1
+        self._job_queue = None
+        self.started_at = time.time()
+
+    async def serve_forever(self):
+        """
+        Listen for HTTP requests and run submitted jobs until cancelled.
+        """
+        self._job_queue = asyncio.Queue()
+        runners = [asyncio.create_task(self._run_jobs()) for _ in range(self.max_concurrent_jobs)]
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"Serving translation jobs on http://{self.host}:{self.port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for runner in runners:
+                runner.cancel()
+
+    def submit_job(self, spec):
+        """
+        Validate a job and queue it.
+
+        Args:
+            spec (dict): The job specification (see TranslationJob).
+
+        Returns:
+            TranslationJob: The queued job.
+        """
+        job = TranslationJob(str(self._next_job_id), spec)
+        self._next_job_id += 1
+        self.jobs[job.id] = job
+        self._job_queue.put_nowait(job)
+        self._prune_jobs()
+        logger.info(f"Queued {job.kind} job {job.id} for {', '.join(job.language_codes)}")
+        return job
+
+    def _prune_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ('succeeded', 'failed')]
+        for job_id in finished[:max(0, len(finished) - SERVE_JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+    def get_metrics(self):
+        """
+        Return the scheduler load and the number of jobs in each state.
+        """
+        job_counts = {}
+        for job in self.jobs.values():
+            job_counts[job.status] = job_counts.get(job.status, 0) + 1
+        return {
+            'uptime_seconds': time.time() - self.started_at,
+            'max_concurrent_jobs': self.max_concurrent_jobs,
+            'jobs': job_counts,
+            'scheduler': self.scheduler.get_status(),
+        }
+
+    async def _run_jobs(self):
+        while True:
+            job = await self._job_queue.get()
+            try:
+                # A task per job gives it its own context, so its requests are counted separately
+                await asyncio.create_task(self._run_job(job))
+            finally:
+                self._job_queue.task_done()
+
+    async def _run_job(self, job):
+        track_requests(job.metrics)
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            if job.kind == 'project':
+                await self._run_project_job(job)
+            else:
+                await self._run_payload_job(job)
+            job.status = 'succeeded'
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            logger.info(f"Job {job.id} {job.status} in {job.finished_at - job.started_at:.1f}s")
+
+    async def _get_project_translator(self, job, root_dir):
+        """
+        Return a warm translator for the job's project and options, creating it on first use.
+        """
+        spec = job.spec
+        options = {
+            'perceptual_dedup': spec.get('perceptual_dedup', False),
+            'image_prefilter': spec.get('image_prefilter', 'conservative'),
+            'priority_patterns': job.priority_patterns,
+            'multi_target': spec.get('multi_target', False),
+            'ocr_backend': spec.get('ocr_backend'),
+        }
+        key = (root_dir, tuple(job.language_codes), *options.values())
+        translator = self.project_translators.get(key)
+        if translator is not None:
+            self.project_translators.move_to_end(key)
+            # Outputs may have changed on disk since the previous job
+            await asyncio.to_thread(translator.output_index.refresh)
+            return translator
+
+        translator = await asyncio.to_thread(
+            ProjectTranslator, " ".join(job.language_codes), root_dir, scheduler=self.scheduler, show_progress=False, **options
+        )
+        self.project_translators[key] = translator
+        while len(self.project_translators) > SERVE_TRANSLATOR_CACHE_SIZE:
+            self.project_translators.popitem(last=False)
+        return translator
+
+    async def _run_project_job(self, job):
+        spec = job.spec
+        root_dir = Path(spec['root_dir']).resolve()
+        if not root_dir.is_dir():
+            raise ValueError(f"'root_dir' {root_dir} is not a directory")
+
+        async with self.project_locks.setdefault(root_dir, asyncio.Lock()):
+            translator = await self._get_project_translator(job, root_dir)
+            translator.progress = {}
+            job.translator = translator
+            try:
+                images = spec.get('images', False)
+                markdown = spec.get('markdown', False)
+                if spec.get('since'):
+                    await translator._run(translator.translate_since_async(spec['since'], images=images, markdown=markdown))
+                else:
+                    await translator._run(translator.translate_project_async(images=images, markdown=markdown, update=spec.get('update', False)))
+            finally:
+                # The translator is reused by later jobs; keep this job's final progress
+                job.progress = job.get_progress()
+                job.translator = None
+
+    async def _run_payload_job(self, job):
+        spec = job.spec
+        documents = [
+            (document['key'], document['content']) if isinstance(document, dict) else document
+            for document in spec.get('documents') or []
+        ]
+        images = [(image['key'], base64.b64decode(image['data'])) for image in spec.get('image_data') or []]
+
+        job.progress = {}
+        if documents:
+            progress = job.progress['Translating documents'] = {'done': 0, 'total': len(documents) * len(job.language_codes)}
+            async for result in self.memory_translator.translate_markdown_documents(documents, job.language_codes):
+                job.results.append({'type': 'document', **result})
+                progress['done'] += 1
+        if images:
+            progress = job.progress['Translating images'] = {'done': 0, 'total': len(images) * len(job.language_codes)}
+            async for result in self.memory_translator.translate_images(images, job.language_codes):
+                content = result['content']
+                job.results.append({'type': 'image', **result, 'content': base64.b64encode(content).decode('ascii') if content else None})
+                progress['done'] += 1
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            status, payload = await self._handle_request(reader)
+        except Exception as e:
+            logger.error(f"Failed to handle request: {e}")
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + body
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader):
+        """
+        Read one HTTP request and route it.
+
+        Returns:
+            tuple: (HTTPStatus, JSON-serializable payload).
+        """
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            return HTTPStatus.BAD_REQUEST, {'error': 'Malformed request line'}
+        method, path, _ = request_line
+
+        headers = {}
+        while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            content_length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            return HTTPStatus.BAD_REQUEST, {'error': 'Content-Length must be a non-negative integer'}
+        if content_length > SERVE_MAX_REQUEST_BYTES:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': f'Request bodies are limited to {SERVE_MAX_REQUEST_BYTES} bytes'}
+        body = await reader.readexactly(content_length) if content_length else b''
+
+        if self.token and not hmac.compare_digest(headers.get('authorization', '').encode(), f"Bearer {self.token}".encode()):
+            return HTTPStatus.UNAUTHORIZED, {'error': 'Missing or invalid bearer token'}
+
+        path = path.split('?', 1)[0].rstrip('/')
+        if path == '/jobs' and method == 'POST':
+            try:
+                spec = json.loads(body or b'{}')
+                if not isinstance(spec, dict):
+                    raise ValueError('The job must be a JSON object')
+                job = self.submit_job(spec)
+            except ValueError as e:
+                return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+            return HTTPStatus.ACCEPTED, {'id': job.id, 'status': job.status}
+        if path == '/jobs' and method == 'GET':
+            return HTTPStatus.OK, {'jobs': [job.to_dict() for job in self.jobs.values()]}
+        if path.startswith('/jobs/') and method == 'GET':
+            job = self.jobs.get(path[len('/jobs/'):])
+            if job is None:
+                return HTTPStatus.NOT_FOUND, {'error': 'Unknown job'}
+            return HTTPStatus.OK, job.to_dict(include_results=True)
+        if path == '/metrics' and method == 'GET':
+            return HTTPStatus.OK, self.get_metrics()
+        if path in ('/jobs', '/metrics') or path.startswith('/jobs/'):
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f'{method} is not allowed on {path}'}
+        return HTTPStatus.NOT_FOUND, {'error': f'Unknown path {path}'}
+
+    def run(self):
+        """
+        Public method to start the server. Runs until interrupted.
+        """
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            logger.info("Job server stopped.")
@@ -2,142 +2,282 @@ import asyncio
 import logging
 from pathlib import Path
 from semantic_kernel import Kernel
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
 from semantic_kernel.prompt_template.prompt_template_config import PromptTemplateConfig
-from co_op_translator.utils.markdown_utils import process_markdown, update_links, generate_prompt_template, count_links_in_markdown, process_markdown_with_many_links
+from co_op_translator.utils.markdown_utils import (
+    update_links,
+    generate_prompt_template,
+    generate_disclaimer_prompt,
+    chunk_markdown_document,
+    generate_multi_language_prompt_template,
+    split_multi_language_response,
+    get_language_group_size,
+    count_tokens,
+    get_tokenizer,
+)
+from co_op_translator.config.constants import MARKDOWN_MAX_OUTPUT_TOKENS, MULTI_TARGET_MAX_LANGUAGES, CACHE_DIR_NAME, EXPANSION_RATIO_FILE
 from co_op_translator.config.base_config import Config
 from co_op_translator.config.font_config import FontConfig
+from co_op_translator.utils.client_utils import get_chat_completion_service
+from co_op_translator.utils.request_scheduler import RequestScheduler
+from co_op_translator.utils.expansion_utils import ExpansionRatios
+from co_op_translator.utils.model_router import ModelRouter, call_with_fallback, TASK_MARKDOWN, TASK_DISCLAIMER
+from co_op_translator.utils.profiling_utils import profile_stage
 import time
 
 logger = logging.getLogger(__name__)
 
 class MarkdownTranslator:
-    def __init__(self, root_dir):
+    def __init__(self, root_dir, scheduler=None):
         """
         Initialize the MarkdownTranslator with the root directory.
 
         Args:
             root_dir (Path): The root directory of the project.
+            scheduler (RequestScheduler, optional): The scheduler bounding chat requests.
+                                                    If None, one is created from the configuration.
         """
+        Config.check_configuration()
         self.root_dir = root_dir
+        self.scheduler = scheduler or RequestScheduler.from_config()
+        self.router = ModelRouter.from_config()
         self.kernel = self._initialize_kernel()
         self.font_config = FontConfig()
+        self._tokenizer = None
+        # Output/input token ratios per language size the chunks, learned per project
+        self.expansion_ratios = ExpansionRatios(Path(root_dir) / CACHE_DIR_NAME / EXPANSION_RATIO_FILE if root_dir is not None else None)
+        # Latency tracker per deployment, used for hedging
+        self.latency_trackers = {}
 
     def _initialize_kernel(self):
         """
-        Initialize the semantic kernel with Azure OpenAI service.
+        Initialize the semantic kernel with an Azure OpenAI service for every deployment requests can be routed to.
 
         Returns:
             Kernel: Initialized semantic kernel.
         """
         kernel = Kernel()
-        service_id = "chat-gpt"
-
-        kernel.add_service(
-            AzureChatCompletion(
-                service_id=service_id,
-                deployment_name=Config.AZURE_OPENAI_CHAT_DEPLOYMENT_NAME,
-                endpoint=Config.AZURE_OPENAI_ENDPOINT,
-                api_key=Config.AZURE_OPENAI_API_KEY,
-            )
-        )
+        for deployment in self.router.deployments:
+            kernel.add_service(get_chat_completion_service(self._get_service_id(deployment), deployment))
         return kernel
 
-    async def translate_markdown(self, document: str, language_code: str, md_file_path: str | Path) -> str:
+    def _get_service_id(self, deployment):
+        # The default deployment keeps its historical service id
+        return "chat-gpt" if deployment == self.router.default_deployment else f"chat-gpt-{deployment}"
+
+    @profile_stage
+    async def translate_markdown(self, document: str, language_code: str, md_file_path: str | Path | None) -> str:
         """
         Translate the markdown document to the specified language, handling documents with more than 10 links by splitting them into chunks.
 
         Args:
             document (str): The content of the markdown file.
             language_code (str): The target language code.
-            md_file_path (str | Path): The file path of the markdown file.
+            md_file_path (str | Path | None): The file path of the markdown file.
+                                              If None (in-memory documents), links are left unchanged.
 
         Returns:
             str: The translated content with updated links and a disclaimer appended.
         """
-        md_file_path = Path(md_file_path)
-        link_limit = 30
-
-        if count_links_in_markdown(document) > link_limit:
-            logger.info(f"Document contains more than {link_limit} links, splitting the document into chunks.")
-            document_chunks = process_markdown_with_many_links(document, link_limit)
-        else:
-            logger.info(f"Document contains {link_limit} or fewer links, processing normally.")
-            document_chunks = process_markdown(document)
+        document_chunks = chunk_markdown_document(document, max_tokens=self.expansion_ratios.get_chunk_token_budget(language_code))
 
         prompts = [generate_prompt_template(language_code, chunk, self.font_config.is_rtl(language_code)) for chunk in document_chunks]
 
-        results = await self._run_prompts(prompts)
+        results = await self._run_prompts(prompts, language_code)
+        self._record_expansion(language_code, document_chunks, results)
         translated_content = "\n".join(results)
 
-        updated_content = update_links(md_file_path, translated_content, language_code, self.root_dir)
+        updated_content = self._update_links(md_file_path, translated_content, language_code)
 
         disclaimer = await self.generate_disclaimer(language_code)
         updated_content += "\n\n" + disclaimer
 
         return updated_content
 
-    async def _run_prompts(self, prompts):
+    @profile_stage
+    async def translate_markdown_multi(self, document: str, language_codes: list, md_file_path: str | Path | None) -> dict:
         """
-        Run the translation prompts asynchronously.
+        Translate the markdown document into several languages, asking for as many languages per request
+        as the output token limit allows for each chunk.
+
+        Args:
+            document (str): The content of the markdown file.
+            language_codes (list): The target language codes.
+            md_file_path (str | Path | None): The file path of the markdown file.
+                                              If None (in-memory documents), links are left unchanged.
+
+        Returns:
+            dict: Mapping of language code to translated content with updated links and a disclaimer appended.
+        """
+        # Chunks are shared between the languages, so they are sized for the most expanding one
+        document_chunks = chunk_markdown_document(document, max_tokens=self.expansion_ratios.get_chunk_token_budget(language_codes))
+
+        chunk_results = await asyncio.gather(
+            *(self._translate_chunk_multi(chunk, language_codes, i+1, len(document_chunks)) for i, chunk in enumerate(document_chunks))
+        )
+        disclaimers = await asyncio.gather(*(self.generate_disclaimer(language_code) for language_code in language_codes))
+
+        translations = {}
+        for language_code, disclaimer in zip(language_codes, disclaimers):
+            self._record_expansion(language_code, document_chunks, [chunk_result[language_code] for chunk_result in chunk_results])
+            translated_content = "\n".join(chunk_result[language_code] for chunk_result in chunk_results)
+            updated_content = self._update_links(md_file_path, translated_content, language_code)
+            translations[language_code] = updated_content + "\n\n" + disclaimer
+
+        return translations
+
+    def _get_tokenizer(self):
+        if self._tokenizer is None:
+            self._tokenizer = get_tokenizer('o200k_base')
+        return self._tokenizer
+
+    def _record_expansion(self, language_code, chunks, translated_chunks):
+        """
+        Learn the language's output/input token ratio from translated chunks.
+        """
+        tokenizer = self._get_tokenizer()
+        for chunk, translated_chunk in zip(chunks, translated_chunks):
+            self.expansion_ratios.record(language_code, count_tokens(chunk, tokenizer), count_tokens(translated_chunk, tokenizer))
+
+    def save_expansion_ratios(self):
+        """
+        Persist the learned expansion ratios under the project's cache directory.
+        """
+        self.expansion_ratios.save()
+
+    def _update_links(self, md_file_path, translated_content, language_code):
+        """
+        Point the links of a translated document at the translated project files.
+        Documents without a file path are not part of a project, so their links are kept.
+        """
+        if md_file_path is None:
+            return translated_content
+        return update_links(Path(md_file_path), translated_content, language_code, self.root_dir)
+
+    async def _translate_chunk_multi(self, chunk, language_codes, index, total):
+        """
+        Translate one chunk into several languages, grouping languages per request.
+        Languages missing from a grouped response are retried with single-language prompts.
+
+        Returns:
+            dict: Mapping of language code to the translated chunk.
+        """
+        expansion_ratio = max(self.expansion_ratios.get(language_code) for language_code in language_codes)
+        group_size = get_language_group_size(
+            count_tokens(chunk, self._get_tokenizer()), MARKDOWN_MAX_OUTPUT_TOKENS, MULTI_TARGET_MAX_LANGUAGES, expansion_ratio
+        )
+        if group_size == 1:
+            results = await asyncio.gather(*(
+                self._run_prompt(generate_prompt_template(language_code, chunk, self.font_config.is_rtl(language_code)), index, total, language_code)
+                for language_code in language_codes
+            ))
+            return dict(zip(language_codes, results))
+
+        rtl_langs = {language_code for language_code in language_codes if self.font_config.is_rtl(language_code)}
+        groups = [language_codes[i:i + group_size] for i in range(0, len(language_codes), group_size)]
+        logger.info(f"Translating chunk {index}/{total} into {len(language_codes)} languages with {len(groups)} request(s)")
+        responses = await asyncio.gather(*(
+            self._run_prompt(generate_multi_language_prompt_template(group, chunk, rtl_langs), index, total, group[0])
+            for group in groups
+        ), return_exceptions=True)
+
+        translations = {}
+        for group, response in zip(groups, responses):
+            if isinstance(response, Exception):
+                logger.warning(f"Grouped request for {', '.join(group)} failed: {response}")
+                continue
+            translations.update(split_multi_language_response(response, group))
+
+        missing_languages = [language_code for language_code in language_codes if language_code not in translations]
+        if missing_languages:
+            logger.warning(f"Chunk {index}/{total} is missing translations for {', '.join(missing_languages)}. Retrying them one by one.")
+            results = await asyncio.gather(*(
+                self._run_prompt(generate_prompt_template(language_code, chunk, self.font_config.is_rtl(language_code)), index, total, language_code)
+                for language_code in missing_languages
+            ))
+            translations.update(zip(missing_languages, results))
+
+        return translations
+
+    async def _run_prompts(self, prompts, language_code=None):
+        """
+        Run the translation prompts asynchronously. The scheduler decides how many run at once.
 
         Args:
             prompts (list): List of translation prompts.
+            language_code (str, optional): The target language, used for fair scheduling.
 
         Returns:
             list: List of translated text chunks.
+
+        Raises:
+            Exception: If any prompt still fails after its retries.
         """
-        tasks = [self._run_prompt(prompt, i+1, len(prompts)) for i, prompt in enumerate(prompts)]
-        try:
-            results = await asyncio.gather(*tasks)
-            return results
-        except Exception as e:
-            logger.error(f"Error during prompt execution: {e}")
-            return []
+        tasks = [self._run_prompt(prompt, i+1, len(prompts), language_code) for i, prompt in enumerate(prompts)]
+        return await asyncio.gather(*tasks)
 
-    async def _run_prompt(self, prompt, index, total):
+    async def _run_prompt(self, prompt, index, total, language_code=None, task=TASK_MARKDOWN):
         """
-        Execute a single translation prompt.
+        Execute a single translation prompt on the deployments routed for its task and size,
+        with a timeout, retries with backoff, the deployment's circuit breaker, a hedged
+        duplicate request if configured, and fallback deployments when one is throttled.
 
         Args:
             prompt (str): The translation prompt to execute.
             index (int): The index of the prompt.
             total (int): The total number of prompts.
+            language_code (str, optional): The target language, used for fair scheduling.
+            task (str): The task type used for routing ('markdown' or 'disclaimer').
 
         Returns:
             str: The translated text.
+
+        Raises:
+            Exception: If the prompt still fails after all retries.
         """
-        try:
-            logger.info(f"Running prompt {index}/{total}")
-            start_time = time.time()
-            req_settings = self.kernel.get_prompt_execution_settings_from_service_id("chat-gpt")
-            req_settings.max_tokens = 4096
-            req_settings.temperature = 0.7
-            req_settings.top_p = 0.8
-
-            prompt_template_config = PromptTemplateConfig(
-                template=prompt,
-                name="translate",
-                description="Translate a text to another language",
-                template_format="semantic-kernel",
-                execution_settings=req_settings,
-            )
-
-            function = self.kernel.add_function(
-                function_name="translate_function",
-                plugin_name="translate_plugin",
-                prompt_template_config=prompt_template_config,
-            )
-
-            result = await self.kernel.invoke(function)
-            end_time = time.time()
-            logger.info(f"Prompt {index}/{total} completed in {end_time - start_time} seconds")
-
-            await asyncio.sleep(1)
+        logger.info(f"Running prompt {index}/{total}")
+        start_time = time.time()
+        deployments = self.router.get_deployments(task, count_tokens(prompt, self._get_tokenizer()))
+        functions = {}
+
+        def get_function(deployment):
+            if deployment not in functions:
+                req_settings = self.kernel.get_prompt_execution_settings_from_service_id(self._get_service_id(deployment))
+                req_settings.max_tokens = MARKDOWN_MAX_OUTPUT_TOKENS
+                req_settings.temperature = 0.7
+                req_settings.top_p = 0.8
+
+                prompt_template_config = PromptTemplateConfig(
+                    template=prompt,
+                    name="translate",
+                    description="Translate a text to another language",
+                    template_format="semantic-kernel",
+                    execution_settings=req_settings,
+                )
+
+                functions[deployment] = self.kernel.add_function(
+                    function_name="translate_function",
+                    plugin_name="translate_plugin",
+                    prompt_template_config=prompt_template_config,
+                )
+            return functions[deployment]
+
+        async def invoke(deployment):
+            result = await self.kernel.invoke(get_function(deployment))
+            if not str(result).strip():
+                raise ValueError("Empty completion")
             return str(result)
-        except Exception as e:
-            logger.error(f"Error in prompt {index}/{total} - {prompt}: {e}")
-            return ""
+
+        # The scheduler slot is taken per attempt, outside the timeout and the hedge, so queueing
+        # for a slot neither times requests out nor inflates the latencies hedging learns from
+        result = await call_with_fallback(
+            invoke, deployments, f"Prompt {index}/{total}", self.latency_trackers,
+            slot=lambda wait=True: self.scheduler.slot('chat', language_code, wait=wait),
+        )
+        end_time = time.time()
+        logger.info(f"Prompt {index}/{total} completed in {end_time - start_time} seconds")
+
+        await asyncio.sleep(1)
+        return result
 
     async def generate_disclaimer(self, output_lang: str) -> str:
         """
@@ -149,12 +289,7 @@ class MarkdownTranslator:
         Returns:
             str: The translated disclaimer text.
         """
-
-        disclaimer_prompt = f""" Translate the following text to {output_lang}.
-
-        Disclaimer: The translation was translated from its original by an AI model and may not be perfect. 
-        Please review the output and make any necessary corrections."""
-
-        disclaimer = await self._run_prompt(disclaimer_prompt, 'disclaimer prompt', 1)
+        disclaimer_prompt = generate_disclaimer_prompt(output_lang)
+        disclaimer = await self._run_prompt(disclaimer_prompt, 'disclaimer prompt', 1, output_lang, task=TASK_DISCLAIMER)
         
         return disclaimer
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from pathlib import Path
+from co_op_translator.config.base_config import Config
+from co_op_translator.config.constants import MAX_CONCURRENT_TASKS, IMAGE_BATCH_CONCURRENT_TASKS, TASK_QUEUE_SIZE
+from co_op_translator.translators.image_translator import ImageTranslator
+from co_op_translator.translators.markdown_translator import MarkdownTranslator
+from co_op_translator.utils.markdown_utils import compare_line_breaks
+from co_op_translator.utils.request_scheduler import RequestScheduler
+from co_op_translator.utils.task_utils import worker, produce_tasks
+
+logger = logging.getLogger(__name__)
+
+class MemoryTranslator:
+    def __init__(self, root_dir=None, scheduler=None, image_prefilter='conservative', multi_target=False, max_concurrent_tasks=MAX_CONCURRENT_TASKS,
+                 ocr_backend=None):
+        """
+        Initialize a translator for content held in memory, for embedding the translator in other services.
+        Nothing is read from or written to disk.
+
+        Args:
+            root_dir (str | Path, optional): A project root. If given, document keys are taken as paths relative to it
+                                             and links are rewritten as the CLI would; otherwise links are left unchanged.
+            scheduler (RequestScheduler, optional): The scheduler bounding chat and OCR requests. Share one scheduler
+                                                    between translators to bound the requests of a whole service.
+                                                    If None, one is created from the configuration.
+            image_prefilter (str): Local no-text prefilter applied before OCR: 'off', 'conservative' or 'aggressive'.
+            multi_target (bool): Whether to translate each markdown chunk into several languages per request.
+            max_concurrent_tasks (int): Number of documents or images in progress at once.
+            ocr_backend (str, optional): 'azure', 'local' or 'azure+local'. Defaults to OCR_BACKEND.
+        """
+        Config.check_configuration()
+        self.root_dir = Path(root_dir).resolve() if root_dir is not None else None
+        self.scheduler = scheduler or RequestScheduler.from_config()
+        self.markdown_translator = MarkdownTranslator(self.root_dir, scheduler=self.scheduler)
+        # Without a root directory or output directory the image translator keeps its caches in memory
+        self.image_translator = ImageTranslator(
+            default_output_dir=None, root_dir=None, prefilter_mode=image_prefilter, scheduler=self.scheduler,
+            ocr_backend=ocr_backend
+        )
+        self.multi_target = multi_target
+        self.max_concurrent_tasks = max_concurrent_tasks
+
+    async def translate_markdown_documents(self, documents, language_codes):
+        """
+        Translate markdown documents into several languages, yielding each translation as soon as it completes.
+
+        Args:
+            documents (iterable): Markdown strings, or (key, markdown string) pairs. Keys default to the position
+                                  of the document. The iterable is consumed lazily.
+            language_codes (list): The target language codes.
+
+        Yields:
+            dict: {'key', 'language_code', 'content', 'error'}. content is the translated markdown,
+                  or None if the translation failed, in which case error holds the message.
+        """
+        async for result in self._iterate_results(self._markdown_jobs(documents, language_codes)):
+            yield result
+
+    async def translate_images(self, images, language_codes):
+        """
+        Translate the text in images into several languages, yielding each translated image as soon as it completes.
+
+        Args:
+            images (iterable): Encoded PNG or JPEG images as bytes, or (key, bytes) pairs. Keys default to the position
+                               of the image. The iterable is consumed lazily.
+            language_codes (list): The target language codes.
+
+        Yields:
+            dict: {'key', 'language_code', 'content', 'error'}. content is the encoded translated image;
+                  images without text, or whose translation failed, are returned unchanged.
+        """
+        # Batched image text needs enough images in flight to fill a request
+        max_workers = IMAGE_BATCH_CONCURRENT_TASKS if self.image_translator.text_batcher is not None else self.max_concurrent_tasks
+        async for result in self._iterate_results(self._image_jobs(images, language_codes), max_workers):
+            yield result
+
+    def _markdown_jobs(self, documents, language_codes):
+        for key, document in self._keyed(documents):
+            if self.multi_target and len(language_codes) > 1:
+                yield self._translate_markdown_languages(key, document, language_codes)
+            else:
+                for language_code in language_codes:
+                    yield self._translate_markdown(key, document, language_code)
+
+    def _image_jobs(self, images, language_codes):
+        for key, image_bytes in self._keyed(images):
+            for language_code in language_codes:
+                yield self._translate_image(key, image_bytes, language_code)
+
+    @staticmethod
+    def _keyed(items):
+        for index, item in enumerate(items):
+            if isinstance(item, tuple):
+                yield item
+            else:
+                yield index, item
+
+    def _get_document_path(self, key):
+        return self.root_dir / key if self.root_dir is not None else None
+
+    async def _translate_markdown(self, key, document, language_code):
+        """
+        Translate one document into one language, retrying once if the line breaks do not match.
+        """
+        try:
+            if not document.strip():
+                return [self._result(key, language_code, document)]
+
+            md_file_path = self._get_document_path(key)
+            translated_content = await self.markdown_translator.translate_markdown(document, language_code, md_file_path)
+            if compare_line_breaks(document, translated_content):
+                logger.warning(f"Translation of document {key} failed. Retrying...")
+                translated_content = await self.markdown_translator.translate_markdown(document, language_code, md_file_path)
+            return [self._result(key, language_code, translated_content)]
+        except Exception as e:
+            logger.error(f"Failed to translate document {key} to {language_code}: {e}")
+            return [self._result(key, language_code, None, str(e))]
+
+    async def _translate_markdown_languages(self, key, document, language_codes):
+        """
+        Translate one document into several languages, sharing each chunk's request between languages.
+        """
+        try:
+            if not document.strip():
+                return [self._result(key, language_code, document) for language_code in language_codes]
+
+            md_file_path = self._get_document_path(key)
+            translations = await self.markdown_translator.translate_markdown_multi(document, language_codes, md_file_path)
+        except Exception as e:
+            logger.error(f"Failed to translate document {key}: {e}")
+            return [self._result(key, language_code, None, str(e)) for language_code in language_codes]
+
+        results = []
+        for language_code, translated_content in translations.items():
+            if compare_line_breaks(document, translated_content):
+                logger.warning(f"Translation of document {key} in {language_code} failed. Retrying...")
+                results.extend(await self._translate_markdown(key, document, language_code))
+            else:
+                results.append(self._result(key, language_code, translated_content))
+        return results
+
+    async def _translate_image(self, key, image_bytes, language_code):
+        try:
+            translated_image = await self.image_translator.translate_image_bytes_async(image_bytes, language_code)
+            return [self._result(key, language_code, translated_image)]
+        except Exception as e:
+            logger.error(f"Failed to translate image {key} to {language_code}: {e}")
+            return [self._result(key, language_code, None, str(e))]
+
+    @staticmethod
+    def _result(key, language_code, content, error=None):
+        return {'key': key, 'language_code': language_code, 'content': content, 'error': error}
+
+    async def _iterate_results(self, jobs, max_workers=None):
+        """
+        Run jobs with a bounded number of workers and yield their results in completion order.
+
+        Args:
+            jobs (iterable): Lazily created coroutines, each returning a list of results.
+            max_workers (int, optional): Number of jobs in progress at once. Defaults to max_concurrent_tasks.
+        """
+        results = asyncio.Queue()
+
+        async def run(job):
+            for result in await job:
+                await results.put(result)
+
+        task_queue = asyncio.Queue(maxsize=TASK_QUEUE_SIZE)
+        workers = [asyncio.create_task(worker(task_queue)) for _ in range(max_workers or self.max_concurrent_tasks)]
+        producer = asyncio.create_task(produce_tasks((run(job) for job in jobs), task_queue, len(workers)))
+        # Wake the consumer once every job has finished
+        finished = asyncio.gather(producer, *workers)
+        finished.add_done_callback(lambda _: results.put_nowait(None))
+
+        try:
+            while (result := await results.get()) is not None:
+                yield result
+            await finished
+        finally:
+            # Stop the remaining work if the caller stops iterating early
+            for task in (producer, *workers):
+                task.cancel()
+            while not task_queue.empty():
+                job = task_queue.get_nowait()
+                if job is not None:
+                    job.close()
@@ -1,29 +1,57 @@
 import logging
 import os
+import time
 from pathlib import Path
 import asyncio
 from tqdm.asyncio import tqdm
 from semantic_kernel import Kernel
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
 from co_op_translator.translators import text_translator, image_translator, markdown_translator
 from co_op_translator.config.base_config import Config
-from co_op_translator.config.constants import SUPPORTED_IMAGE_EXTENSIONS, EXCLUDED_DIRS
-from co_op_translator.utils.file_utils import read_input_file, handle_empty_document, get_filename_and_extension, filter_files, reset_translation_directories, generate_translated_filename, delete_translated_images_by_language_code, delete_translated_markdown_files_by_language_code
-from co_op_translator.utils.task_utils import worker
-from co_op_translator.utils.markdown_utils import compare_line_breaks
+from co_op_translator.config.constants import SUPPORTED_IMAGE_EXTENSIONS, EXCLUDED_DIRS, WATCH_POLL_INTERVAL, WATCH_DEBOUNCE_SECONDS, MAX_CONCURRENT_TASKS, IMAGE_BATCH_CONCURRENT_TASKS, TASK_QUEUE_SIZE
+from co_op_translator.config.constants import CACHE_DIR_NAME, DURATION_HISTORY_FILE, PLAN_OUTPUT_TOKEN_RATIO, PLAN_CHAT_BASE_LATENCY, PLAN_CHAT_OUTPUT_TOKENS_PER_SECOND, PLAN_OCR_LATENCY, PLAN_IMAGE_OUTPUT_TOKENS, PLAN_PROMPT_DELAY
+from co_op_translator.utils.file_utils import read_input_file, handle_empty_document, get_filename_and_extension, filter_files, iter_filtered_files, reset_translation_directories, generate_translated_filename, link_or_copy_file, load_json_cache, save_json_cache
+from co_op_translator.utils.git_utils import get_changed_paths
+from co_op_translator.utils.image_utils import group_duplicate_images
+from co_op_translator.utils.task_utils import worker, produce_tasks, is_priority_path, sort_tasks_by_cost, ProgressCounter
+from co_op_translator.utils.client_utils import get_chat_completion_service
+from co_op_translator.utils.request_scheduler import RequestScheduler
+from co_op_translator.utils.profiling_utils import take_memory_snapshot
+from co_op_translator.utils.io_stage import IOStage
+from co_op_translator.utils.output_index import OutputIndex
+from co_op_translator.utils.markdown_utils import compare_line_breaks, rebase_relative_links, chunk_markdown_document, count_tokens, get_tokenizer
 
 logger = logging.getLogger(__name__)
 
 class ProjectTranslator:
-    def __init__(self, language_codes, root_dir='.'):
+    def __init__(self, language_codes, root_dir='.', perceptual_dedup=False, image_prefilter='conservative', priority_patterns=(), multi_target=False,
+                 scheduler=None, show_progress=True, ocr_backend=None):
+        Config.check_configuration()
         self.language_codes = language_codes.split()
         self.root_dir = Path(root_dir).resolve()
+        self.perceptual_dedup = perceptual_dedup
         self.translations_dir = self.root_dir / 'translations'
         self.image_dir = self.root_dir / 'translated_images'
         self.text_translator = text_translator.TextTranslator()
-        self.image_translator = image_translator.ImageTranslator(default_output_dir=self.image_dir, root_dir=self.root_dir)
-        self.markdown_translator = markdown_translator.MarkdownTranslator(self.root_dir)
+        # One scheduler bounds the chat and OCR requests of both stages and keeps languages progressing evenly
+        self.scheduler = scheduler or RequestScheduler.from_config()
+        self.image_translator = image_translator.ImageTranslator(
+            default_output_dir=self.image_dir, root_dir=self.root_dir, prefilter_mode=image_prefilter, scheduler=self.scheduler,
+            ocr_backend=ocr_backend
+        )
+        self.markdown_translator = markdown_translator.MarkdownTranslator(self.root_dir, scheduler=self.scheduler)
         self.kernel = self._initialize_kernel()
+        self.priority_patterns = tuple(priority_patterns)
+        self.multi_target = multi_target
+        # Source reads and output writes run in worker threads, off the event loop
+        self.io_stage = IOStage()
+        # Existing outputs by source and language, loaded once instead of probing the output tree
+        self.output_index = OutputIndex(self.root_dir, self.translations_dir, self.image_dir)
+        # Progress of each stage, keyed by its description; printed as progress bars unless show_progress is False
+        self.show_progress = show_progress
+        self.progress = {}
+        self.duration_history_path = self.root_dir / CACHE_DIR_NAME / DURATION_HISTORY_FILE
+        self.duration_history = load_json_cache(self.duration_history_path)
+        self._tokenizer = None
 
     def _initialize_kernel(self):
         """
@@ -32,16 +60,52 @@ class ProjectTranslator:
         kernel = Kernel()
         service_id = "chat-gpt"
 
-        kernel.add_service(
-            AzureChatCompletion(
-                service_id=service_id,
-                deployment_name=Config.AZURE_OPENAI_CHAT_DEPLOYMENT_NAME,
-                endpoint=Config.AZURE_OPENAI_ENDPOINT,
-                api_key=Config.AZURE_OPENAI_API_KEY,
-            )
-        )
+        kernel.add_service(get_chat_completion_service(service_id))
         return kernel
 
+    def _record_duration(self, file_path, seconds):
+        """
+        Update the moving average of how long translating a file into one language takes.
+        """
+        key = Path(file_path).resolve().relative_to(self.root_dir).as_posix()
+        previous = self.duration_history.get(key)
+        self.duration_history[key] = seconds if previous is None else 0.5 * previous + 0.5 * seconds
+
+    def save_duration_history(self):
+        """
+        Persist the per-file duration history under the project's cache directory.
+        """
+        if self.duration_history:
+            save_json_cache(self.duration_history_path, self.duration_history)
+
+    def estimate_markdown_cost(self, md_file_path):
+        """
+        Estimate how many seconds translating a markdown file into one language takes,
+        from its history if known, otherwise from its largest chunk (chunks run concurrently).
+        """
+        key = md_file_path.relative_to(self.root_dir).as_posix()
+        if key in self.duration_history:
+            return self.duration_history[key]
+
+        if self._tokenizer is None:
+            self._tokenizer = get_tokenizer('o200k_base')
+        try:
+            document = read_input_file(md_file_path)
+        except (OSError, UnicodeDecodeError):
+            return 0.0
+        largest_chunk = max((count_tokens(chunk, self._tokenizer) for chunk in chunk_markdown_document(document)), default=0)
+        output_seconds = largest_chunk * PLAN_OUTPUT_TOKEN_RATIO / PLAN_CHAT_OUTPUT_TOKENS_PER_SECOND
+        return 2 * (PLAN_CHAT_BASE_LATENCY + PLAN_PROMPT_DELAY) + output_seconds
+
+    def estimate_image_cost(self, image_path):
+        """
+        Estimate how many seconds translating an image into one language takes.
+        """
+        key = image_path.relative_to(self.root_dir).as_posix()
+        if key in self.duration_history:
+            return self.duration_history[key]
+        return PLAN_OCR_LATENCY + PLAN_CHAT_BASE_LATENCY + PLAN_IMAGE_OUTPUT_TOKENS / PLAN_CHAT_OUTPUT_TOKENS_PER_SECOND
+
     async def translate_image(self, image_path, language_code):
         """
         Translate an image and handle file permissions or path errors.
@@ -57,11 +121,45 @@ class ProjectTranslator:
             logger.error(f"Image does not exist or is not a valid file: {image_path}")
         
         try:
-            translated_image_path = self.image_translator.translate_image(image_path, language_code, self.image_dir)
+            start_time = time.monotonic()
+            translated_image_path = await self.image_translator.translate_image_async(image_path, language_code, self.image_dir)
+            self._record_duration(image_path, time.monotonic() - start_time)
+            self.output_index.record(image_path, language_code, translated_image_path)
             logger.info(f"Translated image {image_path} to {language_code} and saved to {translated_image_path}")
         except Exception as e:
             logger.error(f"Failed to translate image {image_path}: {e}", exc_info=True)
 
+    async def translate_image_group(self, image_paths, language_code):
+        """
+        Translate the first image of a group of identical images once and
+        link or copy the result to the translated filenames of the other copies.
+
+        Args:
+            image_paths (list): Paths of images sharing the same content.
+            language_code (str): The target language code.
+        """
+        representative = Path(image_paths[0]).resolve()
+        await self.translate_image(representative, language_code)
+        if len(image_paths) > 1:
+            await asyncio.to_thread(self._link_duplicate_translations, image_paths, language_code)
+
+    def _link_duplicate_translations(self, image_paths, language_code):
+        """
+        Link or copy the translation of the first image of a group to the other copies.
+        """
+        representative = Path(image_paths[0]).resolve()
+        translated_image_path = self.output_index.get(representative, language_code)
+        if translated_image_path is None:
+            logger.warning(f"No translated output for {representative}; skipping its duplicates.")
+            return
+
+        for duplicate_path in image_paths[1:]:
+            duplicate_path = Path(duplicate_path).resolve()
+            duplicate_output = self.image_dir / generate_translated_filename(duplicate_path, language_code, self.root_dir)
+            link_or_copy_file(translated_image_path, duplicate_output)
+            self.output_index.record(duplicate_path, language_code, duplicate_output)
+            logger.info(f"Reused translation of {representative} for duplicate image {duplicate_path}")
+
     async def translate_markdown(self, file_path, language_code):
         """
         Translate a markdown file to the specified language.
@@ -72,14 +170,16 @@ class ProjectTranslator:
         """
         file_path = Path(file_path).resolve()
         try:
-            document = read_input_file(file_path)
+            document = await self.io_stage.read_text(file_path)
             if not document:
                 relative_path = file_path.relative_to(self.root_dir)
                 output_file = self.translations_dir / language_code / relative_path
-                handle_empty_document(file_path, output_file)
+                await asyncio.to_thread(handle_empty_document, file_path, output_file)
+                self.output_index.record(file_path, language_code, output_file)
                 return
 
             # First attempt at translation
+            start_time = time.monotonic()
             translated_content = await self.markdown_translator.translate_markdown(document, language_code, file_path)
 
             # Check if translation format is broken (e.g., line breaks mismatch)
@@ -87,115 +187,240 @@ class ProjectTranslator:
                 logger.warning(f"Translation failed for {file_path}. Retrying...")
                 # Retry translation
                 translated_content = await self.markdown_translator.translate_markdown(document, language_code, file_path)
+            self._record_duration(file_path, time.monotonic() - start_time)
 
-            relative_path = file_path.relative_to(self.root_dir)
-            translated_path = self.translations_dir / language_code / relative_path
-            translated_path.parent.mkdir(parents=True, exist_ok=True)
+            await self._write_translated_markdown(file_path, language_code, translated_content)
 
-            with open(translated_path, "w", encoding='utf-8') as f:
-                f.write(translated_content)
-            logger.info(f"Translated {file_path} to {language_code} and saved to {translated_path}")
+        except Exception as e:
+            logger.error(f"Failed to translate {file_path}: {e}")
+
+    async def translate_markdown_languages(self, file_path, language_codes):
+        """
+        Translate a markdown file into several languages, sharing each chunk's request between languages.
+
+        Translations that fail the line break check are retried one language at a time.
+
+        Args:
+            file_path (Path): Path to the markdown file.
+            language_codes (list): The target language codes.
+        """
+        file_path = Path(file_path).resolve()
+        try:
+            document = await self.io_stage.read_text(file_path)
+            if not document:
+                relative_path = file_path.relative_to(self.root_dir)
+                for language_code in language_codes:
+                    output_file = self.translations_dir / language_code / relative_path
+                    await asyncio.to_thread(handle_empty_document, file_path, output_file)
+                    self.output_index.record(file_path, language_code, output_file)
+                return
+
+            start_time = time.monotonic()
+            translations = await self.markdown_translator.translate_markdown_multi(document, language_codes, file_path)
+
+            for language_code, translated_content in translations.items():
+                if compare_line_breaks(document, translated_content):
+                    logger.warning(f"Translation failed for {file_path} in {language_code}. Retrying...")
+                    translated_content = await self.markdown_translator.translate_markdown(document, language_code, file_path)
+                await self._write_translated_markdown(file_path, language_code, translated_content)
+            self._record_duration(file_path, time.monotonic() - start_time)
 
         except Exception as e:
             logger.error(f"Failed to translate {file_path}: {e}")
 
-    async def process_api_requests(self, tasks, task_desc):
+    async def _write_translated_markdown(self, file_path, language_code, translated_content):
+        """
+        Queue the translation of a markdown file to be written into the language's translation directory
+        and record it in the output index once it is written.
+        """
+        relative_path = file_path.relative_to(self.root_dir)
+        translated_path = self.translations_dir / language_code / relative_path
+        # Record the output only once it is on disk, so a failed write is translated again on the next run
+        await self.io_stage.write_text(
+            translated_path, translated_content,
+            on_written=lambda: self.output_index.record(file_path, language_code, translated_path)
+        )
+        logger.info(f"Translated {file_path} to {language_code} and queued it for writing to {translated_path}")
+
+    async def process_api_requests(self, tasks, task_desc, total=None, max_workers=MAX_CONCURRENT_TASKS):
         """
         Process API requests using a queue system for better resource management.
+
+        Tasks are pulled from the iterable only as the bounded queue has room, so a generator
+        creates each coroutine just before a worker can run it.
+
+        Args:
+            tasks (iterable): Coroutines to run; a list or a lazy generator.
+            task_desc (str): Description for the progress bar.
+            total (int, optional): Number of tasks, when tasks is a generator and the count is known.
+            max_workers (int): Number of tasks in progress at once.
         """
-        if not tasks:  # No tasks to process
+        if isinstance(tasks, list):
+            total = len(tasks)
+        if total == 0:  # No tasks to process
             logger.warning("No tasks available for processing.")
             return
 
-        task_queue = asyncio.Queue()
+        task_queue = asyncio.Queue(maxsize=TASK_QUEUE_SIZE)
+
+        progress_bar = tqdm(total=total, desc=task_desc) if self.show_progress else ProgressCounter(total=total, desc=task_desc)
+        self.progress[task_desc] = progress_bar
+        with progress_bar:
+            # Step 1: Create worker tasks to process the queue
+            workers = [asyncio.create_task(worker(task_queue, progress_bar)) for _ in range(max_workers)]
+
+            # Step 2: Feed the queue, waiting whenever it is full
+            await produce_tasks(tasks, task_queue, len(workers))
 
-        # Step 1: Populate the queue with tasks
-        for task in tasks:
-            task_queue.put_nowait(task)
+            # Step 3: Wait until all workers have drained the queue
+            await asyncio.gather(*workers)
 
-        # Step 2: Create a progress bar
-        with tqdm(total=len(tasks), desc=task_desc) as progress_bar:
-            # Step 3: Create worker tasks to process the queue
-            workers = [asyncio.create_task(worker(task_queue, progress_bar)) for _ in range(5)]
+            # Step 4: Wait until the write-behind queue has written every output
+            await self.io_stage.flush()
 
-            # Step 4: Wait until all tasks are processed
-            await task_queue.join()
+            if progress_bar.n == 0:
+                logger.warning("No tasks available for processing.")
+
+    def _markdown_tasks(self, markdown_files, update=False):
+        """
+        Lazily create a translation coroutine for every pending (markdown file, language) pair,
+        or one coroutine per file covering all its pending languages in multi-target mode.
+        """
+        for md_file_path in markdown_files:
+            relative_path = md_file_path.relative_to(self.root_dir)
+            pending_languages = []
+            for language_code in self.language_codes:
+                if not update and self.output_index.has(md_file_path, language_code):
+                    logger.info(f"Skipping already translated markdown file: {self.translations_dir / language_code / relative_path}")
+                    continue
+                pending_languages.append(language_code)
 
-            # Ensure all workers have completed
-            for worker_task in workers:
-                worker_task.cancel()
+            if pending_languages:
+                # Read the source ahead of the workers; every coroutine of this file consumes the same read
+                self.io_stage.prefetch(md_file_path, uses=1 if self.multi_target and len(pending_languages) > 1 else len(pending_languages))
+
+            if self.multi_target and len(pending_languages) > 1:
+                logger.info(f"Translating markdown file: {md_file_path} for languages: {', '.join(pending_languages)}")
+                yield self.translate_markdown_languages(md_file_path, pending_languages)
+                continue
+
+            for language_code in pending_languages:
+                logger.info(f"Translating markdown file: {md_file_path} for language: {language_code}")
+                yield self.translate_markdown(md_file_path, language_code)
 
     async def translate_all_markdown_files(self, update=False):
         """
         Translate all markdown files, with optional update mode to refresh translations.
         """
         logger.info("Starting markdown translation tasks...")
+        take_memory_snapshot('markdown_start')
 
         # Step 1: If update is True, delete all existing translated markdown files
         if update:
             for language_code in self.language_codes:
-                delete_translated_markdown_files_by_language_code(language_code, self.translations_dir)
+                self.output_index.delete(self.output_index.get_outputs(language_code=language_code, output_type='markdown'))
                 logger.info(f"Deleted all translated markdown files for language: {language_code}")
 
-        # Step 2: Collect markdown files for translation
-        markdown_files = filter_files(self.root_dir, EXCLUDED_DIRS)
-        tasks = []
+        # Step 2: Collect markdown files with pending translations, ordered by priority and estimated cost.
+        # Scanning reads files, so it runs in a worker thread.
+        work_units = await asyncio.to_thread(self._collect_markdown_work_units, update)
 
-        for md_file_path in markdown_files:
-            md_file_path = md_file_path.resolve()
+        if work_units:  # Check if there are tasks to process
+            # Step 3: Process markdown translations using API request queue, priority files and largest files first
+            await self.process_api_requests(self._markdown_tasks(sort_tasks_by_cost(work_units), update), "Translating markdown files")
+            self.save_duration_history()
+            self.markdown_translator.save_expansion_ratios()
+            self.output_index.save()
+        else:
+            logger.warning("No markdown files found for translation.")
+        take_memory_snapshot('markdown_end')
 
-            if md_file_path.suffix == '.md':
-                for language_code in self.language_codes:
-                    relative_path = md_file_path.relative_to(self.root_dir)
-                    translated_md_path = self.translations_dir / language_code / relative_path
+    def _collect_markdown_work_units(self, update=False):
+        """
+        Collect (priority, estimated cost, path) for every markdown file with pending translations.
+        Only one small record per file is kept; per-language coroutines are created lazily.
+        """
+        work_units = []
+        for md_file_path in iter_filtered_files(self.root_dir, EXCLUDED_DIRS):
+            if md_file_path.suffix != '.md':
+                continue
+            md_file_path = md_file_path.resolve()
+            relative_path = md_file_path.relative_to(self.root_dir)
+            if not update and all(self.output_index.has(md_file_path, language_code) for language_code in self.language_codes):
+                logger.info(f"Skipping already translated markdown file: {relative_path}")
+                continue
 
-                    if not update and translated_md_path.exists():
-                        logger.info(f"Skipping already translated markdown file: {translated_md_path}")
-                        continue
+            priority = 0 if is_priority_path(relative_path, self.priority_patterns) else 1
+            work_units.append((priority, self.estimate_markdown_cost(md_file_path), md_file_path))
+        return work_units
 
-                    logger.info(f"Translating markdown file: {md_file_path} for language: {language_code}")
-                    tasks.append(self.translate_markdown(md_file_path, language_code))
+    def _image_tasks(self, image_groups, update=False):
+        """
+        Lazily create a translation coroutine for every pending (image group, language) pair.
+        """
+        for image_group in image_groups:
+            for language_code in self.language_codes:
+                existing_paths = [self.output_index.get(image_file_path, language_code) for image_file_path in image_group]
+                existing_path = next((path for path in existing_paths if path is not None), None)
+
+                if not update and existing_path is not None:
+                    missing_paths = [image_file_path for image_file_path, path in zip(image_group, existing_paths) if path is None]
+                    if missing_paths:
+                        # Reuse an existing translation of the same content for the copies still missing, in a worker thread
+                        yield asyncio.to_thread(self._reuse_image_translation, existing_path, missing_paths, language_code)
+                    logger.info(f"Skipping already translated image: {existing_path}")
+                    continue
 
-        if tasks:  # Check if there are tasks to process
-            # Step 3: Process markdown translations using API request queue
-            await self.process_api_requests(tasks, "Translating markdown files")
-        else:
-            logger.warning("No markdown files found for translation.")
+                logger.info(f"Translating image: {image_group[0]} ({len(image_group)} copies) for language: {language_code}")
+                yield self.translate_image_group(image_group, language_code)
 
+    def _reuse_image_translation(self, translated_image_path, image_paths, language_code):
+        """
+        Link or copy an existing translation to the translated filenames of copies of the same image.
+        """
+        for image_file_path in image_paths:
+            duplicate_output = self.image_dir / generate_translated_filename(image_file_path, language_code, self.root_dir)
+            link_or_copy_file(translated_image_path, duplicate_output)
+            self.output_index.record(image_file_path, language_code, duplicate_output)
+            logger.info(f"Reused existing translation {translated_image_path} for {duplicate_output}")
 
     async def translate_all_image_files(self, update=False):
         """
         Translate all image files, with optional update mode to refresh translations.
         """
         logger.info("Starting image translation tasks...")
+        take_memory_snapshot('images_start')
 
         # Step 1: If update is True, delete all existing translated images
         if update:
             for language_code in self.language_codes:
-                delete_translated_images_by_language_code(language_code, self.image_dir)
+                self.output_index.delete(self.output_index.get_outputs(language_code=language_code, output_type='image'))
                 logger.info(f"Deleted all translated images for language: {language_code}")
 
-        # Step 2: Collect image files for translation
-        image_files = filter_files(self.root_dir, EXCLUDED_DIRS)
-        tasks = []
-
-        for image_file_path in image_files:
-            image_file_path = image_file_path.resolve()
-
-            if get_filename_and_extension(image_file_path)[1] in SUPPORTED_IMAGE_EXTENSIONS:
-                for language_code in self.language_codes:
-                    translated_filename = generate_translated_filename(image_file_path, language_code, self.root_dir)
-                    translated_image_path = Path(self.image_dir) / translated_filename
-
-                    if not update and translated_image_path.exists():
-                        logger.info(f"Skipping already translated image: {translated_image_path}")
-                        continue
-
-                    logger.info(f"Translating image: {image_file_path} for language: {language_code}")
-                    tasks.append(self.translate_image(image_file_path, language_code))
+        # Step 2: Collect image files for translation, grouped by content so duplicates are translated once
+        # Hashing the images runs in a worker thread
+        image_groups = await asyncio.to_thread(self._collect_image_groups)
+        work_units = [(1, self.estimate_image_cost(image_group[0]), image_group) for image_group in image_groups]
 
         # Step 3: Process image translations using API request queue
-        await self.process_api_requests(tasks, "Translating images")
+        # Batched image text needs enough images in flight to fill a request; the scheduler still bounds the requests
+        max_workers = IMAGE_BATCH_CONCURRENT_TASKS if self.image_translator.text_batcher is not None else MAX_CONCURRENT_TASKS
+        await self.process_api_requests(self._image_tasks(sort_tasks_by_cost(work_units), update), "Translating images", max_workers=max_workers)
+        self.image_translator.save_prefilter_cache()
+        self.image_translator.save_line_memory()
+        self.save_duration_history()
+        self.output_index.save()
+        take_memory_snapshot('images_end')
+
+    def _collect_image_groups(self):
+        """
+        Collect the project's images, grouped by content so duplicates are translated once.
+        """
+        image_files = [
+            image_file_path.resolve() for image_file_path in iter_filtered_files(self.root_dir, EXCLUDED_DIRS)
+            if get_filename_and_extension(image_file_path)[1] in SUPPORTED_IMAGE_EXTENSIONS
+        ]
+        return group_duplicate_images(image_files, perceptual=self.perceptual_dedup)
 
     async def translate_project_async(self, images=False, markdown=False, update=False):
         """
@@ -227,6 +452,15 @@ class ProjectTranslator:
         else:
             logger.warning("No tasks to run. Skipping translation.")
 
+    async def _run(self, coroutine):
+        """
+        Run a translation coroutine, then stop the I/O stage's drainers and writer threads.
+        """
+        try:
+            await coroutine
+        finally:
+            await self.io_stage.close()
+
     def translate_project(self, images=False, markdown=False, update=False):
         """
         Public method to start the project translation.
@@ -236,7 +470,233 @@ class ProjectTranslator:
             markdown (bool): Whether to translate markdown files.
             update (bool): Whether to update existing translations.
         """
-        asyncio.run(self.translate_project_async(images=images, markdown=markdown, update=update))
+        asyncio.run(self._run(self.translate_project_async(images=images, markdown=markdown, update=update)))
+
+    def _snapshot_sources(self, images=True, markdown=True):
+        """
+        Record the modification time and size of every translatable source file.
+
+        Returns:
+            dict: Mapping of resolved source paths to (mtime_ns, size).
+        """
+        snapshot = {}
+        for file_path in filter_files(self.root_dir, EXCLUDED_DIRS):
+            extension = get_filename_and_extension(file_path)[1]
+            if (markdown and extension == '.md') or (images and extension in SUPPORTED_IMAGE_EXTENSIONS):
+                try:
+                    stat = file_path.stat()
+                except OSError:
+                    continue
+                snapshot[file_path.resolve()] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    async def translate_changed_files(self, changed_paths):
+        """
+        Re-translate only the given markdown and image files for all configured languages.
+
+        Args:
+            changed_paths (list): Paths of source files that were added or modified.
+        """
+        tasks = []
+        changed_images = set()
+        for file_path in sorted(changed_paths):
+            file_path = Path(file_path).resolve()
+            if not file_path.exists():
+                continue
+            if get_filename_and_extension(file_path)[1] in SUPPORTED_IMAGE_EXTENSIONS:
+                changed_images.add(file_path)
+            elif self.multi_target and file_path.suffix == '.md' and len(self.language_codes) > 1:
+                tasks.append(self.translate_markdown_languages(file_path, self.language_codes))
+            elif file_path.suffix == '.md':
+                tasks.extend(self.translate_markdown(file_path, language_code) for language_code in self.language_codes)
+
+        if changed_images:
+            # Regroup by content, so a changed image is translated once for all its copies and
+            # the copies are linked to the new translation
+            image_groups = [group for group in await asyncio.to_thread(self._collect_image_groups) if changed_images.intersection(group)]
+            for image_group in image_groups:
+                tasks.extend(self._translate_changed_image_group(image_group, language_code, changed_images) for language_code in self.language_codes)
+
+        await self.process_api_requests(tasks, "Translating changes")
+        self.image_translator.save_prefilter_cache()
+        self.image_translator.save_line_memory()
+        self.markdown_translator.save_expansion_ratios()
+        self.output_index.save()
+
+    async def _translate_changed_image_group(self, image_paths, language_code, changed_images):
+        """
+        Bring the translations of a group of identical images up to date after some of them changed.
+
+        Args:
+            image_paths (list): Paths of images sharing the same content; the first is the representative.
+            language_code (str): The target language code.
+            changed_images (set): Resolved paths of the images that were added or modified.
+        """
+        representative = image_paths[0]
+        if representative not in changed_images and self.output_index.has(representative, language_code):
+            # Only copies changed, into the content of an image that is already translated
+            await asyncio.to_thread(self._link_duplicate_translations, image_paths, language_code)
+            return
+
+        # The old output may be a hardlink shared with the copies of its previous content; remove it
+        # rather than overwrite the shared file
+        old_outputs = self.output_index.get_outputs(source_path=representative, language_code=language_code, output_type='image')
+        await asyncio.to_thread(self.output_index.delete, old_outputs)
+        await self.translate_image_group(image_paths, language_code)
+
+    async def watch_project_async(self, images=False, markdown=False, poll_interval=WATCH_POLL_INTERVAL, debounce=WATCH_DEBOUNCE_SECONDS):
+        """
+        Keep this translator warm and re-translate files as they change on disk.
+
+        The tree is polled every poll_interval seconds; changes are collected until no
+        further change has been seen for debounce seconds, then translated as one batch.
+        The translations of removed source files are deleted as soon as the removal is seen.
+
+        Args:
+            images (bool): Whether to watch image files.
+            markdown (bool): Whether to watch markdown files.
+            poll_interval (float): Seconds between filesystem scans.
+            debounce (float): Quiet period required before a batch of changes is translated.
+        """
+        if not images and not markdown:
+            images = True
+            markdown = True
+
+        # Bring the output tree up to date once before watching
+        await self.translate_project_async(images=images, markdown=markdown)
+
+        previous_snapshot = self._snapshot_sources(images, markdown)
+        pending_changes = {}
+        logger.info(f"Watching {self.root_dir} for changes...")
+
+        while True:
+            await asyncio.sleep(poll_interval)
+            current_snapshot = self._snapshot_sources(images, markdown)
+            now = time.monotonic()
+
+            for file_path, signature in current_snapshot.items():
+                if previous_snapshot.get(file_path) != signature:
+                    pending_changes[file_path] = now
+            removed_paths = previous_snapshot.keys() - current_snapshot.keys()
+            for file_path in removed_paths:
+                logger.info(f"Source file removed: {file_path}. Removing its translations.")
+                pending_changes.pop(file_path, None)
+                self.remove_translated_outputs(file_path)
+            if removed_paths:
+                self.output_index.save()
+            previous_snapshot = current_snapshot
+
+            if pending_changes and now - max(pending_changes.values()) >= debounce:
+                changed_paths = list(pending_changes)
+                pending_changes.clear()
+                logger.info(f"Translating {len(changed_paths)} changed file(s)...")
+                await self.translate_changed_files(changed_paths)
+
+    def _is_selected_source(self, file_path, images=True, markdown=True):
+        """
+        Check whether a path is a markdown or image source that the current run should handle.
+        """
+        extension = get_filename_and_extension(file_path)[1]
+        if any(excluded_dir in Path(file_path).relative_to(self.root_dir).parts for excluded_dir in EXCLUDED_DIRS):
+            return False
+        return (markdown and extension == '.md') or (images and extension in SUPPORTED_IMAGE_EXTENSIONS)
+
+    def move_translated_outputs(self, old_path, new_path):
+        """
+        Move the existing translations of a renamed source file to the paths of its new name.
+
+        Args:
+            old_path (Path): The previous absolute path of the source file.
+            new_path (Path): The new absolute path of the source file.
+        """
+        if get_filename_and_extension(new_path)[1] in SUPPORTED_IMAGE_EXTENSIONS:
+            for translated_image_path in self.output_index.get_outputs(source_path=old_path, output_type='image'):
+                language_code = translated_image_path.name[:-len(translated_image_path.suffix)].rsplit('.', 1)[-1]
+                # Keep the existing file's format, which may differ from the configured output format
+                destination = (self.image_dir / generate_translated_filename(new_path, language_code, self.root_dir)).with_suffix(translated_image_path.suffix)
+                os.replace(translated_image_path, destination)
+                self.output_index.move(translated_image_path, new_path, destination)
+                logger.info(f"Moved translated image {translated_image_path} to {destination}")
+            return
+
+        new_relative_path = Path(new_path).relative_to(self.root_dir)
+        for translated_md_path in self.output_index.get_outputs(source_path=old_path, output_type='markdown'):
+            language_code = translated_md_path.relative_to(self.translations_dir).parts[0]
+            destination = self.translations_dir / language_code / new_relative_path
+            destination.parent.mkdir(parents=True, exist_ok=True)
+
+            # Keep relative links valid when the file moves to another directory
+            content = rebase_relative_links(read_input_file(translated_md_path), translated_md_path.parent, destination.parent)
+            with open(destination, "w", encoding='utf-8') as f:
+                f.write(content)
+            translated_md_path.unlink()
+            self.output_index.move(translated_md_path, new_path, destination)
+            logger.info(f"Moved translated markdown {translated_md_path} to {destination}")
+
+    def remove_translated_outputs(self, source_path):
+        """
+        Remove the translations of a deleted source file in every language.
+
+        Args:
+            source_path (Path): The absolute path of the deleted source file.
+        """
+        self.output_index.delete(self.output_index.get_outputs(source_path=source_path))
+
+    async def translate_since_async(self, since, images=False, markdown=False):
+        """
+        Translate only the sources changed since a git ref, moving the translations of
+        renamed files and removing the translations of deleted files.
+
+        Args:
+            since (str): The git ref to compare against.
+            images (bool): Whether to process image files.
+            markdown (bool): Whether to process markdown files.
+        """
+        if not images and not markdown:
+            images = True
+            markdown = True
+
+        changed, renamed, deleted = get_changed_paths(self.root_dir, since)
+
+        for deleted_path in deleted:
+            if self._is_selected_source(deleted_path, images, markdown):
+                self.remove_translated_outputs(deleted_path)
+
+        for old_path, new_path, content_changed in renamed:
+            if not self._is_selected_source(new_path, images, markdown):
+                continue
+            if self._is_selected_source(old_path, images, markdown):
+                self.move_translated_outputs(old_path, new_path)
+            if content_changed or not self._is_selected_source(old_path, images, markdown):
+                changed.append(new_path)
+
+        changed_paths = [path for path in changed if self._is_selected_source(path, images, markdown)]
+        logger.info(f"Translating {len(changed_paths)} file(s) changed since {since}...")
+        await self.translate_changed_files(changed_paths)
+
+    def translate_since(self, since, images=False, markdown=False):
+        """
+        Public method to translate only the files changed since a git ref.
+
+        Args:
+            since (str): The git ref to compare against.
+            images (bool): Whether to process image files.
+            markdown (bool): Whether to process markdown files.
+        """
+        asyncio.run(self._run(self.translate_since_async(since, images=images, markdown=markdown)))
+
+    def watch_project(self, images=False, markdown=False):
+        """
+        Public method to start watch mode. Runs until interrupted.
+
+        Args:
+            images (bool): Whether to watch image files.
+            markdown (bool): Whether to watch markdown files.
+        """
+        try:
+            asyncio.run(self._run(self.watch_project_async(images=images, markdown=markdown)))
+        except KeyboardInterrupt:
+            logger.info("Watch mode stopped.")
 
     async def check_and_retry_translations(self):
         """
@@ -306,6 +766,10 @@ class ProjectTranslator:
                         # Update the progress bar for retry process
                         retry_progress_bar.update(1)
 
+            # Retried translations are recorded once written, so wait for the write-behind queue before saving
+            await self.io_stage.flush()
+            self.markdown_translator.save_expansion_ratios()
+            self.output_index.save()
             logger.info(f"Total mismatched files retried: {len(mismatched_files)}")
         else:
             logger.info("No formatting issues found in the translated files.")
@@ -1,49 +1,140 @@
-from openai import AzureOpenAI
 import logging
 from co_op_translator.config.base_config import Config
-from co_op_translator.utils.text_utils import gen_image_translation_prompt, remove_code_backticks, extract_yaml_lines
+from co_op_translator.utils.client_utils import get_openai_client
+from co_op_translator.config.constants import IMAGE_TEXT_BATCH_OUTPUT_TOKENS
+from co_op_translator.utils.text_utils import gen_image_translation_prompt, gen_image_batch_translation_prompt, remove_code_backticks, extract_yaml_lines, extract_id_lines
+from co_op_translator.utils.markdown_utils import count_tokens, get_tokenizer
+from co_op_translator.utils.model_router import ModelRouter, call_with_fallback_sync, TASK_IMAGE_TEXT
+from co_op_translator.utils.translation_memory import normalize_line
 
 logger = logging.getLogger(__name__)
 
 class TextTranslator:
     def __init__(self):
+        Config.check_configuration()
         self.client = self.get_openai_client()
+        self.router = ModelRouter.from_config()
 
     def get_openai_client(self):
         """
-        Initialize and return an OpenAI client.
+        Return the shared OpenAI client for the chat deployment.
 
         Returns:
-            AzureOpenAI: The initialized OpenAI client.
+            AzureOpenAI: The OpenAI client, backed by the shared connection pool.
         """
-        return AzureOpenAI(
-            api_key=Config.AZURE_OPENAI_API_KEY,
-            api_version=Config.AZURE_OPENAI_API_VERSION,
-            base_url=f"{Config.AZURE_OPENAI_ENDPOINT}/openai/deployments/{Config.AZURE_OPENAI_CHAT_DEPLOYMENT_NAME}"
-        )
+        return get_openai_client(Config.AZURE_OPENAI_CHAT_DEPLOYMENT_NAME)
 
-    def translate_image_text(self, text_data, target_language):
+    def translate_image_text(self, text_data, target_language, line_memory=None):
         """
         Translate text data in image using the Azure OpenAI API.
 
+        With a line memory, only lines without a remembered translation are sent (each distinct
+        line once), and no request is made when every line is known.
+
         Args:
             text_data (list): List of text lines to be translated.
             target_language (str): Target language for translation.
+            line_memory (LineTranslationMemory, optional): Remembered line translations, updated with new ones.
 
         Returns:
             list: List of translated text lines.
         """
+        if line_memory is None:
+            translations = self._translate_lines(text_data, target_language)
+            return [line if translated_line is None else translated_line for line, translated_line in zip(text_data, translations)]
+
+        translated_lines = line_memory.lookup(text_data, target_language)
+        missing_lines = {}
+        for line, translated_line in zip(text_data, translated_lines):
+            if translated_line is None:
+                missing_lines.setdefault(normalize_line(line), line)
+        if not missing_lines:
+            logger.info(f"All {len(text_data)} lines are in the translation memory. Skipping the request.")
+            return translated_lines
+
+        logger.info(f"Translating {len(missing_lines)} of {len(text_data)} lines; the others are in the translation memory.")
+        lines_to_translate = list(missing_lines.values())
+        new_translations = self._translate_lines(lines_to_translate, target_language)
+        answered = [(line, translated_line) for line, translated_line in zip(lines_to_translate, new_translations) if translated_line is not None]
+        if answered:
+            line_memory.store([line for line, _ in answered], [translated_line for _, translated_line in answered], target_language)
+
+        # Lines the answer missed keep their recognized text
+        translations_by_line = dict(zip(missing_lines, new_translations))
+        return [
+            translated_line if translated_line is not None else translations_by_line.get(normalize_line(line)) or line
+            for line, translated_line in zip(text_data, translated_lines)
+        ]
+
+    def _translate_lines(self, text_data, target_language):
+        """
+        Translate image text lines, matching the answer to the lines by ID if it has a different
+        number of lines than the request, since the position of each answer can then not be trusted.
+
+        Returns:
+            list: The translation of each line, or None where no translation could be matched to it.
+        """
+        translations = self._request_image_text(text_data, target_language)
+        if len(translations) == len(text_data):
+            return translations
+
+        logger.warning(f"Expected {len(text_data)} translated lines but received {len(translations)}. Retrying with line IDs.")
+        try:
+            return self.translate_image_lines_by_id(text_data, target_language)
+        except Exception as e:
+            logger.warning(f"Retrying with line IDs failed: {e}. Keeping the recognized text.")
+            return [None] * len(text_data)
+
+    def _request_image_text(self, text_data, target_language):
+        """
+        Send image text lines to the deployment routed for image text.
+        """
         prompt = gen_image_translation_prompt(text_data, target_language)
-        response = self.client.chat.completions.create(
-            model=Config.AZURE_OPENAI_MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2000
-        )
+
+        def create(deployment):
+            return get_openai_client(deployment).chat.completions.create(
+                model=Config.AZURE_OPENAI_MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=2000
+            )
+
+        # Image text is short and high-volume, so it can be routed to its own deployment
+        deployments = self.router.get_deployments(TASK_IMAGE_TEXT, count_tokens(prompt, get_tokenizer('o200k_base')))
+        response = call_with_fallback_sync(create, deployments, "Image text translation")
         return extract_yaml_lines(remove_code_backticks(response.choices[0].message.content))
 
+    def translate_image_lines_by_id(self, text_data, target_language):
+        """
+        Translate lines collected from several images in one request, matching the answer to the
+        lines by ID instead of by position.
+
+        Args:
+            text_data (list): List of distinct text lines to be translated.
+            target_language (str): Target language for translation.
+
+        Returns:
+            list: The translation of each line, or None where the answer has no line with its ID.
+        """
+        prompt = gen_image_batch_translation_prompt(text_data, target_language)
+
+        def create(deployment):
+            return get_openai_client(deployment).chat.completions.create(
+                model=Config.AZURE_OPENAI_MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=IMAGE_TEXT_BATCH_OUTPUT_TOKENS
+            )
+
+        deployments = self.router.get_deployments(TASK_IMAGE_TEXT, count_tokens(prompt, get_tokenizer('o200k_base')))
+        response = call_with_fallback_sync(create, deployments, f"Batched image text translation of {len(text_data)} lines")
+        translations = extract_id_lines(remove_code_backticks(response.choices[0].message.content))
+        return [translations.get(line_id) for line_id in range(len(text_data))]
+
     def translate_text(self, text, target_language):
         """
         Translate a given text into the target language using the Azure OpenAI API.
@@ -0,0 +1,312 @@
+import logging
+import math
+from pathlib import Path
+from co_op_translator.config.base_config import Config
+from co_op_translator.config.font_config import FontConfig
+from co_op_translator.config.constants import (
+    SUPPORTED_IMAGE_EXTENSIONS,
+    EXCLUDED_DIRS,
+    CACHE_DIR_NAME,
+    PREFILTER_CACHE_FILE,
+    MAX_CONCURRENT_TASKS,
+    MARKDOWN_MAX_OUTPUT_TOKENS,
+    MULTI_TARGET_MAX_LANGUAGES,
+    EXPANSION_RATIO_FILE,
+    PLAN_IMAGE_PROMPT_TOKENS,
+    PLAN_IMAGE_OUTPUT_TOKENS,
+    PLAN_IMAGE_TEXT_TOKENS,
+    PLAN_CHAT_BASE_LATENCY,
+    PLAN_CHAT_OUTPUT_TOKENS_PER_SECOND,
+    PLAN_OCR_LATENCY,
+    PLAN_PROMPT_DELAY,
+)
+from co_op_translator.utils.file_utils import read_input_file, filter_files, get_filename_and_extension, load_json_cache
+from co_op_translator.utils.image_utils import group_duplicate_images, lookup_text_presence
+from co_op_translator.utils.expansion_utils import ExpansionRatios
+from co_op_translator.utils.output_index import OutputIndex
+from co_op_translator.utils.markdown_utils import (
+    chunk_markdown_document,
+    generate_prompt_template,
+    generate_multi_language_prompt_template,
+    get_language_group_size,
+    generate_disclaimer_prompt,
+    count_links_in_markdown,
+    count_tokens,
+    get_tokenizer,
+)
+
+logger = logging.getLogger(__name__)
+
+class TranslationPlanner:
+    def __init__(self, language_codes, root_dir='.', perceptual_dedup=False, image_prefilter='conservative', multi_target=False):
+        """
+        Initialize the TranslationPlanner. Unlike ProjectTranslator, no API clients are
+        created, so no credentials are required.
+
+        Args:
+            language_codes (str): Space-separated target language codes.
+            root_dir (str): The root directory of the project.
+            perceptual_dedup (bool): Whether near-duplicate images are translated once.
+            image_prefilter (str): The local no-text prefilter mode used for images.
+            multi_target (bool): Whether markdown chunks are translated into several languages per request.
+        """
+        self.language_codes = language_codes.split()
+        self.root_dir = Path(root_dir).resolve()
+        self.translations_dir = self.root_dir / 'translations'
+        self.image_dir = self.root_dir / 'translated_images'
+        self.perceptual_dedup = perceptual_dedup
+        self.image_prefilter = image_prefilter
+        self.multi_target = multi_target
+        self.font_config = FontConfig()
+        self.tokenizer = get_tokenizer('o200k_base')
+        # The ratios learned by previous runs size the chunks exactly as the translation will
+        self.expansion_ratios = ExpansionRatios(self.root_dir / CACHE_DIR_NAME / EXPANSION_RATIO_FILE)
+        # Read only: the plan decides what would be skipped exactly as a run would, without saving the index
+        self.output_index = OutputIndex(self.root_dir, self.translations_dir, self.image_dir)
+
+    def _get_chunks(self, document, language_codes, chunk_cache):
+        """
+        Return the chunks of a document for the given languages and their token counts, chunking once per budget.
+        """
+        budget = self.expansion_ratios.get_chunk_token_budget(language_codes)
+        if budget not in chunk_cache:
+            chunks = chunk_markdown_document(document, max_tokens=budget)
+            chunk_cache[budget] = (chunks, [count_tokens(chunk, self.tokenizer) for chunk in chunks])
+        return chunk_cache[budget]
+
+    def _empty_language_plan(self):
+        return {
+            'markdown_files': 0,
+            'chat_requests': 0,
+            'links': 0,
+            'images': 0,
+            'ocr_requests': 0,
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'markdown_seconds': 0.0,
+            'image_seconds': 0.0,
+        }
+
+    def _chat_latency(self, output_tokens):
+        return PLAN_CHAT_BASE_LATENCY + output_tokens / PLAN_CHAT_OUTPUT_TOKENS_PER_SECOND
+
+    def plan_markdown(self, plans, update=False):
+        """
+        Chunk every markdown file that would be translated and add its requests and tokens to the plans.
+        """
+        markdown_files = [path.resolve() for path in filter_files(self.root_dir, EXCLUDED_DIRS) if path.suffix == '.md']
+
+        for md_file_path in markdown_files:
+            pending_languages = [
+                language_code for language_code in self.language_codes
+                if update or not self.output_index.has(md_file_path, language_code)
+            ]
+            if not pending_languages:
+                continue
+
+            document = read_input_file(md_file_path)
+            if not document:
+                continue
+
+            chunk_cache = {}
+            links = count_links_in_markdown(document)
+
+            if self.multi_target and len(pending_languages) > 1:
+                chunks, chunk_tokens = self._get_chunks(document, pending_languages, chunk_cache)
+                self._plan_markdown_multi(plans, pending_languages, chunks, chunk_tokens, links)
+                continue
+
+            for language_code in pending_languages:
+                plan = plans[language_code]
+                is_rtl = self.font_config.is_rtl(language_code)
+                chunks, chunk_tokens = self._get_chunks(document, language_code, chunk_cache)
+                expansion_ratio = self.expansion_ratios.get(language_code)
+                prompt_tokens = sum(count_tokens(generate_prompt_template(language_code, chunk, is_rtl), self.tokenizer) for chunk in chunks)
+                output_tokens = [round(tokens * expansion_ratio) for tokens in chunk_tokens]
+                disclaimer_tokens = count_tokens(generate_disclaimer_prompt(language_code), self.tokenizer)
+
+                plan['markdown_files'] += 1
+                plan['links'] += links
+                plan['chat_requests'] += len(chunks) + 1
+                plan['input_tokens'] += prompt_tokens + disclaimer_tokens
+                plan['output_tokens'] += sum(output_tokens) + disclaimer_tokens
+
+                # Chunks of a document run concurrently, the disclaimer runs after them
+                plan['markdown_seconds'] += (
+                    self._chat_latency(max(output_tokens, default=0)) + PLAN_PROMPT_DELAY
+                    + self._chat_latency(disclaimer_tokens) + PLAN_PROMPT_DELAY
+                )
+
+    def _plan_markdown_multi(self, plans, pending_languages, chunks, chunk_tokens, links):
+        """
+        Add the requests of a document translated in multi-target mode to the plans.
+        A request shared by a group of languages is counted for the first language of the group.
+        """
+        rtl_langs = {language_code for language_code in pending_languages if self.font_config.is_rtl(language_code)}
+        slowest_request = {language_code: 0.0 for language_code in pending_languages}
+        expansion_ratio = max(self.expansion_ratios.get(language_code) for language_code in pending_languages)
+
+        for chunk, tokens in zip(chunks, chunk_tokens):
+            group_size = get_language_group_size(tokens, MARKDOWN_MAX_OUTPUT_TOKENS, MULTI_TARGET_MAX_LANGUAGES, expansion_ratio)
+            for i in range(0, len(pending_languages), group_size):
+                group = pending_languages[i:i + group_size]
+                if len(group) == 1:
+                    prompt = generate_prompt_template(group[0], chunk, group[0] in rtl_langs)
+                else:
+                    prompt = generate_multi_language_prompt_template(group, chunk, rtl_langs)
+                output_tokens = sum(round(tokens * self.expansion_ratios.get(language_code)) for language_code in group)
+
+                plan = plans[group[0]]
+                plan['chat_requests'] += 1
+                plan['input_tokens'] += count_tokens(prompt, self.tokenizer)
+                plan['output_tokens'] += output_tokens
+                for language_code in group:
+                    slowest_request[language_code] = max(slowest_request[language_code], self._chat_latency(output_tokens))
+
+        disclaimer_seconds = 0.0
+        for language_code in pending_languages:
+            plan = plans[language_code]
+            disclaimer_tokens = count_tokens(generate_disclaimer_prompt(language_code), self.tokenizer)
+            disclaimer_seconds = max(disclaimer_seconds, self._chat_latency(disclaimer_tokens))
+            plan['markdown_files'] += 1
+            plan['links'] += links
+            plan['chat_requests'] += 1
+            plan['input_tokens'] += disclaimer_tokens
+            plan['output_tokens'] += disclaimer_tokens
+
+        # All groups of a document run concurrently, then its disclaimers; spread the document's time over its languages
+        document_seconds = max(slowest_request.values()) + PLAN_PROMPT_DELAY + disclaimer_seconds + PLAN_PROMPT_DELAY
+        for language_code in pending_languages:
+            plans[language_code]['markdown_seconds'] += document_seconds / len(pending_languages)
+
+    def plan_images(self, plans, update=False):
+        """
+        Group and prefilter every image that would be translated and add its requests and tokens to the plans.
+        """
+        image_files = [
+            path.resolve() for path in filter_files(self.root_dir, EXCLUDED_DIRS)
+            if get_filename_and_extension(path)[1] in SUPPORTED_IMAGE_EXTENSIONS
+        ]
+        image_groups = group_duplicate_images(image_files, perceptual=self.perceptual_dedup)
+        prefilter_cache = load_json_cache(self.root_dir / CACHE_DIR_NAME / PREFILTER_CACHE_FILE)
+
+        for image_group in image_groups:
+            pending_languages = [
+                language_code for language_code in self.language_codes
+                if update or not any(self.output_index.has(path, language_code) for path in image_group)
+            ]
+            if not pending_languages or not lookup_text_presence(image_group[0], self.image_prefilter, prefilter_cache):
+                continue
+
+            for language_code in pending_languages:
+                plan = plans[language_code]
+                plan['images'] += 1
+                plan['ocr_requests'] += 1
+                plan['output_tokens'] += PLAN_IMAGE_OUTPUT_TOKENS
+                if Config.IMAGE_TEXT_BATCH_MAX_TOKENS > 0:
+                    # The chat requests are added per batch below
+                    plan['input_tokens'] += PLAN_IMAGE_TEXT_TOKENS
+                    plan['image_seconds'] += PLAN_OCR_LATENCY
+                else:
+                    plan['chat_requests'] += 1
+                    plan['input_tokens'] += PLAN_IMAGE_PROMPT_TOKENS
+                    plan['image_seconds'] += PLAN_OCR_LATENCY + self._chat_latency(PLAN_IMAGE_OUTPUT_TOKENS)
+
+        if Config.IMAGE_TEXT_BATCH_MAX_TOKENS > 0:
+            # Lines of many images are sent together, up to the batch token budget
+            for plan in plans.values():
+                if not plan['images']:
+                    continue
+                batches = math.ceil(plan['images'] * PLAN_IMAGE_TEXT_TOKENS / Config.IMAGE_TEXT_BATCH_MAX_TOKENS)
+                plan['chat_requests'] += batches
+                plan['input_tokens'] += batches * (PLAN_IMAGE_PROMPT_TOKENS - PLAN_IMAGE_TEXT_TOKENS)
+                plan['image_seconds'] += batches * self._chat_latency(plan['images'] * PLAN_IMAGE_OUTPUT_TOKENS / batches)
+
+    def estimate_wall_time(self, totals):
+        """
+        Predict wall time as the slowest of the concurrency bounds and the configured rate limits.
+
+        Args:
+            totals (dict): The summed plan over all languages.
+
+        Returns:
+            tuple[float, str]: The predicted seconds and the name of the limiting factor.
+        """
+        bounds = {
+            'markdown concurrency': totals['markdown_seconds'] / MAX_CONCURRENT_TASKS,
+            'image concurrency': totals['image_seconds'] / min(MAX_CONCURRENT_TASKS, Config.MAX_OCR_REQUESTS),
+            'global in-flight limit': (totals['markdown_seconds'] + totals['image_seconds']) / Config.MAX_IN_FLIGHT_REQUESTS,
+        }
+        if Config.AZURE_OPENAI_REQUESTS_PER_MINUTE:
+            bounds['chat requests per minute'] = totals['chat_requests'] / Config.AZURE_OPENAI_REQUESTS_PER_MINUTE * 60
+        if Config.AZURE_OPENAI_TOKENS_PER_MINUTE:
+            bounds['chat tokens per minute'] = (totals['input_tokens'] + totals['output_tokens']) / Config.AZURE_OPENAI_TOKENS_PER_MINUTE * 60
+        if Config.AZURE_AI_SERVICE_REQUESTS_PER_MINUTE:
+            bounds['OCR requests per minute'] = totals['ocr_requests'] / Config.AZURE_AI_SERVICE_REQUESTS_PER_MINUTE * 60
+
+        limiting_factor = max(bounds, key=bounds.get)
+        return bounds[limiting_factor], limiting_factor
+
+    def plan(self, images=False, markdown=False, update=False):
+        """
+        Run the translation pipeline up to the network boundary and estimate its cost.
+
+        Args:
+            images (bool): Whether images would be translated.
+            markdown (bool): Whether markdown files would be translated.
+            update (bool): Whether existing translations would be recreated.
+
+        Returns:
+            dict: Per-language plans, their totals and the predicted wall time.
+        """
+        if not images and not markdown:
+            images = True
+            markdown = True
+
+        plans = {language_code: self._empty_language_plan() for language_code in self.language_codes}
+        if markdown:
+            self.plan_markdown(plans, update=update)
+        if images:
+            self.plan_images(plans, update=update)
+
+        totals = self._empty_language_plan()
+        for plan in plans.values():
+            for key, value in plan.items():
+                totals[key] += value
+
+        wall_seconds, limiting_factor = self.estimate_wall_time(totals)
+        return {
+            'languages': plans,
+            'totals': totals,
+            'wall_seconds': wall_seconds,
+            'limiting_factor': limiting_factor,
+        }
+
+def format_plan(plan):
+    """
+    Format a plan returned by TranslationPlanner.plan as a text report.
+
+    Args:
+        plan (dict): The plan to format.
+
+    Returns:
+        str: A table of per-language estimates followed by the totals and predicted wall time.
+    """
+    header = f"{'language':<10}{'md files':>10}{'images':>8}{'chat reqs':>11}{'ocr reqs':>10}{'links':>8}{'input tok':>12}{'output tok':>12}"
+    lines = [header, '-' * len(header)]
+
+    rows = list(plan['languages'].items()) + [('total', plan['totals'])]
+    for language_code, language_plan in rows:
+        if language_code == 'total':
+            lines.append('-' * len(header))
+        lines.append(
+            f"{language_code:<10}{language_plan['markdown_files']:>10}{language_plan['images']:>8}"
+            f"{language_plan['chat_requests']:>11}{language_plan['ocr_requests']:>10}{language_plan['links']:>8}"
+            f"{language_plan['input_tokens']:>12}{language_plan['output_tokens']:>12}"
+        )
+
+    minutes, seconds = divmod(int(plan['wall_seconds']), 60)
+    hours, minutes = divmod(minutes, 60)
+    lines.append('')
+    lines.append(f"Predicted wall time: {hours}h {minutes:02d}m {seconds:02d}s (limited by {plan['limiting_factor']})")
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+"""
+This module contains utility functions for building Azure service clients.
+All clients share process-wide keep-alive connection pools (one per endpoint host),
+so connections and TLS sessions are reused across translators and images.
+"""
+
+import logging
+from functools import lru_cache
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from openai import AzureOpenAI, AsyncAzureOpenAI
+from azure.ai.vision.imageanalysis import ImageAnalysisClient
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import RequestsTransport
+from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+from co_op_translator.config.base_config import Config
+
+logger = logging.getLogger(__name__)
+
+def _get_timeout() -> httpx.Timeout:
+    return httpx.Timeout(Config.HTTP_READ_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT)
+
+def _get_limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=Config.HTTP_POOL_SIZE, max_keepalive_connections=Config.HTTP_POOL_SIZE)
+
+@lru_cache(maxsize=None)
+def get_http_client() -> httpx.Client:
+    """
+    Return the shared synchronous HTTP client used by the OpenAI SDK clients.
+
+    Returns:
+        httpx.Client: A keep-alive client with the configured pool size and timeouts.
+    """
+    logger.info(f"Creating shared HTTP connection pool (size={Config.HTTP_POOL_SIZE})")
+    return httpx.Client(limits=_get_limits(), timeout=_get_timeout())
+
+@lru_cache(maxsize=None)
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared asynchronous HTTP client used by the Semantic Kernel chat services.
+
+    Note:
+        Pooled connections belong to the event loop that opened them, so the client is
+        meant to be used from a single long-lived event loop per process.
+
+    Returns:
+        httpx.AsyncClient: A keep-alive client with the configured pool size and timeouts.
+    """
+    logger.info(f"Creating shared async HTTP connection pool (size={Config.HTTP_POOL_SIZE})")
+    return httpx.AsyncClient(limits=_get_limits(), timeout=_get_timeout())
+
+@lru_cache(maxsize=None)
+def get_openai_client(deployment_name: str | None = None) -> AzureOpenAI:
+    """
+    Return a shared synchronous Azure OpenAI client.
+
+    Args:
+        deployment_name (str, optional): Bind the client to a deployment (chat completions).
+                                         If None, the client targets the resource endpoint (files, batches).
+
+    Returns:
+        AzureOpenAI: The client, backed by the shared connection pool.
+    """
+    Config.check_configuration()
+    if deployment_name:
+        return AzureOpenAI(
+            api_key=Config.AZURE_OPENAI_API_KEY,
+            api_version=Config.AZURE_OPENAI_API_VERSION,
+            base_url=f"{Config.AZURE_OPENAI_ENDPOINT}/openai/deployments/{deployment_name}",
+            http_client=get_http_client(),
+        )
+    return AzureOpenAI(
+        api_key=Config.AZURE_OPENAI_API_KEY,
+        api_version=Config.AZURE_OPENAI_API_VERSION,
+        azure_endpoint=Config.AZURE_OPENAI_ENDPOINT,
+        http_client=get_http_client(),
+    )
+
+@lru_cache(maxsize=None)
+def get_async_openai_client() -> AsyncAzureOpenAI:
+    """
+    Return the shared asynchronous Azure OpenAI client.
+
+    Returns:
+        AsyncAzureOpenAI: The client, backed by the shared async connection pool.
+    """
+    Config.check_configuration()
+    return AsyncAzureOpenAI(
+        api_key=Config.AZURE_OPENAI_API_KEY,
+        api_version=Config.AZURE_OPENAI_API_VERSION,
+        azure_endpoint=Config.AZURE_OPENAI_ENDPOINT,
+        http_client=get_async_http_client(),
+    )
+
+def get_chat_completion_service(service_id: str = "chat-gpt", deployment_name: str | None = None) -> AzureChatCompletion:
+    """
+    Create a Semantic Kernel chat completion service that reuses the shared async OpenAI client.
+
+    Args:
+        service_id (str): The service id registered in the kernel.
+        deployment_name (str, optional): The chat deployment. Defaults to the configured chat deployment.
+
+    Returns:
+        AzureChatCompletion: The chat completion service.
+    """
+    return AzureChatCompletion(
+        service_id=service_id,
+        deployment_name=deployment_name or Config.AZURE_OPENAI_CHAT_DEPLOYMENT_NAME,
+        endpoint=Config.AZURE_OPENAI_ENDPOINT,
+        api_key=Config.AZURE_OPENAI_API_KEY,
+        async_client=get_async_openai_client(),
+    )
+
+@lru_cache(maxsize=None)
+def get_image_analysis_client() -> ImageAnalysisClient:
+    """
+    Return the shared Image Analysis client, whose transport keeps its connections alive between images.
+
+    Returns:
+        ImageAnalysisClient: The initialized client.
+    """
+    Config.check_vision_configuration()
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    transport = RequestsTransport(
+        session=session,
+        session_owner=False,
+        connection_timeout=Config.HTTP_CONNECT_TIMEOUT,
+        read_timeout=Config.HTTP_READ_TIMEOUT,
+    )
+    return ImageAnalysisClient(Config.AZURE_AI_SERVICE_ENDPOINT, AzureKeyCredential(Config.AZURE_SUBSCRIPTION_KEY), transport=transport)
@@ -0,0 +1,94 @@
+"""
+This module contains utility functions for sizing markdown chunks by how much each target
+language expands the text. Output/input token ratios start from per-language defaults and
+are learned from completed translations, so chunks leave room for the translated output.
+"""
+
+import logging
+from co_op_translator.config.constants import (
+    MARKDOWN_MAX_OUTPUT_TOKENS,
+    MARKDOWN_MAX_INPUT_TOKENS,
+    MARKDOWN_MIN_INPUT_TOKENS,
+    CHUNK_OUTPUT_HEADROOM,
+    DEFAULT_EXPANSION_RATIO,
+    DEFAULT_EXPANSION_RATIOS,
+    EXPANSION_RATIO_SMOOTHING,
+    EXPANSION_RATIO_MIN_CHUNK_TOKENS,
+)
+from co_op_translator.utils.file_utils import load_json_cache, save_json_cache
+
+logger = logging.getLogger(__name__)
+
+def get_chunk_token_budget(expansion_ratio: float, max_output_tokens: int = MARKDOWN_MAX_OUTPUT_TOKENS) -> int:
+    """
+    Return the largest chunk whose expected translation fits in the output token limit with headroom.
+
+    Args:
+        expansion_ratio (float): Expected output tokens per input token.
+        max_output_tokens (int): The output token limit of a request.
+
+    Returns:
+        int: The chunk budget in input tokens, between MARKDOWN_MIN_INPUT_TOKENS and MARKDOWN_MAX_INPUT_TOKENS.
+    """
+    budget = int(max_output_tokens * CHUNK_OUTPUT_HEADROOM / expansion_ratio)
+    return max(MARKDOWN_MIN_INPUT_TOKENS, min(MARKDOWN_MAX_INPUT_TOKENS, budget))
+
+class ExpansionRatios:
+    def __init__(self, cache_path=None):
+        """
+        Initialize the ratios, loading previously learned values.
+
+        Args:
+            cache_path (Path, optional): The JSON file learned ratios are kept in. If None, they are kept in memory only.
+        """
+        self.cache_path = cache_path
+        # Mapping of language code to {'ratio': float, 'samples': int}
+        self.learned = load_json_cache(cache_path) if cache_path is not None else {}
+
+    def get(self, language_code):
+        """
+        Return the expected output/input token ratio of a language: the learned one if there is one, otherwise the default.
+        """
+        entry = self.learned.get(language_code)
+        if entry:
+            return entry['ratio']
+        return DEFAULT_EXPANSION_RATIOS.get(language_code, DEFAULT_EXPANSION_RATIO)
+
+    def get_chunk_token_budget(self, language_codes):
+        """
+        Return the chunk budget for a chunk translated into all the given languages, sized for the most expanding one.
+
+        Args:
+            language_codes (str | list): One language code or several.
+
+        Returns:
+            int: The chunk budget in input tokens.
+        """
+        if isinstance(language_codes, str):
+            language_codes = [language_codes]
+        return get_chunk_token_budget(max((self.get(language_code) for language_code in language_codes), default=DEFAULT_EXPANSION_RATIO))
+
+    def record(self, language_code, input_tokens, output_tokens):
+        """
+        Learn from a completed translation of a chunk with an exponential moving average.
+
+        Args:
+            language_code (str): The target language.
+            input_tokens (int): Tokens of the source chunk.
+            output_tokens (int): Tokens of its translation.
+        """
+        if input_tokens < EXPANSION_RATIO_MIN_CHUNK_TOKENS:
+            return
+        observed = output_tokens / input_tokens
+        entry = self.learned.get(language_code)
+        if entry is None:
+            entry = self.learned[language_code] = {'ratio': self.get(language_code), 'samples': 0}
+        entry['ratio'] = round(entry['ratio'] + EXPANSION_RATIO_SMOOTHING * (observed - entry['ratio']), 4)
+        entry['samples'] += 1
+
+    def save(self):
+        """
+        Persist the learned ratios.
+        """
+        if self.cache_path is not None and self.learned:
+            save_json_cache(self.cache_path, self.learned)
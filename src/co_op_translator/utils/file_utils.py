@@ -4,10 +4,12 @@ Functions include reading from files, writing to files, and handling empty docum
 """
 
 import hashlib
+import json
 from pathlib import Path
 import shutil
 import os
 import logging
+from co_op_translator.config.base_config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +53,41 @@ def write_output_file(output_file: str | Path, results: list) -> None:
             text_file.write(result)
             text_file.write("\n")
 
+def load_json_cache(cache_file: str | Path) -> dict:
+    """
+    Load a JSON cache file, returning an empty cache if it is missing or unreadable.
+
+    Args:
+        cache_file (str | Path): The path to the cache file.
+
+    Returns:
+        dict: The cached data.
+    """
+    cache_file = Path(cache_file)
+    if not cache_file.exists():
+        return {}
+    try:
+        with cache_file.open('r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable cache file {cache_file}: {e}")
+        return {}
+
+def save_json_cache(cache_file: str | Path, data: dict) -> None:
+    """
+    Atomically write a JSON cache file.
+
+    Args:
+        cache_file (str | Path): The path to the cache file.
+        data (dict): The data to store.
+    """
+    cache_file = Path(cache_file)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = cache_file.with_suffix(cache_file.suffix + '.tmp')
+    with temp_file.open('w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False)
+    os.replace(temp_file, cache_file)
+
 def get_actual_image_path(image_relative_path: str | Path, markdown_file_path: str | Path) -> Path:
     """
     Given an image's relative path from the markdown file, return the actual file path
@@ -101,6 +138,7 @@ def generate_translated_filename(original_filepath: str | Path, language_code: s
     Note:
     If the file path and the file name are identical, the same hash will be generated.
     This is because the hash is based on the entire file path.
+    The extension follows the configured image output format (see get_output_image_extension).
 
     Args:
         original_filepath (str): The original file path.
@@ -119,10 +157,68 @@ def generate_translated_filename(original_filepath: str | Path, language_code: s
     unique_hash = get_unique_id(str(original_filepath), root_dir)
 
     # Generate the new filename with the unique hash and language code
-    new_filename = f"{original_filename}.{unique_hash}.{language_code}{file_ext}"
+    new_filename = f"{original_filename}.{unique_hash}.{language_code}{get_output_image_extension(file_ext)}"
 
     return new_filename
 
+def get_output_image_extension(file_ext: str) -> str:
+    """
+    Return the extension translated images are written with.
+
+    Args:
+        file_ext (str): The extension of the source image.
+
+    Returns:
+        str: '.webp' when IMAGE_OUTPUT_FORMAT is 'webp', otherwise the source extension.
+    """
+    if Config.IMAGE_OUTPUT_FORMAT.lower() == 'webp':
+        return '.webp'
+    return file_ext
+
+def get_file_content_hash(file_path: str | Path, chunk_size: int = 1 << 20) -> str:
+    """
+    Generate a SHA-256 hash of the file's content, independent of where the file is located.
+
+    Args:
+        file_path (str | Path): The file to hash.
+        chunk_size (int): The number of bytes read per iteration.
+
+    Returns:
+        str: A SHA-256 hash of the file's bytes.
+    """
+    hash_object = hashlib.sha256()
+    with Path(file_path).open('rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            hash_object.update(chunk)
+    return hash_object.hexdigest()
+
+def link_or_copy_file(source_path: str | Path, destination_path: str | Path) -> Path:
+    """
+    Hardlink the source file to the destination, falling back to a plain copy
+    when hardlinks are not supported (e.g. across filesystems).
+
+    Args:
+        source_path (str | Path): The existing file.
+        destination_path (str | Path): The path to create.
+
+    Returns:
+        Path: The destination path.
+    """
+    source_path = Path(source_path)
+    destination_path = Path(destination_path)
+    if source_path.resolve() == destination_path.resolve():
+        return destination_path
+
+    destination_path.parent.mkdir(parents=True, exist_ok=True)
+    if destination_path.exists():
+        destination_path.unlink()
+
+    try:
+        os.link(source_path, destination_path)
+    except OSError:
+        shutil.copyfile(source_path, destination_path)
+    return destination_path
+
 def get_filename_and_extension(file_path: str | Path) -> tuple[str, str]:
     """
     Extract the filename without extension and the file extension from the given file path.
@@ -153,16 +249,25 @@ def filter_files(directory: str | Path, excluded_dirs) -> list:
     Returns:
         list: A list of Path objects representing only the files (excluding specified directories).
     """
-    directory = Path(directory)
-    files = []
+    return list(iter_filtered_files(directory, excluded_dirs))
+
+def iter_filtered_files(directory: str | Path, excluded_dirs):
+    """
+    Lazily yield the files in the given directory, without descending into excluded directories.
 
-    # Recursively traverse the directory
-    for path in directory.rglob('*'):
-        # Check if the path is a file and does not contain any excluded directories
-        if path.is_file() and not any(excluded_dir in path.parts for excluded_dir in excluded_dirs):
-            files.append(path)
+    Args:
+        directory (str | Path): The directory path to search for files.
+        excluded_dirs (set): A set of directory names to exclude from the search.
 
-    return files
+    Yields:
+        Path: Each file found outside the excluded directories.
+    """
+    directory = Path(directory)
+    for current_dir, dir_names, file_names in os.walk(directory):
+        # Prune excluded directories in place so they are never walked
+        dir_names[:] = sorted(name for name in dir_names if name not in excluded_dirs)
+        for file_name in sorted(file_names):
+            yield Path(current_dir) / file_name
 
 def reset_translation_directories(translations_dir: Path, image_dir: Path, language_codes: list):
     """
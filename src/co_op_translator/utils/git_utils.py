@@ -0,0 +1,62 @@
+"""
+This module contains utility functions for reading changes from a local git repository.
+Functions include listing the files that were added, modified, renamed or deleted since a given ref.
+"""
+
+import subprocess
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+def get_changed_paths(root_dir: str | Path, since: str) -> tuple[list, list, list]:
+    """
+    List the files under root_dir that changed between a git ref and the working tree.
+
+    Args:
+        root_dir (str | Path): The project root directory (inside a git work tree).
+        since (str): The git ref to compare against (e.g., 'origin/main', 'HEAD~3').
+
+    Returns:
+        tuple[list, list, list]: (changed, renamed, deleted) where changed is a list of Paths that
+        were added or modified, renamed is a list of (old_path, new_path, content_changed) tuples
+        and deleted is a list of Paths. All paths are absolute.
+
+    Raises:
+        RuntimeError: If git fails (e.g., not a repository or unknown ref).
+    """
+    root_dir = Path(root_dir).resolve()
+    command = ["git", "diff", "--name-status", "-M", "-z", "--relative", since, "--"]
+
+    try:
+        result = subprocess.run(command, cwd=root_dir, capture_output=True, check=True)
+    except FileNotFoundError as e:
+        raise RuntimeError("git is not installed or not on PATH.") from e
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"git diff against '{since}' failed: {e.stderr.decode('utf-8', 'replace').strip()}") from e
+
+    fields = result.stdout.decode('utf-8').split('\0')
+    changed, renamed, deleted = [], [], []
+
+    index = 0
+    while index < len(fields) and fields[index]:
+        status = fields[index]
+        if status[0] in ('R', 'C'):
+            old_path, new_path = root_dir / fields[index + 1], root_dir / fields[index + 2]
+            index += 3
+            if status[0] == 'R':
+                # R100 means the content is identical, anything lower was also edited
+                renamed.append((old_path, new_path, status[1:] != '100'))
+            else:
+                changed.append(new_path)
+            continue
+
+        path = root_dir / fields[index + 1]
+        index += 2
+        if status[0] == 'D':
+            deleted.append(path)
+        else:
+            changed.append(path)
+
+    logger.info(f"Changes since {since}: {len(changed)} changed, {len(renamed)} renamed, {len(deleted)} deleted")
+    return changed, renamed, deleted
@@ -0,0 +1,115 @@
+"""
+This module contains the cross-image batching stage for recognized image text.
+Most images only carry a few short lines, so a request per image is dominated by the fixed
+prompt and the round trip. Lines of many images for the same language are collected up to a
+token budget, sent in one request with a stable ID per line, and the translations are
+scattered back to the images waiting for them.
+"""
+
+import asyncio
+import logging
+from co_op_translator.config.base_config import Config
+from co_op_translator.utils.markdown_utils import count_tokens, get_tokenizer
+from co_op_translator.utils.translation_memory import normalize_line
+
+logger = logging.getLogger(__name__)
+
+class _PendingBatch:
+    def __init__(self, language_code, language_name):
+        self.language_code = language_code
+        self.language_name = language_name
+        # (lines, future) per waiting image
+        self.entries = []
+        self.tokens = 0
+        self.timer = None
+
+class ImageTextBatcher:
+    def __init__(self, text_translator, scheduler, max_tokens=None, max_wait=None):
+        """
+        Initialize the batcher. Settings default to the configuration.
+
+        Args:
+            text_translator (TextTranslator): Sends the batched requests.
+            scheduler (RequestScheduler): Bounds the batched requests with the 'chat' pool.
+            max_tokens (int): Tokens of recognized lines sent in one request.
+            max_wait (float): Seconds a batch waits for more images before it is sent.
+        """
+        self.text_translator = text_translator
+        self.scheduler = scheduler
+        self.max_tokens = max_tokens or Config.IMAGE_TEXT_BATCH_MAX_TOKENS
+        self.max_wait = Config.IMAGE_TEXT_BATCH_WAIT if max_wait is None else max_wait
+        self.tokenizer = get_tokenizer('o200k_base')
+        self._pending = {}
+        self._sending = set()
+
+    async def translate(self, lines, language_code, language_name):
+        """
+        Translate the lines of one image together with the lines of other images.
+
+        Args:
+            lines (list): The recognized lines of the image.
+            language_code (str): The target language code, which selects the batch and the scheduler queue.
+            language_name (str): The target language name used in the prompt.
+
+        Returns:
+            list: The translation of each line, or None where the answer missed it.
+
+        Raises:
+            Exception: If the batched request failed.
+        """
+        tokens = sum(count_tokens(line, self.tokenizer) for line in lines)
+        batch = self._pending.get(language_code)
+        if batch is not None and batch.entries and batch.tokens + tokens > self.max_tokens:
+            self._flush(batch)
+            batch = None
+        if batch is None:
+            batch = self._pending[language_code] = _PendingBatch(language_code, language_name)
+            batch.timer = asyncio.create_task(self._flush_later(batch))
+
+        future = asyncio.get_running_loop().create_future()
+        batch.entries.append((lines, future))
+        batch.tokens += tokens
+        if batch.tokens >= self.max_tokens:
+            self._flush(batch)
+        return await future
+
+    async def _flush_later(self, batch):
+        await asyncio.sleep(self.max_wait)
+        batch.timer = None
+        self._flush(batch)
+
+    def _flush(self, batch):
+        if self._pending.get(batch.language_code) is batch:
+            del self._pending[batch.language_code]
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+        # Keep a reference so the task is not collected while it runs
+        task = asyncio.create_task(self._send(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch):
+        # Lines repeated across the images of a batch get a single ID
+        line_ids = {}
+        distinct_lines = []
+        for lines, _ in batch.entries:
+            for line in lines:
+                key = normalize_line(line)
+                if key not in line_ids:
+                    line_ids[key] = len(distinct_lines)
+                    distinct_lines.append(line)
+
+        logger.info(f"Translating {len(distinct_lines)} lines of {len(batch.entries)} images to {batch.language_code} in one request.")
+        try:
+            async with self.scheduler.slot('chat', batch.language_code):
+                translations = await asyncio.to_thread(self.text_translator.translate_image_lines_by_id, distinct_lines, batch.language_name)
+        except Exception as e:
+            for _, future in batch.entries:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for lines, future in batch.entries:
+            if not future.done():
+                future.set_result([translations[line_ids[normalize_line(line)]] for line in lines])
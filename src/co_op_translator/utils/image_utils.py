@@ -3,15 +3,20 @@ This module contains utility functions for handling images.
 Functions include saving and loading bounding boxes, drawing text on images, and plotting images with bounding boxes.
 """
 
+import contextlib
+import io
 import os
+import shutil
+from pathlib import Path
 import logging
 import json
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageStat
 import matplotlib.pyplot as plt
+from co_op_translator.config.base_config import Config
 from co_op_translator.config.font_config import FontConfig
-from co_op_translator.utils.file_utils import get_filename_and_extension
+from co_op_translator.utils.file_utils import get_filename_and_extension, get_file_content_hash, link_or_copy_file
 
 logger = logging.getLogger(__name__)
 
@@ -133,6 +138,58 @@ def create_filled_polygon_mask(bounding_box, image_size, fill_color):
     mask_draw.polygon(pts, fill=fill_color)
     return mask_image
 
+def draw_bounding_boxes(image, line_bounding_boxes, font, font_size, verbose=False):
+    """
+    Draw OCR bounding boxes and their labels onto an image in place.
+
+    Args:
+        image (PIL.Image.Image): The image to draw on.
+        line_bounding_boxes (list): List of bounding boxes and text data.
+        font (PIL.ImageFont.FreeTypeFont): The label font.
+        font_size (int): The label font size, used to place labels above their boxes.
+        verbose (bool): Whether to print each line (notebook use).
+    """
+    draw = ImageDraw.Draw(image)
+    for line_info in line_bounding_boxes:
+        if verbose:
+            print(line_info)
+        bounding_box = line_info['bounding_box']
+        confidence = line_info['confidence']
+        pts = [(bounding_box[i], bounding_box[i+1]) for i in range(0, len(bounding_box), 2)]
+        
+        # Draw thicker polygon for bounding box with width parameter
+        draw.line(pts + [pts[0]], fill="yellow", width=4)
+        
+        # Coordinates for the text
+        x, y = bounding_box[0], bounding_box[1] - font_size
+        label = line_info['text'] if confidence is None else f"{line_info['text']} ({confidence:.2f})"
+
+        # Draw black text with a white outline in a single stroked draw call
+        draw.text((x, y), label, font=font, fill="black", stroke_width=2, stroke_fill="white")
+
+def render_bounding_boxes(image_path, line_bounding_boxes, output_path, language_code="en", font_size=20):
+    """
+    Headless version of plot_bounding_boxes: draw the bounding boxes and save the overlay to output_path.
+    Defined at module level so it can run in a process pool.
+
+    Args:
+        image_path (str or Path): Path to the image file.
+        line_bounding_boxes (list): List of bounding boxes and text data.
+        output_path (str or Path): Where the overlay is saved.
+        language_code (str): The language whose font is used for labels.
+        font_size (int): The label font size.
+
+    Returns:
+        str: The output path.
+    """
+    font = ImageFont.truetype(FontConfig().get_font_path(language_code), font_size)
+    with Image.open(image_path) as image:
+        image = image.convert(get_image_mode(image_path))
+        draw_bounding_boxes(image, line_bounding_boxes, font, font_size)
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        image.save(output_path)
+    return str(output_path)
+
 # Function to Plot Bounding Boxes on Image. Set display=True to display the image in a notebook.
 # Saves images to ./analyzed_images
 def plot_bounding_boxes(image_path, line_bounding_boxes, language_code="en", display=True):
@@ -140,7 +197,6 @@ def plot_bounding_boxes(image_path, line_bounding_boxes, language_code="en", dis
     os.makedirs('./analyzed_images', exist_ok=True)
     
     image = Image.open(image_path)
-    draw = ImageDraw.Draw(image)
     
     font_size = 20
     # Load the font using FontConfig
@@ -148,27 +204,7 @@ def plot_bounding_boxes(image_path, line_bounding_boxes, language_code="en", dis
     font_path = font_config.get_font_path(language_code)
     font = ImageFont.truetype(font_path, font_size)
     
-    for line_info in line_bounding_boxes:
-        print(line_info)
-        bounding_box = line_info['bounding_box']
-        confidence = line_info['confidence']
-        pts = [(bounding_box[i], bounding_box[i+1]) for i in range(0, len(bounding_box), 2)]
-        
-        # Draw thicker polygon for bounding box with width parameter
-        draw.line(pts + [pts[0]], fill="yellow", width=4)
-        
-        # Coordinates for the text
-        x, y = bounding_box[0], bounding_box[1] - font_size
-
-        # Draw white text outline
-        outline_range = 2
-        for dx in range(-outline_range, outline_range + 1):
-            for dy in range(-outline_range, outline_range + 1):
-                if dx != 0 or dy != 0:
-                    draw.text((x + dx, y + dy), f"{line_info['text']} ({confidence:.2f})", font=font, fill="white")
-
-        # Draw black text
-        draw.text((x, y), f"{line_info['text']} ({confidence:.2f})", font=font, fill="black")
+    draw_bounding_boxes(image, line_bounding_boxes, font, font_size, verbose=True)
     
     # Save the annotated image
     output_path = os.path.join('./analyzed_images', os.path.basename(image_path))
@@ -245,3 +281,401 @@ def get_image_mode(image_path):
         return 'RGB'
     else:
         raise ValueError(f"Unsupported image format: {extension}")
+
+def get_image_bytes_extension(image_bytes):
+    """
+    Determine the file extension of an encoded image from its content.
+
+    Args:
+        image_bytes (bytes): The encoded image.
+
+    Returns:
+        str: '.png' for PNG images, '.jpg' for JPEG images.
+
+    Raises:
+        ValueError: If the image is neither PNG nor JPEG.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image_format = image.format
+    if image_format == 'PNG':
+        return '.png'
+    elif image_format == 'JPEG':
+        return '.jpg'
+    else:
+        raise ValueError(f"Unsupported image format: {image_format}")
+
+def save_image(image, output_path):
+    """
+    Encode an image with the configured settings for the format of its output path.
+
+    Args:
+        image (PIL.Image.Image): The image to save.
+        output_path (str or Path): The destination; its extension selects PNG, JPEG or WebP.
+    """
+    output_path = Path(output_path)
+    # Never write through an existing file, which may be a hardlink to a source image
+    if output_path.exists():
+        output_path.unlink()
+
+    _write_encoded_image(image, output_path, output_path.suffix.lower())
+
+def encode_image(image, extension):
+    """
+    Encode an image in memory with the same settings save_image uses.
+
+    Args:
+        image (PIL.Image.Image): The image to encode.
+        extension (str): '.png', '.jpg', '.jpeg' or '.webp'.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    buffer = io.BytesIO()
+    _write_encoded_image(image, buffer, extension.lower())
+    return buffer.getvalue()
+
+def _write_encoded_image(image, destination, extension):
+    if extension == '.webp':
+        image.save(destination, format='WEBP', quality=Config.WEBP_QUALITY, lossless=Config.WEBP_LOSSLESS, method=Config.WEBP_METHOD)
+    elif extension in ('.jpg', '.jpeg'):
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(destination, format='JPEG', quality=Config.JPEG_QUALITY, optimize=Config.JPEG_OPTIMIZE)
+    else:
+        image.save(destination, format='PNG', compress_level=Config.PNG_COMPRESS_LEVEL)
+
+def save_untranslated_image(image_path, output_path):
+    """
+    Write an image that has nothing to translate to its translated path without re-encoding it,
+    as a byte copy or, if IMAGE_PASSTHROUGH_HARDLINK is set, a hardlink.
+    Only when the output format differs from the source (WebP output) is the image converted.
+
+    Args:
+        image_path (str or Path): The source image.
+        output_path (str or Path): The translated image path.
+
+    Returns:
+        str: The output path.
+    """
+    image_path = Path(image_path)
+    output_path = Path(output_path)
+
+    if output_path.suffix.lower() != get_filename_and_extension(image_path)[1]:
+        with Image.open(image_path) as image:
+            save_image(image.convert(get_image_mode(image_path)), output_path)
+    elif Config.IMAGE_PASSTHROUGH_HARDLINK:
+        link_or_copy_file(image_path, output_path)
+    else:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if output_path.exists():
+            output_path.unlink()
+        shutil.copyfile(image_path, output_path)
+    return str(output_path)
+
+def get_perceptual_hash(image_path, hash_size=8):
+    """
+    Compute a difference hash (dHash) of an image, which stays stable when the
+    same picture is re-encoded, resized or slightly recompressed.
+
+    Args:
+        image_path (str or Path): The path to the image file.
+        hash_size (int): The width/height of the hash grid (hash_size**2 bits).
+
+    Returns:
+        str: The perceptual hash as a hexadecimal string.
+    """
+    with Image.open(image_path) as image:
+        grayscale = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = np.asarray(grayscale, dtype=np.int16)
+
+    diff = pixels[:, 1:] > pixels[:, :-1]
+    value = 0
+    for bit in diff.flatten():
+        value = (value << 1) | int(bit)
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+def are_near_duplicate_images(image_path, other_path, block_size=16, max_block_difference=12):
+    """
+    Check whether two images with the same perceptual hash show the same picture.
+
+    A 64-bit hash also matches different screenshots that share a layout, so the images must
+    have the same dimensions and no block of block_size x block_size pixels may differ by more
+    than max_block_difference levels on average. Re-encoding noise stays well below that, while
+    a changed word or label shifts its block far above it.
+
+    Args:
+        image_path (str or Path): The path to the first image file.
+        other_path (str or Path): The path to the second image file.
+        block_size (int): The edge of the compared pixel blocks.
+        max_block_difference (float): The largest mean difference (0 to 255) allowed in any block.
+
+    Returns:
+        bool: True if the images can share one translation.
+    """
+    with Image.open(image_path) as image, Image.open(other_path) as other:
+        if image.size != other.size:
+            return False
+        pixels = np.asarray(image.convert('RGB'), dtype=np.int16)
+        other_pixels = np.asarray(other.convert('RGB'), dtype=np.int16)
+
+    difference = np.abs(pixels - other_pixels).max(axis=2)
+    height, width = difference.shape
+    difference = np.pad(difference, ((0, -height % block_size), (0, -width % block_size)))
+    blocks = difference.reshape(difference.shape[0] // block_size, block_size, difference.shape[1] // block_size, block_size)
+    return blocks.mean(axis=(1, 3)).max() <= max_block_difference
+
+def group_duplicate_images(image_paths, perceptual=False):
+    """
+    Group image files that share the same content so each distinct image is processed only once.
+
+    Args:
+        image_paths (list): Paths of the image files to group.
+        perceptual (bool): Also merge groups of near-duplicates such as re-encoded copies: images with
+                           the same perceptual hash that also pass are_near_duplicate_images.
+
+    Returns:
+        list: A list of groups, each a list of Paths. The first path of each group is its representative.
+    """
+    groups = {}
+    for image_path in sorted(image_paths):
+        try:
+            key = get_file_content_hash(image_path)
+        except OSError as e:
+            logger.warning(f"Could not hash image {image_path}: {e}")
+            key = str(image_path)
+        groups.setdefault(key, []).append(image_path)
+
+    if perceptual:
+        candidates = {}
+        for key, paths in groups.items():
+            try:
+                perceptual_key = f"{get_filename_and_extension(paths[0])[1]}:{get_perceptual_hash(paths[0])}"
+            except Exception as e:
+                logger.warning(f"Could not compute perceptual hash for {paths[0]}: {e}")
+                perceptual_key = key
+            candidates.setdefault(perceptual_key, []).append(paths)
+
+        # A hash match is only a candidate; merge into the first group whose representative passes the pixel check
+        merged = []
+        for candidate_groups in candidates.values():
+            clusters = []
+            for paths in candidate_groups:
+                for cluster in clusters:
+                    try:
+                        if are_near_duplicate_images(cluster[0], paths[0]):
+                            cluster.extend(paths)
+                            break
+                    except Exception as e:
+                        logger.warning(f"Could not compare {cluster[0]} with {paths[0]}: {e}")
+                else:
+                    clusters.append(list(paths))
+            merged.extend(clusters)
+        groups = {index: paths for index, paths in enumerate(merged)}
+
+    for paths in groups.values():
+        if len(paths) > 1:
+            logger.info(f"Found {len(paths)} copies of the same image: {paths[0]}")
+
+    return list(groups.values())
+
+def prepare_image_for_ocr(image_path, max_edge=2048, jpeg_quality=90):
+    """
+    Prepare the bytes uploaded for OCR, downscaling images whose longest edge
+    exceeds max_edge and recompressing them as JPEG.
+
+    JPEG sources are decoded with draft mode so the decoder can skip
+    resolution that would be thrown away anyway.
+
+    Args:
+        image_path (str or Path): The path to the image file.
+        max_edge (int): The maximum width/height of the uploaded image. 0 disables downscaling.
+        jpeg_quality (int): The JPEG quality used for the recompressed upload.
+
+    Returns:
+        tuple: (image_bytes, scale) where scale is the (x, y) factor applied to the original
+               coordinates ((1.0, 1.0) when the original file is uploaded unchanged).
+    """
+    with open(image_path, "rb") as image_stream:
+        original_bytes = image_stream.read()
+
+    return prepare_image_bytes_for_ocr(original_bytes, max_edge, jpeg_quality, label=image_path)
+
+def prepare_image_bytes_for_ocr(original_bytes, max_edge=2048, jpeg_quality=90, label="image"):
+    """
+    Prepare the OCR upload of an image held in memory. See prepare_image_for_ocr.
+
+    Args:
+        original_bytes (bytes): The encoded image.
+        max_edge (int): The maximum width/height of the uploaded image. 0 disables downscaling.
+        jpeg_quality (int): The JPEG quality used for the recompressed upload.
+        label (str): Names the image in log messages.
+
+    Returns:
+        tuple: (image_bytes, scale) as returned by prepare_image_for_ocr.
+    """
+    if not max_edge:
+        return original_bytes, (1.0, 1.0)
+
+    with Image.open(io.BytesIO(original_bytes)) as image:
+        original_width, original_height = image.size
+        longest_edge = max(original_width, original_height)
+        if longest_edge <= max_edge:
+            return original_bytes, (1.0, 1.0)
+
+        scale = max_edge / longest_edge
+        target_size = (max(1, round(original_width * scale)), max(1, round(original_height * scale)))
+
+        if image.format == 'JPEG':
+            image.draft('RGB', target_size)
+
+        image = image.convert('RGBA')
+        background = Image.new('RGBA', image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image).convert('RGB')
+        image = image.resize(target_size, Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=jpeg_quality)
+    upload_bytes = buffer.getvalue()
+
+    # Use the exact per-axis factors of the image that was actually uploaded
+    scale = (target_size[0] / original_width, target_size[1] / original_height)
+    logger.info(f"Downscaled {label} for OCR: {original_width}x{original_height} -> {target_size[0]}x{target_size[1]}, "
+                f"{len(original_bytes)} -> {len(upload_bytes)} bytes")
+    return upload_bytes, scale
+
+def rescale_bounding_box(bounding_box, scale):
+    """
+    Map a bounding polygon from the coordinates of a scaled image back to the original resolution.
+
+    Args:
+        bounding_box (list): Flat list of polygon coordinates [x1, y1, x2, y2, ...].
+        scale (tuple): The (x, y) factors that were applied to the original image.
+
+    Returns:
+        list: The bounding box in original-resolution coordinates.
+    """
+    scale_x, scale_y = scale
+    if scale_x == 1.0 and scale_y == 1.0:
+        return bounding_box
+    return [coordinate / (scale_x if i % 2 == 0 else scale_y) for i, coordinate in enumerate(bounding_box)]
+
+def estimate_text_presence(image_path, mode="conservative", min_edge=50, max_analysis_edge=1024):
+    """
+    Cheaply estimate, without any remote call, whether an image may contain text.
+
+    The conservative mode only rules out images that cannot hold readable text:
+    images smaller than the OCR minimum size and nearly flat images without edges.
+    The aggressive mode additionally requires clusters of horizontally aligned,
+    glyph-sized stroke components, which rules out most photos, icons and logos.
+
+    Args:
+        image_path (str or Path): The path to the image file.
+        mode (str): 'conservative' or 'aggressive'.
+        min_edge (int): Images with a shorter edge than this are treated as text-free.
+        max_analysis_edge (int): Images are downscaled to this size before analysis.
+
+    Returns:
+        bool: False if the image is considered text-free, True if it may contain text.
+    """
+    with Image.open(image_path) as image:
+        width, height = image.size
+        if min(width, height) < min_edge:
+            return False
+
+        analysis_scale = min(1.0, max_analysis_edge / max(width, height))
+        analysis_size = (max(1, round(width * analysis_scale)), max(1, round(height * analysis_scale)))
+        if image.format == 'JPEG':
+            image.draft('L', analysis_size)
+        grayscale = image.convert('L')
+        if grayscale.size != analysis_size:
+            grayscale = grayscale.resize(analysis_size, Image.BILINEAR)
+        pixels = np.asarray(grayscale)
+
+    edges = cv2.Canny(pixels, 100, 200)
+    edge_density = np.count_nonzero(edges) / edges.size
+    if edge_density < 0.002:
+        return False
+
+    if mode != "aggressive":
+        return True
+
+    return count_aligned_glyph_components(pixels) >= 6
+
+def lookup_text_presence(image_path, mode, cache, content_hash=None, lock=None):
+    """
+    Check whether an image may contain text, consulting and filling a cache keyed by content hash.
+
+    Args:
+        image_path (str, Path or file object): The image file.
+        mode (str): 'off', 'conservative' or 'aggressive'.
+        cache (dict): Mapping of content hash to {'ocr' | mode: bool}, updated in place.
+        content_hash (str, optional): The hash of the image content. Computed from the file if None.
+        lock (threading.Lock, optional): Held while the cache is read or updated, when it is shared between threads.
+
+    Returns:
+        bool: False if the image is known or estimated to be text-free.
+    """
+    if mode == 'off':
+        return True
+
+    lock = lock or contextlib.nullcontext()
+    try:
+        content_hash = content_hash or get_file_content_hash(image_path)
+        with lock:
+            entry = cache.get(content_hash, {})
+            # A previous OCR result is authoritative regardless of the prefilter mode
+            if 'ocr' in entry:
+                return entry['ocr']
+            if mode in entry:
+                return entry[mode]
+
+        # The estimate runs outside the lock so other images are not held up
+        has_text = estimate_text_presence(image_path, mode)
+        with lock:
+            cache.setdefault(content_hash, {})[mode] = has_text
+        return has_text
+    except Exception as e:
+        logger.warning(f"Text prefilter failed for {image_path}: {e}. Falling back to OCR.")
+        return True
+
+def count_aligned_glyph_components(pixels):
+    """
+    Count glyph-sized connected components that sit on a common text line with at least two neighbours.
+
+    Args:
+        pixels (numpy.ndarray): Grayscale image array.
+
+    Returns:
+        int: The number of aligned glyph-like components found in either polarity.
+    """
+    image_height, image_width = pixels.shape[:2]
+    _, binary = cv2.threshold(pixels, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    best = 0
+    for polarity in (binary, cv2.bitwise_not(binary)):
+        _, _, stats, _ = cv2.connectedComponentsWithStats(polarity, connectivity=8)
+        x, y, w, h, area = (stats[1:, i].astype(np.float32) for i in range(5))
+        fill = area / np.maximum(w * h, 1)
+        glyphs = (
+            (h >= 4) & (h <= image_height * 0.2) & (w >= 1) & (w <= image_width * 0.3)
+            & (w / np.maximum(h, 1) <= 5) & (fill >= 0.1) & (fill <= 0.95)
+        )
+        if not np.any(glyphs):
+            continue
+
+        # Keep the analysis bounded on noisy images
+        candidates = np.flatnonzero(glyphs)[:2000]
+        center_y = y[candidates] + h[candidates] / 2
+        heights = h[candidates]
+        left = x[candidates]
+        right = left + w[candidates]
+
+        same_line = (
+            (np.abs(center_y[:, None] - center_y[None, :]) <= heights[:, None] / 2)
+            & (np.abs(heights[:, None] - heights[None, :]) <= heights[:, None] * 0.5)
+            & (np.maximum(left[None, :] - right[:, None], left[:, None] - right[None, :]) <= heights[:, None] * 2)
+        )
+        np.fill_diagonal(same_line, False)
+        best = max(best, int(np.count_nonzero(same_line.sum(axis=1) >= 2)))
+
+    return best
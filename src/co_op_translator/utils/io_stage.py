@@ -0,0 +1,174 @@
+"""
+This module contains the file I/O stage used by the project translator.
+Source reads are prefetched in worker threads ahead of translation, and outputs go to a
+bounded write-behind queue drained by a small thread pool, so the event loop never blocks on disk.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from co_op_translator.config.base_config import Config
+from co_op_translator.utils.file_utils import read_input_file
+
+logger = logging.getLogger(__name__)
+
+class IOStage:
+    def __init__(self, queue_size=None, workers=None, batch_size=None, fsync=None):
+        """
+        Initialize the I/O stage. Settings default to the configuration.
+
+        Args:
+            queue_size (int): Maximum number of pending writes before writers wait.
+            workers (int): Number of threads writing files.
+            batch_size (int): Maximum number of files written per thread hand-off.
+            fsync (str): 'none' (leave flushing to the OS), 'file' (fsync every file as it is written)
+                         or 'batch' (fsync the files of each batch and their directories after writing them all).
+        """
+        self.queue_size = queue_size or Config.IO_WRITE_QUEUE_SIZE
+        self.workers = workers or Config.IO_WRITE_WORKERS
+        self.batch_size = batch_size or Config.IO_WRITE_BATCH_SIZE
+        self.fsync = (fsync or Config.IO_FSYNC).lower()
+        self.executor = None
+        self._loop = None
+        self._queue = None
+        self._drainers = []
+        self._prefetched = {}
+
+    def _ensure_started(self):
+        # Queues and futures belong to one event loop; start afresh for each asyncio.run
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="co-op-writer")
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._drainers = [loop.create_task(self._drain()) for _ in range(self.workers)]
+            self._prefetched = {}
+
+    def prefetch(self, file_path, uses=1):
+        """
+        Start reading a source file in a worker thread so it is ready when its translation starts.
+
+        Args:
+            file_path (Path): The file to read.
+            uses (int): How many read_text calls will consume the prefetched content.
+        """
+        self._ensure_started()
+        file_path = Path(file_path).resolve()
+        if file_path in self._prefetched:
+            future, remaining = self._prefetched[file_path]
+            self._prefetched[file_path] = (future, remaining + uses)
+            return
+        future = self._loop.run_in_executor(None, read_input_file, file_path)
+        self._prefetched[file_path] = (future, uses)
+
+    async def read_text(self, file_path):
+        """
+        Return the stripped content of a file, using the prefetched read if there is one.
+
+        Args:
+            file_path (Path): The file to read.
+
+        Returns:
+            str: The stripped content of the file.
+        """
+        self._ensure_started()
+        file_path = Path(file_path).resolve()
+        if file_path not in self._prefetched:
+            return await self._loop.run_in_executor(None, read_input_file, file_path)
+
+        future, remaining = self._prefetched[file_path]
+        if remaining <= 1:
+            del self._prefetched[file_path]
+        else:
+            self._prefetched[file_path] = (future, remaining - 1)
+        return await future
+
+    async def write_text(self, file_path, content, on_written=None):
+        """
+        Queue a text file to be written. Waits only when the write-behind queue is full.
+
+        Args:
+            file_path (Path): The file to write; parent directories are created.
+            content (str): The text to write.
+            on_written (callable, optional): Called without arguments in the writer thread once the
+                                             file has been written (and synced), not if writing failed.
+        """
+        self._ensure_started()
+        await self._queue.put((Path(file_path), content, on_written))
+
+    async def flush(self):
+        """
+        Wait until every queued write has been written.
+        """
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def close(self):
+        """
+        Write every queued file, then stop the drainer tasks and the writer threads.
+        The stage starts again if it is used afterwards.
+        """
+        if self._loop is asyncio.get_running_loop():
+            await self.flush()
+            for drainer in self._drainers:
+                drainer.cancel()
+            await asyncio.gather(*self._drainers, return_exceptions=True)
+        self._loop = None
+        self._queue = None
+        self._drainers = []
+        self._prefetched = {}
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await loop.run_in_executor(self.executor, self._write_batch, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        """
+        Write a batch of files in a worker thread, applying the fsync policy.
+        """
+        written = []
+        for file_path, content, on_written in batch:
+            try:
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(file_path, "w", encoding='utf-8') as f:
+                    f.write(content)
+                    if self.fsync == 'file':
+                        f.flush()
+                        os.fsync(f.fileno())
+                written.append((file_path, on_written))
+                logger.info(f"Wrote {file_path}")
+            except OSError as e:
+                logger.error(f"Failed to write {file_path}: {e}")
+
+        if self.fsync == 'batch':
+            # Sync only this batch's files and the directories holding their entries
+            for path in [file_path for file_path, _ in written] + sorted({file_path.parent for file_path, _ in written}):
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                except OSError:
+                    # Directories cannot be opened on Windows
+                    continue
+                try:
+                    os.fsync(fd)
+                except OSError as e:
+                    logger.warning(f"Failed to sync {path}: {e}")
+                finally:
+                    os.close(fd)
+
+        for file_path, on_written in written:
+            if on_written is not None:
+                on_written()
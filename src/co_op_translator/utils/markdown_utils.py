@@ -7,10 +7,11 @@ import os
 import re
 import tiktoken
 from pathlib import Path
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlunparse
 import logging
-from co_op_translator.config.constants import SUPPORTED_IMAGE_EXTENSIONS
+from co_op_translator.config.constants import SUPPORTED_IMAGE_EXTENSIONS, PLAN_OUTPUT_TOKEN_RATIO, MARKDOWN_MAX_INPUT_TOKENS
 from co_op_translator.utils.file_utils import generate_translated_filename, get_actual_image_path, get_filename_and_extension
+from co_op_translator.utils.profiling_utils import profile_stage
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +49,91 @@ def generate_prompt_template(output_lang: str, document_chunk: str, is_rtl: bool
 
     return prompt
 
+def generate_multi_language_prompt_template(output_langs: list, document_chunk: str, rtl_langs: set) -> str:
+    """
+    Generate a prompt asking for the translation of one chunk into several languages at once.
+    Each translation is returned between BEGIN/END markers so it can be split per language.
+
+    Args:
+        output_langs (list): The target languages for translation.
+        document_chunk (str): The chunk of the document to be translated.
+        rtl_langs (set): The target languages that are written right-to-left.
+
+    Returns:
+        str: The generated translation prompt.
+    """
+    prompt = f"""
+        Translate the following markdown file to each of these languages: {', '.join(output_langs)}.
+        Make sure the translation does not sound too literal. Make sure you translate comments as well.
+        This file is written in Markdown format. Do not treat this as XML or HTML.
+        Do not translate any [!NOTE], [!WARNING], [!TIP], [!IMPORTANT], or [!CAUTION].
+        Do not translate any entities, such as variable names, function names, or class names, but keep them in the file.
+        Do not translate any urls or paths, but keep them in the file.
+        NEVER ADD ANY EXTRA CONTENT OUTSIDE THE TRANSLATIONS. Keep the line breaks of the original in every translation.
+        Output every translation between its markers, exactly as follows:
+        """
+    for output_lang in output_langs:
+        direction = "right to left" if output_lang in rtl_langs else "left to right"
+        prompt += f"\n===== BEGIN {output_lang} =====\n(translation to {output_lang}, written from {direction})\n===== END {output_lang} =====\n"
+
+    prompt += "\n" + document_chunk
+
+    return prompt
+
+def split_multi_language_response(response: str, output_langs: list) -> dict:
+    """
+    Split the response to a multi-language prompt into one translation per language.
+
+    Args:
+        response (str): The model output containing BEGIN/END marked sections.
+        output_langs (list): The languages that were requested.
+
+    Returns:
+        dict: Mapping of language to its translation. Languages whose section is missing are left out.
+    """
+    translations = {}
+    for output_lang in output_langs:
+        match = re.search(
+            rf"^===== BEGIN {re.escape(output_lang)} =====\n(.*?)\n?===== END {re.escape(output_lang)} =====$",
+            response,
+            re.DOTALL | re.MULTILINE,
+        )
+        if match and match.group(1).strip():
+            translations[output_lang] = match.group(1)
+    return translations
+
+def get_language_group_size(chunk_tokens: int, max_output_tokens: int, max_group_size: int, expansion_ratio: float = PLAN_OUTPUT_TOKEN_RATIO) -> int:
+    """
+    Return how many languages one request can translate a chunk into without exceeding the output token limit.
+
+    Args:
+        chunk_tokens (int): The number of tokens in the chunk.
+        max_output_tokens (int): The output token limit of a request.
+        max_group_size (int): The largest allowed group.
+        expansion_ratio (float): Expected output tokens per chunk token, for the most expanding language.
+
+    Returns:
+        int: The group size, at least 1.
+    """
+    # Each translation is expected to be longer than the source, plus its markers
+    tokens_per_language = chunk_tokens * expansion_ratio + 20
+    return max(1, min(max_group_size, int(max_output_tokens // tokens_per_language)))
+
+def generate_disclaimer_prompt(output_lang: str) -> str:
+    """
+    Generate the prompt used to translate the AI translation disclaimer.
+
+    Args:
+        output_lang (str): The target language for the disclaimer.
+
+    Returns:
+        str: The disclaimer translation prompt.
+    """
+    return f""" Translate the following text to {output_lang}.
+
+        Disclaimer: The translation was translated from its original by an AI model and may not be perfect. 
+        Please review the output and make any necessary corrections."""
+
 def get_tokenizer(encoding_name: str):
     """
     Get the tokenizer based on the encoding name.
@@ -145,39 +231,78 @@ def process_markdown(content: str, max_tokens=4096, encoding='o200k_base') -> li
 
     return chunks
 
-def process_markdown_with_many_links(content: str, max_links) -> list:
+def process_markdown_with_many_links(content: str, max_links, max_tokens=None, encoding='o200k_base') -> list:
     """
-    Process markdown document by splitting it into chunks where each chunk contains max_links or fewer links.
+    Process markdown document by splitting it into chunks where each chunk contains max_links or fewer links
+    and, if max_tokens is given, no more than max_tokens tokens.
 
     Args:
         content (str): The markdown content.
         max_links (int): Maximum number of links allowed per chunk.
+        max_tokens (int, optional): The maximum number of tokens allowed per chunk. Lines longer than this
+                                    are split like in process_markdown.
+        encoding (str): The encoding to use for the tokenizer.
 
     Returns:
         list: List of markdown chunks to process.
     """
+    tokenizer = get_tokenizer(encoding) if max_tokens else None
     lines = content.split("\n")
     chunks = []
     current_chunk = ""
     current_links = 0
+    current_tokens = 0
 
     for line in lines:
 
         line_links = count_links_in_markdown(line)
-        
-        if current_links + line_links > max_links:
-            chunks.append(current_chunk.strip())
+        line_tokens = count_tokens(line + "\n", tokenizer) if tokenizer else 0
+
+        if tokenizer and line_tokens > max_tokens:
+            if current_chunk.strip():
+                chunks.append(current_chunk.strip())
+            chunks.extend(chunk.strip() for chunk in split_markdown_content(line, max_tokens, tokenizer) if chunk.strip())
+            current_chunk = ""
+            current_links = 0
+            current_tokens = 0
+        elif current_links + line_links > max_links or (tokenizer and current_tokens + line_tokens > max_tokens):
+            if current_chunk.strip():
+                chunks.append(current_chunk.strip())
             current_chunk = line + "\n"
             current_links = line_links
+            current_tokens = line_tokens
         else:
             current_chunk += line + "\n"
             current_links += line_links
+            current_tokens += line_tokens
 
-    if current_chunk:
+    if current_chunk.strip():
         chunks.append(current_chunk.strip())
 
     return chunks
 
+@profile_stage
+def chunk_markdown_document(document: str, link_limit: int = 30, max_tokens: int = MARKDOWN_MAX_INPUT_TOKENS) -> list:
+    """
+    Split a markdown document into the chunks sent for translation. Documents with many links
+    are split by link count as well as by token count, all others by token count.
+
+    Args:
+        document (str): The markdown content.
+        link_limit (int): Maximum number of links per chunk before switching to link-based splitting.
+        max_tokens (int): The chunk budget in tokens, usually sized for the target language's expansion.
+
+    Returns:
+        list: List of markdown chunks.
+    """
+    if count_links_in_markdown(document) > link_limit:
+        logger.info(f"Document contains more than {link_limit} links, splitting the document into chunks.")
+        return process_markdown_with_many_links(document, link_limit, max_tokens)
+
+    logger.info(f"Document contains {link_limit} or fewer links, processing normally.")
+    return process_markdown(document, max_tokens)
+
+@profile_stage
 def update_links(md_file_path: Path, markdown_string: str, language_code: str, root_dir: Path) -> str:
     logger.info("Updating links in the markdown file")
 
@@ -305,6 +430,37 @@ def update_translation_links(markdown_string: str, md_file_path: Path, language_
 
     return markdown_string
 
+def rebase_relative_links(markdown_string: str, old_dir: Path, new_dir: Path) -> str:
+    """
+    Rewrite relative links so they keep pointing at the same targets after a markdown file
+    moves from old_dir to new_dir. Web URLs, emails and in-page anchors are left untouched.
+
+    Args:
+        markdown_string (str): The markdown content.
+        old_dir (Path): The directory the file used to live in.
+        new_dir (Path): The directory the file now lives in.
+
+    Returns:
+        str: The markdown content with relative links rebased.
+    """
+    if Path(old_dir).resolve() == Path(new_dir).resolve():
+        return markdown_string
+
+    link_pattern = r'(!?\[.*?\])\((.*?)\)'
+
+    def replace_link(match):
+        link = match.group(2)
+        parsed_url = urlparse(link)
+        if parsed_url.scheme or '@' in link or link.startswith('#') or not parsed_url.path or os.path.isabs(parsed_url.path):
+            return match.group(0)
+
+        target_path = (Path(old_dir) / parsed_url.path).resolve()
+        new_path = os.path.relpath(target_path, Path(new_dir).resolve()).replace(os.path.sep, '/')
+        # Keep the query and fragment, e.g. ?raw=true on image links
+        return f"{match.group(1)}({urlunparse(parsed_url._replace(path=new_path))})"
+
+    return re.sub(link_pattern, replace_link, markdown_string)
+
 def compare_line_breaks(original_text, translated_text):
     """
     Compare the number of line breaks in the original and translated text
@@ -0,0 +1,173 @@
+"""
+This module contains the routing of chat requests to deployments.
+Routing rules map a task type, optionally narrowed to a size class, to an ordered list of
+deployments; later deployments are fallbacks used when earlier ones are throttled.
+"""
+
+import logging
+from co_op_translator.config.base_config import Config
+from co_op_translator.utils.retry_utils import LatencyTracker, get_circuit_breaker, call_with_retries
+
+logger = logging.getLogger(__name__)
+
+TASK_MARKDOWN = 'markdown'
+TASK_DISCLAIMER = 'disclaimer'
+TASK_IMAGE_TEXT = 'image_text'
+TASK_TYPES = (TASK_MARKDOWN, TASK_DISCLAIMER, TASK_IMAGE_TEXT)
+SIZE_CLASSES = ('small', 'large')
+
+def parse_model_routes(routes: str | None) -> dict:
+    """
+    Parse routing rules written as 'markdown:large=gpt-4o,gpt-4o-backup;disclaimer=gpt-4o-mini'.
+
+    Args:
+        routes (str | None): Semicolon-separated rules of the form task[:size]=deployment[,fallback...].
+
+    Returns:
+        dict: Mapping of 'task' or 'task:size' to the ordered list of deployments.
+
+    Raises:
+        ValueError: If a rule names an unknown task type or size class.
+    """
+    parsed = {}
+    for rule in (routes or '').split(';'):
+        if '=' not in rule:
+            continue
+        key, deployments = rule.split('=', 1)
+        key = key.strip()
+        task, _, size_class = key.partition(':')
+        if task not in TASK_TYPES or (size_class and size_class not in SIZE_CLASSES):
+            raise ValueError(f"Invalid model route '{key}'. Use one of {', '.join(TASK_TYPES)}, optionally followed by :small or :large.")
+        parsed[key] = [deployment.strip() for deployment in deployments.split(',') if deployment.strip()]
+    return parsed
+
+def is_throttling_error(error: Exception) -> bool:
+    """
+    Check whether an error means the deployment is out of quota or overloaded.
+    """
+    status_code = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    if status_code in (429, 503) or type(error).__name__ == 'RateLimitError':
+        return True
+    # Semantic Kernel wraps the SDK errors; look through the chain of causes
+    cause = error.__cause__ or error.__context__
+    return cause is not None and cause is not error and is_throttling_error(cause)
+
+class ModelRouter:
+    def __init__(self, routes=None, default_deployment=None, small_max_tokens=400):
+        """
+        Initialize the router.
+
+        Args:
+            routes (dict): Mapping of 'task' or 'task:size' to ordered deployments (see parse_model_routes).
+            default_deployment (str): The deployment of tasks without a route.
+            small_max_tokens (int): Requests with at most this many prompt tokens are in the 'small' size class.
+        """
+        self.routes = dict(routes or {})
+        self.default_deployment = default_deployment
+        self.small_max_tokens = small_max_tokens
+
+    @classmethod
+    def from_config(cls):
+        """
+        Create a router from the routing rules in the configuration.
+        """
+        return cls(
+            routes=parse_model_routes(Config.MODEL_ROUTES),
+            default_deployment=Config.AZURE_OPENAI_CHAT_DEPLOYMENT_NAME,
+            small_max_tokens=Config.ROUTE_SMALL_MAX_TOKENS,
+        )
+
+    def get_size_class(self, prompt_tokens):
+        return 'small' if prompt_tokens <= self.small_max_tokens else 'large'
+
+    def get_deployments(self, task, prompt_tokens=0):
+        """
+        Return the deployments of a request in the order they should be tried.
+
+        Args:
+            task (str): The task type ('markdown', 'disclaimer' or 'image_text').
+            prompt_tokens (int): The size of the prompt, which selects the size class.
+
+        Returns:
+            list: The deployment first tried, followed by its fallbacks.
+        """
+        return (
+            self.routes.get(f"{task}:{self.get_size_class(prompt_tokens)}")
+            or self.routes.get(task)
+            or [self.default_deployment]
+        )
+
+    @property
+    def deployments(self):
+        """
+        All deployments requests can be routed to, the default deployment first.
+        """
+        deployments = [self.default_deployment]
+        for route in self.routes.values():
+            deployments.extend(deployment for deployment in route if deployment not in deployments)
+        return deployments
+
+async def call_with_fallback(make_request, deployments, description, latency_trackers, slot=None):
+    """
+    Call a request on the first available deployment of a route, falling back to the next one
+    when a deployment is throttled or its circuit is open.
+
+    Each deployment gets the usual timeout, retries and circuit breaker, except that a throttled
+    deployment with a fallback is left at once instead of being retried.
+
+    Args:
+        make_request (callable): Takes a deployment name and returns a new awaitable for each attempt.
+        deployments (list): The deployments of the route, in order.
+        description (str): Describes the request in log messages.
+        latency_trackers (dict): Latency tracker per deployment, filled as needed.
+        slot (callable, optional): Returns an async context manager held around each attempt (see call_with_retries).
+
+    Returns:
+        The result of the first successful attempt.
+    """
+    for index, deployment in enumerate(deployments):
+        has_fallback = index < len(deployments) - 1
+        circuit_breaker = get_circuit_breaker(deployment, Config.CIRCUIT_BREAKER_THRESHOLD, Config.CIRCUIT_BREAKER_COOLDOWN)
+        if has_fallback and circuit_breaker.is_blocked():
+            logger.info(f"{description}: circuit for {deployment} is open. Trying {deployments[index + 1]}.")
+            continue
+
+        try:
+            return await call_with_retries(
+                lambda: make_request(deployment),
+                f"{description} on {deployment}",
+                circuit_breaker,
+                latency_trackers.setdefault(deployment, LatencyTracker()),
+                timeout=Config.CHAT_REQUEST_TIMEOUT,
+                max_retries=Config.CHAT_MAX_RETRIES,
+                backoff_base=Config.RETRY_BACKOFF_BASE,
+                backoff_max=Config.RETRY_BACKOFF_MAX,
+                hedge_percentile=Config.HEDGE_PERCENTILE,
+                stop_on=is_throttling_error if has_fallback else None,
+                slot=slot,
+            )
+        except Exception as e:
+            if not has_fallback:
+                raise
+            logger.warning(f"{description} failed on {deployment}: {e}. Falling back to {deployments[index + 1]}.")
+
+def call_with_fallback_sync(make_request, deployments, description):
+    """
+    Call a blocking request on the deployments of a route in order, moving to the next one
+    only when a deployment is throttled.
+
+    Args:
+        make_request (callable): Takes a deployment name and performs the request.
+        deployments (list): The deployments of the route, in order.
+        description (str): Describes the request in log messages.
+
+    Returns:
+        The result of the first successful request.
+    """
+    for index, deployment in enumerate(deployments):
+        try:
+            return make_request(deployment)
+        except Exception as e:
+            if index == len(deployments) - 1 or not is_throttling_error(e):
+                raise
+            logger.warning(f"{description} throttled on {deployment}: {e}. Falling back to {deployments[index + 1]}.")
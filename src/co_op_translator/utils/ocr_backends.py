@@ -0,0 +1,166 @@
+"""
+This module contains the OCR backends used to recognize text lines in images.
+Every backend returns the same structure: a list of {'text', 'bounding_box', 'confidence'}
+dictionaries in upload coordinates, where bounding_box lists the x, y pairs of the line's
+corners clockwise from the top left, or None if no text was recognized.
+
+'azure' uses Azure AI Vision, 'local' runs Tesseract on the CPU (pip install pytesseract and
+install the tesseract binary), and 'azure+local' uses Azure and falls back to the local engine
+when Vision is throttled.
+"""
+
+import io
+import logging
+from PIL import Image
+from azure.ai.vision.imageanalysis.models import VisualFeatures
+from co_op_translator.config.base_config import Config
+from co_op_translator.utils.client_utils import get_image_analysis_client
+from co_op_translator.utils.model_router import is_throttling_error
+
+logger = logging.getLogger(__name__)
+
+OCR_BACKENDS = ('azure', 'local', 'azure+local')
+
+class AzureOCRBackend:
+    name = 'azure'
+
+    def __init__(self):
+        Config.check_vision_configuration()
+
+    def read_lines(self, image_data):
+        """
+        Recognize the lines of an image with Azure AI Vision.
+
+        Args:
+            image_data (bytes): The encoded image.
+
+        Returns:
+            list: The recognized lines, or None if no text block was recognized.
+        """
+        result = get_image_analysis_client().analyze(
+            image_data=image_data,
+            visual_features=[VisualFeatures.READ],
+        )
+
+        if result.read is None or not result.read.blocks:
+            return None
+
+        line_bounding_boxes = []
+        for line in result.read.blocks[0].lines:
+            bounding_box = []
+            for point in line.bounding_polygon:
+                bounding_box.append(point.x)
+                bounding_box.append(point.y)
+            line_bounding_boxes.append({
+                "text": line.text,
+                "bounding_box": bounding_box,
+                "confidence": line.words[0].confidence if line.words else None
+            })
+        return line_bounding_boxes
+
+class LocalOCRBackend:
+    name = 'local'
+
+    def __init__(self, languages=None, min_confidence=None):
+        """
+        Initialize the local Tesseract engine.
+
+        Args:
+            languages (str): Tesseract languages of the source text, e.g. 'eng' or 'eng+fra'.
+                             Defaults to LOCAL_OCR_LANGUAGES.
+            min_confidence (float): Words recognized with a lower confidence (0 to 100) are dropped.
+                                    Defaults to LOCAL_OCR_MIN_CONFIDENCE.
+
+        Raises:
+            ImportError: If pytesseract is not installed.
+        """
+        try:
+            import pytesseract
+        except ImportError as e:
+            raise ImportError("The local OCR backend needs pytesseract and the tesseract binary: pip install pytesseract") from e
+        self.pytesseract = pytesseract
+        self.languages = languages or Config.LOCAL_OCR_LANGUAGES
+        self.min_confidence = Config.LOCAL_OCR_MIN_CONFIDENCE if min_confidence is None else min_confidence
+
+    def read_lines(self, image_data):
+        """
+        Recognize the lines of an image with Tesseract, grouping its words by line.
+
+        Args:
+            image_data (bytes): The encoded image.
+
+        Returns:
+            list: The recognized lines, or None if no text was recognized.
+        """
+        with Image.open(io.BytesIO(image_data)) as image:
+            data = self.pytesseract.image_to_data(image.convert('RGB'), lang=self.languages, output_type=self.pytesseract.Output.DICT)
+
+        lines = {}
+        for index, word in enumerate(data['text']):
+            confidence = float(data['conf'][index])
+            if not word.strip() or confidence < self.min_confidence:
+                continue
+            key = (data['block_num'][index], data['par_num'][index], data['line_num'][index])
+            lines.setdefault(key, []).append((
+                word.strip(), confidence,
+                data['left'][index], data['top'][index],
+                data['left'][index] + data['width'][index], data['top'][index] + data['height'][index],
+            ))
+
+        line_bounding_boxes = []
+        for words in lines.values():
+            left = min(word[2] for word in words)
+            top = min(word[3] for word in words)
+            right = max(word[4] for word in words)
+            bottom = max(word[5] for word in words)
+            line_bounding_boxes.append({
+                "text": " ".join(word[0] for word in words),
+                "bounding_box": [left, top, right, top, right, bottom, left, bottom],
+                "confidence": min(word[1] for word in words) / 100,
+            })
+        return line_bounding_boxes or None
+
+class FallbackOCRBackend:
+    name = 'azure+local'
+
+    def __init__(self, primary, fallback):
+        """
+        Initialize a backend that uses the primary backend and the fallback while the primary is throttled.
+
+        Args:
+            primary: The backend tried first.
+            fallback: The backend used when the primary is out of quota or overloaded.
+        """
+        self.primary = primary
+        self.fallback = fallback
+
+    def read_lines(self, image_data):
+        try:
+            return self.primary.read_lines(image_data)
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            logger.warning(f"OCR throttled on {self.primary.name}: {e}. Falling back to {self.fallback.name}.")
+            return self.fallback.read_lines(image_data)
+
+def get_ocr_backend(name=None):
+    """
+    Create an OCR backend by name.
+
+    Args:
+        name (str, optional): 'azure', 'local' or 'azure+local'. Defaults to OCR_BACKEND.
+
+    Returns:
+        The backend, with a read_lines(image_data) method.
+
+    Raises:
+        ValueError: If the name is not a known backend.
+    """
+    name = (name or Config.OCR_BACKEND).lower()
+    if name == 'azure':
+        return AzureOCRBackend()
+    if name == 'local':
+        return LocalOCRBackend()
+    if name == 'azure+local':
+        return FallbackOCRBackend(AzureOCRBackend(), LocalOCRBackend())
+    raise ValueError(f"Invalid OCR backend '{name}'. Use one of {', '.join(OCR_BACKENDS)}.")
@@ -0,0 +1,332 @@
+"""
+This module contains the index of a project's translated outputs.
+Every translated markdown file and image is recorded with its source and language, so skip
+decisions, update deletions and orphan cleanup are lookups in one file loaded per run instead
+of a stat or directory listing per (file, language) pair.
+
+The index is kept in .co_op_translator/output_index.json together with the modification time
+of every output directory. When it is loaded, only directories whose modification time changed
+(files added, for example pulled from git, or deleted by hand) are listed again, so the index
+matches the files on disk at the cost of one stat per directory. When the index does not exist
+yet (e.g. for outputs created by an earlier version), the output directories are scanned once.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from co_op_translator.config.constants import CACHE_DIR_NAME, OUTPUT_INDEX_FILE, EXCLUDED_DIRS, SUPPORTED_IMAGE_EXTENSIONS
+from co_op_translator.utils.file_utils import load_json_cache, save_json_cache, iter_filtered_files, get_filename_and_extension
+
+logger = logging.getLogger(__name__)
+
+# original_filename.<sha256 of the source's relative path>.<language code><extension>
+TRANSLATED_IMAGE_NAME = re.compile(r'^.+\.([0-9a-f]{64})\.([^.]+)\.[^.]+$')
+
+class OutputIndex:
+    def __init__(self, root_dir, translations_dir=None, image_dir=None):
+        """
+        Load the index of a project and bring it up to date with the output directories.
+
+        Args:
+            root_dir (Path): The project root directory.
+            translations_dir (Path, optional): The translated markdown directory. Defaults to root_dir/translations.
+            image_dir (Path, optional): The translated image directory. Defaults to root_dir/translated_images.
+        """
+        self.root_dir = Path(root_dir).resolve()
+        self.translations_dir = Path(translations_dir) if translations_dir is not None else self.root_dir / 'translations'
+        self.image_dir = Path(image_dir) if image_dir is not None else self.root_dir / 'translated_images'
+        self.index_path = self.root_dir / CACHE_DIR_NAME / OUTPUT_INDEX_FILE
+        # Image outputs are recorded from worker threads
+        self.lock = threading.Lock()
+        # Mapping of output path (relative to the root) to {'source', 'language', 'type'}
+        self.outputs = {}
+        # Mapping of output directory (relative to the root) to its modification time when last listed
+        self.directories = {}
+        # Mapping of (source, language) to output path, both relative to the root
+        self._by_source = {}
+        # Mappings of source, and of output directory, to the set of their output paths
+        self._outputs_by_source = {}
+        self._outputs_by_directory = {}
+        # Output directories written or deleted in during this run, whose modification times are refreshed on save
+        self._touched_directories = set()
+        self._sources_by_path_hash = None
+        self._changed = False
+
+        index = load_json_cache(self.index_path)
+        for output, entry in index.get('outputs', {}).items():
+            self._add(output, entry)
+        self.directories = dict(index.get('directories', {}))
+        self.refresh()
+
+    def _relative(self, path):
+        # Callers pass absolute paths under the resolved root; resolving them again would cost syscalls per lookup
+        path = Path(path)
+        if not path.is_absolute():
+            path = path.resolve()
+        return path.relative_to(self.root_dir).as_posix()
+
+    def _add(self, output, entry):
+        self._discard(output)
+        self.outputs[output] = entry
+        self._outputs_by_directory.setdefault(output.rpartition('/')[0], set()).add(output)
+        if entry['source'] is not None:
+            self._by_source[(entry['source'], entry['language'])] = output
+            self._outputs_by_source.setdefault(entry['source'], set()).add(output)
+
+    def _discard(self, output):
+        entry = self.outputs.pop(output, None)
+        if entry is None:
+            return None
+        self._outputs_by_directory.get(output.rpartition('/')[0], set()).discard(output)
+        if entry['source'] is not None:
+            if self._by_source.get((entry['source'], entry['language'])) == output:
+                del self._by_source[(entry['source'], entry['language'])]
+            self._outputs_by_source.get(entry['source'], set()).discard(output)
+        return entry
+
+    def _get_source_by_path_hash(self, path_hash):
+        # Translated image names carry the hash of the source path; map hashes back to the current sources
+        if self._sources_by_path_hash is None:
+            self._sources_by_path_hash = {
+                hashlib.sha256(str(path.relative_to(self.root_dir)).encode('utf-8')).hexdigest(): self._relative(path)
+                for path in iter_filtered_files(self.root_dir, EXCLUDED_DIRS)
+                if get_filename_and_extension(path)[1] in SUPPORTED_IMAGE_EXTENSIONS
+            }
+        return self._sources_by_path_hash.get(path_hash)
+
+    def _get_entry(self, output_path):
+        """
+        Derive the index entry of an output file found on disk, or None if it is not an output.
+        """
+        if output_path.parent == self.image_dir:
+            match = TRANSLATED_IMAGE_NAME.match(output_path.name)
+            if not match:
+                return None
+            # Outputs whose source no longer exists are kept without a source, as orphans
+            return {'source': self._get_source_by_path_hash(match.group(1)), 'language': match.group(2), 'type': 'image'}
+
+        parts = output_path.relative_to(self.translations_dir).parts
+        if len(parts) < 2:
+            return None
+        return {'source': '/'.join(parts[1:]), 'language': parts[0], 'type': 'markdown'}
+
+    def _scan_directory(self, directory, modified_time):
+        """
+        List an output directory, adding the outputs found on disk and dropping those that are gone.
+        Subdirectories of the translation tree that were never listed are scanned as well.
+        """
+        relative_directory = self._relative(directory)
+        self.directories[relative_directory] = modified_time
+        file_names = set()
+        new_directories = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    file_names.add(entry.name)
+                elif entry.is_dir() and directory != self.image_dir:
+                    relative_subdirectory = f"{relative_directory}/{entry.name}"
+                    if relative_subdirectory not in self.directories:
+                        new_directories.append(Path(entry.path))
+
+        for output in list(self._outputs_by_directory.get(relative_directory, ())):
+            if output.rpartition('/')[2] not in file_names:
+                logger.info(f"Translated output {output} no longer exists; dropping it from the index")
+                self._discard(output)
+        for file_name in file_names:
+            output = f"{relative_directory}/{file_name}"
+            if output not in self.outputs:
+                entry = self._get_entry(directory / file_name)
+                if entry is not None:
+                    self._add(output, entry)
+        self._changed = True
+
+        for subdirectory in new_directories:
+            self._scan_directory(subdirectory, subdirectory.stat().st_mtime_ns)
+
+    def refresh(self):
+        """
+        Bring the index up to date with the output directories, listing only the directories
+        whose modification time changed since they were last listed.
+        """
+        with self.lock:
+            for relative_directory, modified_time in list(self.directories.items()):
+                directory = self.root_dir / relative_directory
+                try:
+                    current_time = directory.stat().st_mtime_ns
+                except FileNotFoundError:
+                    for output in list(self._outputs_by_directory.get(relative_directory, ())):
+                        self._discard(output)
+                    del self.directories[relative_directory]
+                    self._changed = True
+                    continue
+                if current_time != modified_time:
+                    self._scan_directory(directory, current_time)
+
+            for directory in (self.translations_dir, self.image_dir):
+                if directory.is_dir() and self._relative(directory) not in self.directories:
+                    self._scan_directory(directory, directory.stat().st_mtime_ns)
+
+    def get(self, source_path, language_code):
+        """
+        Return the recorded output of a source in a language.
+
+        Args:
+            source_path (Path): The source file.
+            language_code (str): The target language code.
+
+        Returns:
+            Path: The absolute output path, or None if the source has no output in that language.
+        """
+        output = self._by_source.get((self._relative(source_path), language_code))
+        return self.root_dir / output if output is not None else None
+
+    def has(self, source_path, language_code):
+        return (self._relative(source_path), language_code) in self._by_source
+
+    def record(self, source_path, language_code, output_path):
+        """
+        Record an output once it has been written.
+
+        Args:
+            source_path (Path): The source file.
+            language_code (str): The target language code.
+            output_path (Path): The output file.
+        """
+        output = self._relative(output_path)
+        output_type = 'image' if Path(output_path).is_relative_to(self.image_dir) else 'markdown'
+        with self.lock:
+            self._add(output, {'source': self._relative(source_path), 'language': language_code, 'type': output_type})
+            self._touched_directories.add(Path(output_path).parent)
+            self._changed = True
+
+    def forget(self, output_path):
+        """
+        Drop an output from the index, e.g. when writing it failed.
+        """
+        with self.lock:
+            if self._discard(self._relative(output_path)) is not None:
+                self._changed = True
+
+    def get_outputs(self, source_path=None, language_code=None, output_type=None):
+        """
+        Return the recorded outputs matching a source, a language and/or an output type.
+
+        Args:
+            source_path (Path, optional): The source file.
+            language_code (str, optional): The target language code.
+            output_type (str, optional): 'markdown' or 'image'.
+
+        Returns:
+            list: Absolute paths of the matching outputs.
+        """
+        with self.lock:
+            if source_path is not None:
+                outputs = sorted(self._outputs_by_source.get(self._relative(source_path), ()))
+            else:
+                outputs = list(self.outputs)
+            return [
+                self.root_dir / output for output in outputs
+                if (language_code is None or self.outputs[output]['language'] == language_code)
+                and (output_type is None or self.outputs[output]['type'] == output_type)
+            ]
+
+    def move(self, output_path, source_path, new_output_path):
+        """
+        Record that an output was moved along with its renamed source.
+        """
+        with self.lock:
+            entry = self._discard(self._relative(output_path))
+            if entry is not None:
+                self._add(self._relative(new_output_path), {**entry, 'source': self._relative(source_path)})
+                self._touched_directories.update((Path(output_path).parent, Path(new_output_path).parent))
+                self._changed = True
+
+    def delete(self, output_paths):
+        """
+        Delete outputs from disk and from the index.
+
+        Args:
+            output_paths (iterable): Absolute paths of the outputs.
+
+        Returns:
+            int: The number of outputs deleted.
+        """
+        deleted = 0
+        for output_path in output_paths:
+            output_path = Path(output_path)
+            try:
+                output_path.unlink()
+                deleted += 1
+                logger.info(f"Deleted translated output: {output_path}")
+            except FileNotFoundError:
+                pass
+            # Remove directories of the translation tree left empty
+            parent = output_path.parent
+            while parent.is_relative_to(self.translations_dir) and parent != self.translations_dir:
+                try:
+                    parent.rmdir()
+                except OSError:
+                    break
+                parent = parent.parent
+            with self.lock:
+                self._discard(self._relative(output_path))
+                self._touched_directories.add(parent)
+                self._changed = True
+        return deleted
+
+    def find_orphans(self, source_paths):
+        """
+        Return the outputs whose source no longer exists.
+
+        Args:
+            source_paths (iterable): The project's current source files.
+
+        Returns:
+            list: Absolute paths of the orphaned outputs.
+        """
+        sources = {self._relative(path) for path in source_paths}
+        with self.lock:
+            return [self.root_dir / output for output, entry in self.outputs.items() if entry['source'] not in sources]
+
+    def remove_orphans(self):
+        """
+        Delete the outputs whose source no longer exists, in every language.
+
+        Returns:
+            int: The number of outputs deleted.
+        """
+        orphans = self.find_orphans(iter_filtered_files(self.root_dir, EXCLUDED_DIRS))
+        deleted = self.delete(orphans)
+        self.save()
+        logger.info(f"Removed {deleted} orphaned outputs")
+        return deleted
+
+    def _refresh_directory_times(self):
+        # Our own writes changed these directories (and created or removed some); record their new
+        # modification times, up to the output roots, so the next load does not list them again
+        for directory in self._touched_directories:
+            while directory.is_relative_to(self.translations_dir) or directory == self.image_dir:
+                relative_directory = self._relative(directory)
+                try:
+                    self.directories[relative_directory] = directory.stat().st_mtime_ns
+                except FileNotFoundError:
+                    self.directories.pop(relative_directory, None)
+                if directory in (self.translations_dir, self.image_dir):
+                    break
+                directory = directory.parent
+        self._touched_directories = set()
+
+    def save(self):
+        """
+        Persist the index if it changed.
+        """
+        with self.lock:
+            if self._touched_directories:
+                self._refresh_directory_times()
+                self._changed = True
+            if self._changed:
+                save_json_cache(self.index_path, {'outputs': self.outputs, 'directories': self.directories})
+                self._changed = False
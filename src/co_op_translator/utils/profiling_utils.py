@@ -0,0 +1,177 @@
+"""
+This module contains utility functions for profiling translation runs.
+It provides CPU profiling, per-stage wall/CPU timing of decorated entry points
+and tracemalloc snapshots at stage boundaries, written as reports to a directory.
+"""
+
+import asyncio
+import cProfile
+import functools
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_active_profiler = None
+_thread_state = threading.local()
+
+class Profiler:
+    def __init__(self, report_dir):
+        """
+        Initialize the profiler.
+
+        Args:
+            report_dir (str | Path): The directory the reports are written to.
+        """
+        self.report_dir = Path(report_dir)
+        self.main_profile = cProfile.Profile()
+        self.thread_profiles = []
+        self.stage_stats = {}
+        self.snapshots = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Start CPU profiling and memory tracing, and enable stage timing.
+        """
+        global _active_profiler
+        tracemalloc.start()
+        self.snapshot('start')
+        _active_profiler = self
+        self.main_profile.enable()
+        logger.info(f"Profiling enabled. Reports will be written to {self.report_dir}")
+
+    def stop(self):
+        """
+        Stop profiling and write the reports.
+
+        Returns:
+            Path: The report directory.
+        """
+        global _active_profiler
+        self.main_profile.disable()
+        _active_profiler = None
+        self.snapshot('end')
+        tracemalloc.stop()
+        self.write_reports()
+        return self.report_dir
+
+    def record_stage(self, name, wall_seconds, cpu_seconds):
+        with self.lock:
+            stats = self.stage_stats.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'max_wall_seconds': 0.0})
+            stats['calls'] += 1
+            stats['wall_seconds'] += wall_seconds
+            stats['cpu_seconds'] += cpu_seconds
+            stats['max_wall_seconds'] = max(stats['max_wall_seconds'], wall_seconds)
+
+    def add_thread_profile(self, profile):
+        with self.lock:
+            self.thread_profiles.append(profile)
+
+    def snapshot(self, label):
+        """
+        Take a tracemalloc snapshot labelled with the stage boundary it was taken at.
+        """
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            with self.lock:
+                self.snapshots.append((label, current, peak, tracemalloc.take_snapshot()))
+
+    def write_reports(self):
+        """
+        Write the CPU profile, the stage timings and the memory snapshots to the report directory.
+        """
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+
+        # CPU profile of the event loop thread merged with the profiles of worker threads
+        stats = pstats.Stats(self.main_profile)
+        for profile in self.thread_profiles:
+            stats.add(profile)
+        stats.dump_stats(self.report_dir / 'cpu.prof')
+        stream = io.StringIO()
+        pstats.Stats(str(self.report_dir / 'cpu.prof'), stream=stream).sort_stats('cumulative').print_stats(50)
+        (self.report_dir / 'cpu.txt').write_text(stream.getvalue(), encoding='utf-8')
+
+        with (self.report_dir / 'stages.json').open('w', encoding='utf-8') as file:
+            json.dump(self.stage_stats, file, indent=2)
+        lines = [f"{'stage':<50}{'calls':>8}{'wall s':>12}{'cpu s':>12}{'max wall s':>12}"]
+        for name, stage in sorted(self.stage_stats.items(), key=lambda item: -item[1]['wall_seconds']):
+            lines.append(f"{name:<50}{stage['calls']:>8}{stage['wall_seconds']:>12.3f}{stage['cpu_seconds']:>12.3f}{stage['max_wall_seconds']:>12.3f}")
+        (self.report_dir / 'stages.txt').write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+        memory_lines = []
+        previous = None
+        for index, (label, current, peak, snapshot) in enumerate(self.snapshots):
+            memory_lines.append(f"{index:02d} {label}: current={current / 1024 / 1024:.1f} MiB peak={peak / 1024 / 1024:.1f} MiB")
+            top_stats = snapshot.compare_to(previous, 'lineno') if previous is not None else snapshot.statistics('lineno')
+            report = "\n".join(str(stat) for stat in top_stats[:30])
+            (self.report_dir / f"memory_{index:02d}_{label}.txt").write_text(report + "\n", encoding='utf-8')
+            previous = snapshot
+        (self.report_dir / 'memory.txt').write_text("\n".join(memory_lines) + "\n", encoding='utf-8')
+
+def take_memory_snapshot(label):
+    """
+    Take a memory snapshot at a stage boundary if profiling is enabled.
+
+    Args:
+        label (str): The name of the boundary, used in the report file name.
+    """
+    if _active_profiler is not None:
+        _active_profiler.snapshot(label)
+
+def profile_stage(func):
+    """
+    Decorator recording the wall and CPU time of a sync or async function as a stage when profiling is enabled.
+
+    CPU time is measured on the calling thread; for coroutines it also includes other tasks that
+    ran on the event loop while the coroutine was suspended. Sync functions running outside the
+    main thread (e.g. via asyncio.to_thread) are also added to the CPU profile.
+    """
+    name = func.__qualname__
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            profiler = _active_profiler
+            if profiler is None:
+                return await func(*args, **kwargs)
+            start_wall, start_cpu = time.perf_counter(), time.thread_time()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profiler.record_stage(name, time.perf_counter() - start_wall, time.thread_time() - start_cpu)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _active_profiler
+        if profiler is None:
+            return func(*args, **kwargs)
+
+        # cProfile only sees the thread it was enabled in, so profile worker threads separately
+        thread_profile = None
+        if threading.current_thread() is not threading.main_thread() and not getattr(_thread_state, 'profiling', False):
+            thread_profile = cProfile.Profile()
+            try:
+                thread_profile.enable()
+                _thread_state.profiling = True
+            except ValueError:
+                # Python 3.12+ allows a single active profiler per process
+                thread_profile = None
+
+        start_wall, start_cpu = time.perf_counter(), time.thread_time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.record_stage(name, time.perf_counter() - start_wall, time.thread_time() - start_cpu)
+            if thread_profile is not None:
+                thread_profile.disable()
+                _thread_state.profiling = False
+                profiler.add_thread_profile(thread_profile)
+    return wrapper
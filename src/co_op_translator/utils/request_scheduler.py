@@ -0,0 +1,206 @@
+"""
+This module contains the request scheduler shared by all translators.
+It enforces a global in-flight request limit, separate limits per service (chat and OCR),
+and weighted fair queuing across target languages.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from co_op_translator.config.base_config import Config
+from co_op_translator.utils.profiling_utils import profile_stage
+
+logger = logging.getLogger(__name__)
+
+# Request statistics of the job running in the current context (see track_requests)
+_request_stats = contextvars.ContextVar('request_stats', default=None)
+
+def track_requests(stats: dict):
+    """
+    Count the requests granted in the current context, and the tasks and threads it starts, into stats.
+    Used to attribute the requests of a shared scheduler to the job that made them.
+
+    Args:
+        stats (dict): Updated in place with '<service>_requests' and '<service>_wait_seconds' entries.
+
+    Returns:
+        contextvars.Token: Token to pass to contextvars reset, if the context outlives the job.
+    """
+    return _request_stats.set(stats)
+
+def _record_request(service, wait_seconds):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats[f'{service}_requests'] = stats.get(f'{service}_requests', 0) + 1
+        stats[f'{service}_wait_seconds'] = stats.get(f'{service}_wait_seconds', 0.0) + wait_seconds
+
+def parse_language_weights(weights: str | None) -> dict:
+    """
+    Parse language weights written as 'ko=2,ja=1'.
+
+    Args:
+        weights (str | None): Comma-separated language=weight pairs.
+
+    Returns:
+        dict: Mapping of language code to weight.
+    """
+    parsed = {}
+    for pair in (weights or '').split(','):
+        if '=' in pair:
+            language_code, weight = pair.split('=', 1)
+            parsed[language_code.strip()] = float(weight)
+    return parsed
+
+class RequestScheduler:
+    def __init__(self, max_in_flight=10, service_limits=None, language_weights=None):
+        """
+        Initialize the scheduler.
+
+        Waiting requests are granted in start-time fair queuing order: each language advances a
+        virtual clock by 1/weight per request, so a language with many queued chunks cannot starve
+        the others, and a language with weight 2 gets twice the share of a language with weight 1.
+
+        Args:
+            max_in_flight (int): Maximum number of requests in flight across all services.
+            service_limits (dict): Maximum in-flight requests per service, e.g. {'chat': 8, 'ocr': 4}.
+            language_weights (dict): Relative share per language code (default 1).
+        """
+        self.max_in_flight = max_in_flight
+        self.service_limits = dict(service_limits or {})
+        self.language_weights = dict(language_weights or {})
+        self.in_flight = 0
+        self.service_in_flight = {}
+        self.language_finish_times = {}
+        self.virtual_time = 0.0
+        self.waiters = []
+        self._sequence = itertools.count()
+
+    @classmethod
+    def from_config(cls):
+        """
+        Create a scheduler from the concurrency settings in the configuration.
+        """
+        return cls(
+            max_in_flight=Config.MAX_IN_FLIGHT_REQUESTS,
+            service_limits={'chat': Config.MAX_CHAT_REQUESTS, 'ocr': Config.MAX_OCR_REQUESTS},
+            language_weights=parse_language_weights(Config.LANGUAGE_WEIGHTS),
+        )
+
+    def _has_capacity(self, service):
+        limit = self.service_limits.get(service, self.max_in_flight)
+        return self.in_flight < self.max_in_flight and self.service_in_flight.get(service, 0) < limit
+
+    def _grant(self, service):
+        self.in_flight += 1
+        self.service_in_flight[service] = self.service_in_flight.get(service, 0) + 1
+
+    def _wake_waiters(self):
+        # Grant waiters in virtual start-time order, skipping those whose service pool is full
+        skipped = []
+        while self.waiters and self.in_flight < self.max_in_flight:
+            start_time, sequence, service, future = heapq.heappop(self.waiters)
+            if future.done():
+                continue
+            if not self._has_capacity(service):
+                skipped.append((start_time, sequence, service, future))
+                continue
+            self.virtual_time = max(self.virtual_time, start_time)
+            self._grant(service)
+            future.set_result(None)
+        for waiter in skipped:
+            heapq.heappush(self.waiters, waiter)
+
+    @profile_stage
+    async def acquire(self, service, language_code=None):
+        """
+        Wait for a slot for one request to the given service on behalf of a language.
+        """
+        weight = self.language_weights.get(language_code, 1.0)
+        start_time = max(self.virtual_time, self.language_finish_times.get(language_code, 0.0))
+        self.language_finish_times[language_code] = start_time + 1.0 / weight
+
+        # Queue the request and grant what fits at once; only waiters whose service has capacity
+        # go first, so a full pool of one service never holds back requests to another
+        wait_start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (start_time, next(self._sequence), service, future))
+        self._wake_waiters()
+        if future.done():
+            _record_request(service, 0.0)
+            return
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just before cancellation; hand it back
+                self.release(service)
+            raise
+        _record_request(service, time.monotonic() - wait_start)
+
+    def try_acquire(self, service, language_code=None):
+        """
+        Take a slot for one request to the given service only if one is free right away and
+        no request of that service is waiting for it.
+
+        Returns:
+            bool: True if the slot was taken; it must then be returned with release.
+        """
+        if not self._has_capacity(service) or any(waiting_service == service and not future.done() for _, _, waiting_service, future in self.waiters):
+            return False
+        self._grant(service)
+        _record_request(service, 0.0)
+        return True
+
+    def release(self, service):
+        """
+        Return a slot taken with acquire and wake the next waiters.
+        """
+        self.in_flight -= 1
+        self.service_in_flight[service] -= 1
+        self._wake_waiters()
+
+    def get_status(self):
+        """
+        Return the current load of the scheduler.
+
+        Returns:
+            dict: {'in_flight', 'max_in_flight', 'services': {service: {'in_flight', 'limit'}}, 'waiting'}.
+        """
+        services = set(self.service_limits) | set(self.service_in_flight)
+        return {
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'services': {
+                service: {'in_flight': self.service_in_flight.get(service, 0), 'limit': self.service_limits.get(service, self.max_in_flight)}
+                for service in sorted(services)
+            },
+            'waiting': sum(1 for *_, future in self.waiters if not future.done()),
+        }
+
+    @asynccontextmanager
+    async def slot(self, service, language_code=None, wait=True):
+        """
+        Hold a request slot for the duration of the block.
+
+        Args:
+            service (str): The service the request goes to ('chat' or 'ocr').
+            language_code (str, optional): The language the request is made for.
+            wait (bool): Wait for a slot. If False, the block runs at once and gets False when no slot was free.
+
+        Yields:
+            bool: Whether the block holds a slot.
+        """
+        if wait:
+            await self.acquire(service, language_code)
+            granted = True
+        else:
+            granted = self.try_acquire(service, language_code)
+        try:
+            yield granted
+        finally:
+            if granted:
+                self.release(service)
@@ -0,0 +1,254 @@
+"""
+This module contains utility functions for making resilient API requests.
+Requests get a timeout, retries with jittered exponential backoff, a circuit breaker
+per deployment and optional hedging after a latency percentile learned during the run.
+"""
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, cooldown=30.0):
+        """
+        Initialize a circuit breaker.
+
+        After failure_threshold consecutive failures the circuit opens and requests wait for
+        the cooldown to pass; a single request then probes the deployment (half-open) while the
+        others keep waiting, and the circuit closes again if the probe succeeds.
+
+        Args:
+            name (str): The deployment the breaker protects, used in log messages.
+            failure_threshold (int): Consecutive failures that open the circuit.
+            cooldown (float): Seconds the circuit stays open.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at = None
+        # Set when the half-open probe finishes; None while no probe is in flight
+        self.probe = None
+
+    def remaining_cooldown(self):
+        """
+        Return how many seconds remain before the open circuit lets a probe through (0 if closed).
+        """
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def is_blocked(self):
+        """
+        Check whether requests would have to wait: the circuit is open or its half-open probe is in flight.
+        """
+        return self.remaining_cooldown() > 0 or self.probe is not None
+
+    async def wait_until_available(self):
+        """
+        Wait until the circuit is closed or this caller may send the half-open probe.
+
+        Returns:
+            bool: True if the caller sends the probe and must call end_probe when it finishes.
+        """
+        while True:
+            remaining = self.remaining_cooldown()
+            if remaining > 0:
+                logger.warning(f"Circuit for {self.name} is open. Waiting {remaining:.1f}s before retrying.")
+                await asyncio.sleep(remaining)
+            elif self.opened_at is None:
+                return False
+            elif self.probe is None:
+                logger.info(f"Circuit for {self.name} is half-open. Sending a probe request.")
+                self.probe = asyncio.Event()
+                return True
+            else:
+                await self.probe.wait()
+
+    def end_probe(self):
+        """
+        Let the requests waiting for the half-open probe continue.
+        """
+        if self.probe is not None:
+            self.probe.set()
+            self.probe = None
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"Circuit for {self.name} closed.")
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            if self.opened_at is None or self.remaining_cooldown() == 0:
+                logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} consecutive failures.")
+            self.opened_at = time.monotonic()
+
+_circuit_breakers = {}
+
+def get_circuit_breaker(name, failure_threshold=5, cooldown=30.0) -> CircuitBreaker:
+    """
+    Return the process-wide circuit breaker of a deployment, creating it on first use.
+
+    Args:
+        name (str): The deployment name.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        cooldown (float): Seconds the circuit stays open.
+
+    Returns:
+        CircuitBreaker: The shared breaker.
+    """
+    if name not in _circuit_breakers:
+        _circuit_breakers[name] = CircuitBreaker(name, failure_threshold, cooldown)
+    return _circuit_breakers[name]
+
+class LatencyTracker:
+    def __init__(self, window=200, min_samples=20):
+        """
+        Keep the latencies of the most recent successful requests.
+
+        Args:
+            window (int): Number of recent latencies kept.
+            min_samples (int): Samples required before percentiles are reported.
+        """
+        self.latencies = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds):
+        self.latencies.append(seconds)
+
+    def percentile(self, percent):
+        """
+        Return the given percentile of recent latencies, or None while there are too few samples.
+        """
+        if len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+def get_backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """
+    Return a full-jitter exponential backoff delay.
+
+    Args:
+        attempt (int): The number of the failed attempt, starting at 0.
+        base (float): The delay ceiling of the first retry, in seconds.
+        maximum (float): The largest delay ceiling, in seconds.
+
+    Returns:
+        float: A random delay between 0 and min(maximum, base * 2 ** attempt).
+    """
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+async def _run_hedged(make_request, timeout, latency_tracker, hedge_percentile, slot=None):
+    """
+    Run a request, start a duplicate if it is slower than the hedge percentile,
+    and return the first successful answer within the timeout.
+
+    With a slot factory, the duplicate needs a slot of its own (taken with wait=False);
+    it is skipped when none is free, so hedging never exceeds the concurrency limits.
+    """
+    start_time = time.monotonic()
+    async with contextlib.AsyncExitStack() as hedge_slots:
+        tasks = [asyncio.create_task(make_request())]
+        started_at = {tasks[0]: start_time}
+        try:
+            hedge_delay = latency_tracker.percentile(hedge_percentile) if hedge_percentile else None
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    if slot is None or await hedge_slots.enter_async_context(slot(wait=False)):
+                        logger.info(f"Request exceeded the p{hedge_percentile:g} latency of {hedge_delay:.1f}s. Sending a hedged duplicate.")
+                        tasks.append(asyncio.create_task(make_request()))
+                        started_at[tasks[-1]] = time.monotonic()
+                    else:
+                        logger.info(f"Request exceeded the p{hedge_percentile:g} latency of {hedge_delay:.1f}s, but no request slot is free for a hedged duplicate.")
+
+            pending = set(tasks)
+            last_error = None
+            while pending:
+                remaining = start_time + timeout - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        latency_tracker.record(time.monotonic() - started_at[task])
+                        return task.result()
+                    last_error = task.exception()
+
+            if last_error is not None and not pending:
+                raise last_error
+            raise asyncio.TimeoutError(f"Request timed out after {timeout} seconds")
+        finally:
+            # Cancel the requests before their slots are released
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+async def call_with_retries(make_request, description, circuit_breaker, latency_tracker, timeout=120.0, max_retries=3,
+                            backoff_base=1.0, backoff_max=30.0, hedge_percentile=0, stop_on=None, slot=None):
+    """
+    Call an async request factory with a timeout, retries, a circuit breaker and optional hedging.
+
+    Args:
+        make_request (callable): Returns a new awaitable for each attempt.
+        description (str): Describes the request in log messages.
+        circuit_breaker (CircuitBreaker): The breaker of the deployment the request goes to.
+        latency_tracker (LatencyTracker): Learns request latencies for hedging.
+        timeout (float): Seconds allowed per attempt, including its hedge.
+        max_retries (int): Retries after the first attempt.
+        backoff_base (float): The delay ceiling of the first retry, in seconds.
+        backoff_max (float): The largest delay ceiling, in seconds.
+        hedge_percentile (float): Latency percentile after which a duplicate is sent (0 disables hedging).
+        stop_on (callable, optional): Errors for which it returns True are raised at once, without retrying.
+        slot (callable, optional): Returns an async context manager held around each attempt, such as a
+                                   scheduler slot. It is entered before the timeout starts, so time spent
+                                   queueing for the slot counts neither as timeout nor as latency. A hedged
+                                   duplicate takes another one with slot(wait=False), which must not wait
+                                   and must yield whether a slot was free.
+
+    Returns:
+        The result of the first successful attempt.
+
+    Raises:
+        Exception: The error of the last attempt once all retries have failed.
+    """
+    for attempt in range(max_retries + 1):
+        probing = await circuit_breaker.wait_until_available()
+        try:
+            if slot is not None:
+                async with slot():
+                    result = await _run_hedged(make_request, timeout, latency_tracker, hedge_percentile, slot)
+            else:
+                result = await _run_hedged(make_request, timeout, latency_tracker, hedge_percentile)
+            circuit_breaker.record_success()
+            return result
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            circuit_breaker.record_failure()
+            error = e
+        finally:
+            # Release the requests waiting on the probe; they see the circuit closed or reopened
+            if probing:
+                circuit_breaker.end_probe()
+
+        if stop_on is not None and stop_on(error):
+            raise error
+        if attempt == max_retries:
+            logger.error(f"{description} failed after {max_retries + 1} attempts: {error}")
+            raise error
+        delay = get_backoff_delay(attempt, backoff_base, backoff_max)
+        logger.warning(f"{description} failed (attempt {attempt + 1}/{max_retries + 1}): {error}. Retrying in {delay:.1f}s.")
+        await asyncio.sleep(delay)
@@ -1,4 +1,6 @@
 import asyncio
+import fnmatch
+from pathlib import PurePath
 from tqdm.asyncio import tqdm_asyncio
 
 async def worker(task_queue: asyncio.Queue, progress_bar=None):
@@ -9,14 +11,82 @@ async def worker(task_queue: asyncio.Queue, progress_bar=None):
         task_queue (asyncio.Queue): The queue holding tasks to be processed.
         progress_bar (tqdm.asyncio.tqdm_asyncio, optional): The progress bar to update after each task.
     """
-    while not task_queue.empty():
+    while True:
         task = await task_queue.get()  # Get the next task
-        await task  # Process the task
-        task_queue.task_done()  # Mark task as done
+        try:
+            if task is None:  # Sentinel: no more tasks will be produced
+                return
+            await task  # Process the task
 
-        # If a progress bar is provided, update it after each task
-        if progress_bar:
-            progress_bar.update(1)
+            # If a progress bar is provided, update it after each task
+            if progress_bar:
+                progress_bar.update(1)
+        finally:
+            task_queue.task_done()  # Mark task as done
+
+async def produce_tasks(tasks, task_queue: asyncio.Queue, num_workers: int):
+    """
+    Feed tasks into the queue, waiting whenever a bounded queue is full, then signal each worker to stop.
+
+    Args:
+        tasks (iterable): The tasks to queue; may be a lazy generator.
+        task_queue (asyncio.Queue): The queue the workers read from.
+        num_workers (int): Number of workers to send a stop sentinel to.
+    """
+    for task in tasks:
+        await task_queue.put(task)
+    for _ in range(num_workers):
+        await task_queue.put(None)
+
+class ProgressCounter:
+    """
+    Counts finished tasks like a progress bar without printing anything, for runs whose progress
+    is reported elsewhere (e.g. by the job server).
+    """
+    def __init__(self, total=None, desc=None):
+        self.total = total
+        self.desc = desc
+        self.n = 0
+
+    def update(self, n=1):
+        self.n += n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+def is_priority_path(relative_path: str | PurePath, patterns=()) -> bool:
+    """
+    Check whether a file belongs to the priority class that should be translated first:
+    README.md files, files at the top level of the project, and files matching any extra pattern.
+
+    Args:
+        relative_path (str | PurePath): The file path relative to the project root.
+        patterns (iterable): Extra glob patterns matched against the POSIX relative path.
+
+    Returns:
+        bool: True if the file is a priority file.
+    """
+    relative_path = PurePath(relative_path)
+    if relative_path.name.lower() == 'readme.md' or len(relative_path.parts) == 1:
+        return True
+    return any(fnmatch.fnmatch(relative_path.as_posix(), pattern) for pattern in patterns)
+
+def sort_tasks_by_cost(work_units: list) -> list:
+    """
+    Order work so priority items come first and, within a priority class, the most expensive
+    items start first. Starting long work early keeps it from becoming the tail of the run.
+
+    Args:
+        work_units (list): List of (priority, estimated_cost, item) tuples; lower priority values run first.
+
+    Returns:
+        list: The items in scheduling order.
+    """
+    ordered = sorted(enumerate(work_units), key=lambda item: (item[1][0], -item[1][1], item[0]))
+    return [task for _, (_, _, task) in ordered]
 
 async def queue_tasks(tasks: list, max_concurrent_tasks: int, task_desc: str = "Processing tasks"):
     """
@@ -27,20 +97,15 @@ async def queue_tasks(tasks: list, max_concurrent_tasks: int, task_desc: str = "
         max_concurrent_tasks (int): Maximum number of concurrent workers to process the tasks.
         task_desc (str): Description for the progress bar.
     """
-    task_queue = asyncio.Queue()
-    
-    # Add tasks to the queue
-    for task in tasks:
-        task_queue.put_nowait(task)
+    task_queue = asyncio.Queue(maxsize=max_concurrent_tasks * 2)
 
     # Create a progress bar for tracking the task progress
     with tqdm_asyncio.tqdm_asyncio(total=len(tasks), desc=task_desc) as progress_bar:
         # Create worker tasks to process the queue concurrently
         workers = [asyncio.create_task(worker(task_queue, progress_bar)) for _ in range(max_concurrent_tasks)]
 
-        # Wait until all tasks in the queue are processed
-        await task_queue.join()
+        # Add tasks to the queue as the workers make room
+        await produce_tasks(tasks, task_queue, len(workers))
 
-        # Ensure all workers have completed
-        for worker_task in workers:
-            worker_task.cancel()
+        # Wait until all workers have finished
+        await asyncio.gather(*workers)
@@ -54,3 +54,40 @@ def extract_yaml_lines(message):
     lines = message.split('\n')
     yaml_lines = [line[2:] for line in lines if line.startswith('- ')]
     return yaml_lines
+
+def gen_image_batch_translation_prompt(text_data, language):
+    """
+    Generate a translation prompt for lines collected from several images, each with a numeric ID.
+
+    Args:
+        text_data (list): List of text lines to be translated; the ID of a line is its index.
+        language (str): Target language for translation.
+
+    Returns:
+        str: Generated translation prompt.
+    """
+    prompt = f'''
+    You are a translator that receives lines recognized in several images. Please translate each line into {language}, respecting the context of the text.
+    Each line starts with its ID in square brackets. Return one line per ID, starting with the same ID in square brackets followed by the translation.
+    Return only the translated lines.
+    '''
+    for line_id, line in enumerate(text_data):
+        prompt += f"[{line_id}] {line}\n"
+    return prompt
+
+def extract_id_lines(message):
+    """
+    Extract the lines of an answer to an ID-tagged prompt.
+
+    Args:
+        message (str): The message containing '[ID] translation' lines.
+
+    Returns:
+        dict: Mapping of line ID to translated line.
+    """
+    id_lines = {}
+    for line in message.split('\n'):
+        match = re.match(r'\s*(?:- )?\[(\d+)\]\s?(.*)$', line)
+        if match:
+            id_lines[int(match.group(1))] = match.group(2).strip()
+    return id_lines
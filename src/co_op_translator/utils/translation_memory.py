@@ -0,0 +1,77 @@
+"""
+This module contains the line-level translation memory for image text.
+Short strings such as product names, axis labels and button captions repeat across the
+images of a project; their translations are remembered per target language so they are
+requested only once.
+"""
+
+import logging
+import threading
+import unicodedata
+from co_op_translator.utils.file_utils import load_json_cache, save_json_cache
+
+logger = logging.getLogger(__name__)
+
+def normalize_line(text: str) -> str:
+    """
+    Normalize an OCR line for lookup: Unicode NFKC and collapsed whitespace. Case is kept,
+    since it can change the translation.
+
+    Args:
+        text (str): The recognized line.
+
+    Returns:
+        str: The normalized line.
+    """
+    return ' '.join(unicodedata.normalize('NFKC', text).split())
+
+class LineTranslationMemory:
+    def __init__(self, cache_path=None):
+        """
+        Initialize the memory, loading previously stored translations.
+
+        Args:
+            cache_path (Path, optional): The JSON file the memory is kept in. If None, it is kept in memory only.
+        """
+        self.cache_path = cache_path
+        # Mapping of target language to {normalized line: translation}
+        self.entries = load_json_cache(cache_path) if cache_path is not None else {}
+        # Image translations run in worker threads
+        self.lock = threading.Lock()
+
+    def lookup(self, lines, language):
+        """
+        Return the remembered translations of lines.
+
+        Args:
+            lines (list): The recognized lines.
+            language (str): The target language.
+
+        Returns:
+            list: The translation of each line, or None where it is not known.
+        """
+        with self.lock:
+            translations = self.entries.get(language, {})
+            return [translations.get(normalize_line(line)) for line in lines]
+
+    def store(self, lines, translated_lines, language):
+        """
+        Remember the translations of lines.
+
+        Args:
+            lines (list): The recognized lines.
+            translated_lines (list): Their translations, in the same order.
+            language (str): The target language.
+        """
+        with self.lock:
+            translations = self.entries.setdefault(language, {})
+            for line, translated_line in zip(lines, translated_lines):
+                translations[normalize_line(line)] = translated_line
+
+    def save(self):
+        """
+        Persist the memory.
+        """
+        if self.cache_path is not None and self.entries:
+            with self.lock:
+                save_json_cache(self.cache_path, self.entries)